@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from openai.types.chat import ChatCompletion
+
+log = logging.getLogger(__name__)
+
+## Arguments of a completion request that never change its response
+_UNKEYED_ARGS = ("stream", "timeout", "extra_headers")
+
+
+def cache_key(create_args: dict[str, Any]) -> str:
+    """
+    Content hash of the arguments of a chat completion request, i.e. the model, messages,
+    tools, temperature, response format and any other sampling parameters.
+    Arguments that are None are dropped so an explicit None and a missing value hash the same
+    """
+    args = {k: v for k, v in create_args.items() if v is not None and k not in _UNKEYED_ARGS}
+    canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On disk cache of chat completions in SQLite, keyed by cache_key.
+    Entries older than ttl seconds are not returned, and once there are more than max_entries
+    the least recently used are evicted. Safe to share between threads
+    """
+
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = 10_000,
+    ):
+        """
+        Args:
+            path (str | Path): The SQLite database file, created if it does not exist
+            ttl (float): Seconds an entry stays valid, None to never expire
+            max_entries (int): Entries kept before evicting, None for no limit
+        """
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[ChatCompletion]:
+        """The cached completion of key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            data, created = row
+            if self._expired(created, now):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        try:
+            return ChatCompletion.model_validate_json(data)
+        except Exception as e:
+            log.warning(f"ResponseCache: dropping unreadable entry {key}: {e}")
+            self.delete(key)
+            return None
+
+    def set(self, key: str, completion: ChatCompletion) -> None:
+        now = time.time()
+        data = completion.model_dump_json()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, data, created, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, data, now, now),
+            )
+            self._evict(now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def _evict(self, now: float) -> None:
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        if self.max_entries is None:
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
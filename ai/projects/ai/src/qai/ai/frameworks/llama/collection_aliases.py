@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import weakref
+from typing import Optional
+
+import chromadb
+from chromadb.api import ClientAPI
+from pi_log import getLogger
+
+log = getLogger(__name__)
+
+## Collection holding one record per alias, id = alias, metadata["collection"] = current name.
+## Written by the chroma-server importer after a successful import
+ALIAS_COLLECTION = "qai_collection_aliases"
+DEFAULT_TTL = 30.0
+SIMPLIFIED_MD = "simplified_md"
+
+
+def company_alias(company: str, subdir: str = SIMPLIFIED_MD) -> str:
+    """The alias of the latest collection of a company's subdir, e.g. acme.simplified_md"""
+    return f"{os.path.basename(company)}.{subdir}"
+
+
+def latest_by_listing(client: ClientAPI, prefix: str) -> chromadb.Collection:
+    """The collection with the greatest name starting with prefix, lists every collection"""
+    collections = client.list_collections()
+    col_list = [c for c in collections if c.name.startswith(prefix)]
+    col_list = sorted(col_list, key=lambda x: x.name, reverse=True)
+    log.debug(f"Filtered collections = {col_list}")
+    if len(col_list) == 0:
+        raise ValueError(f"No collections found with name {prefix}")
+    return col_list[0]
+
+
+class CollectionAliases:
+    """
+    Alias (e.g. company.simplified_md) -> current collection name, stored in Chroma so the
+    importer and every reader share it. Resolved collections are cached for ttl seconds
+    """
+
+    def __init__(self, client: ClientAPI, ttl: float = DEFAULT_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._collection: Optional[chromadb.Collection] = None
+        self._cache: dict[str, tuple[float, chromadb.Collection]] = {}
+        self._lock = threading.Lock()
+
+    def _aliases(self) -> chromadb.Collection:
+        if self._collection is None:
+            ## Records carry no documents, so no embedding function is needed
+            self._collection = self.client.get_or_create_collection(
+                ALIAS_COLLECTION, embedding_function=None
+            )
+        return self._collection
+
+    def get(self, alias: str) -> Optional[str]:
+        """The collection name of alias, None if it is not set"""
+        result = self._aliases().get(ids=[alias], include=["metadatas"])
+        if not result["ids"]:
+            return None
+        return result["metadatas"][0]["collection"]
+
+    def set(self, alias: str, collection_name: str, only_newer: bool = False) -> bool:
+        """
+        Point alias to collection_name with a single upsert.
+        Args:
+            only_newer (bool): Only move the alias to names sorting after the current one
+        Returns:
+            bool: Whether the alias was changed
+        """
+        if only_newer:
+            current = self.get(alias)
+            if current is not None and current >= collection_name:
+                return False
+        self._aliases().upsert(
+            ids=[alias],
+            embeddings=[[0.0]],
+            metadatas=[{"collection": collection_name, "updated": time.time()}],
+        )
+        self.invalidate(alias)
+        return True
+
+    def invalidate(self, alias: str = None) -> None:
+        with self._lock:
+            if alias is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(alias, None)
+
+    def resolve(self, alias: str) -> chromadb.Collection:
+        """
+        The current collection of alias. Falls back to the latest collection starting with
+        alias when no alias is set, e.g. for collections imported before aliases existed
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(alias)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+        collection = None
+        name = self.get(alias)
+        if name is not None:
+            try:
+                collection = self.client.get_collection(name)
+            except Exception as e:
+                log.warning(f"Alias {alias} points to missing collection {name}: {e}")
+        if collection is None:
+            collection = latest_by_listing(self.client, alias)
+        with self._lock:
+            self._cache[alias] = (now, collection)
+        return collection
+
+
+_registries: "weakref.WeakKeyDictionary[ClientAPI, CollectionAliases]" = (
+    weakref.WeakKeyDictionary()
+)
+_registries_lock = threading.Lock()
+
+
+def get_aliases(client: ClientAPI) -> CollectionAliases:
+    """The CollectionAliases of a client, shared so its cache is too"""
+    with _registries_lock:
+        aliases = _registries.get(client)
+        if aliases is None:
+            aliases = CollectionAliases(client)
+            _registries[client] = aliases
+        return aliases
+
+
+def resolve_collection(client: ClientAPI, name: str) -> chromadb.Collection:
+    return get_aliases(client).resolve(name)
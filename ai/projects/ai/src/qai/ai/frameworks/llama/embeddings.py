@@ -1,4 +1,8 @@
+import hashlib
+import json
+import threading
 from enum import StrEnum
+from pathlib import Path
 from typing import TypeVar
 
 from llama_index.core.base.embeddings.base import (
@@ -6,9 +10,25 @@ from llama_index.core.base.embeddings.base import (
     BaseEmbedding,
     Embedding,
 )
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import Document
+
+from qai.ai.utils.embedding_cache import EmbeddingCache
 
 C = TypeVar("C", bound="BaseEmbedding")
 
+## SimpleDirectoryReader metadata that changes with where and when a file was written.
+## file_path includes the snapshot directory, so embedding it would change every chunk
+PATH_METADATA_KEYS = [
+    "file_path",
+    "file_name",
+    "file_type",
+    "file_size",
+    "creation_date",
+    "last_modified_date",
+    "last_accessed_date",
+]
+
 
 class EmbeddingName(StrEnum):
     hf_bge_small_en_v1_5 = "BAAI/bge-small-en-v1.5"
@@ -25,7 +45,8 @@ class EmbeddingName(StrEnum):
         return str(self).lower()
 
 
-def get_embedding(model_name: EmbeddingName = None, **kwargs) -> BaseEmbedding:
+def make_embedding(model_name: EmbeddingName = None, **kwargs) -> BaseEmbedding:
+    """Build a new embedding model, get_embedding shares one per process instead"""
     if not model_name:
         model_name = EmbeddingName.openai_default
     if model_name == EmbeddingName.hf_bge_small_en_v1_5:
@@ -41,3 +62,113 @@ def get_embedding(model_name: EmbeddingName = None, **kwargs) -> BaseEmbedding:
             return OpenAIEmbedding(**kwargs)
         else:
             return OpenAIEmbedding(name=model_name, **kwargs)
+
+
+def exclude_path_metadata(documents: list[Document]) -> list[Document]:
+    """
+    Embed documents by their content only, so unchanged texts from a new snapshot hit the
+    embedding cache. The metadata stays on the nodes and is still shown to the llm
+    """
+    for doc in documents:
+        excluded = doc.excluded_embed_metadata_keys
+        excluded.extend(k for k in PATH_METADATA_KEYS if k not in excluded)
+    return documents
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embeds texts with embed_model, reusing the embeddings of texts seen before from an
+    EmbeddingCache. Queries are always embedded, as some models embed them differently
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache, **kwargs):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed_model._get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._embed_model._aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        embeddings = self._cache.get_many(texts)
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            new = self._embed_model._get_text_embeddings([texts[i] for i in missing])
+            self._cache.put_many([texts[i] for i in missing], new)
+            for i, e in zip(missing, new):
+                embeddings[i] = e
+        return embeddings
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        embeddings = self._cache.get_many(texts)
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            new = await self._embed_model._aget_text_embeddings([texts[i] for i in missing])
+            self._cache.put_many([texts[i] for i in missing], new)
+            for i, e in zip(missing, new):
+                embeddings[i] = e
+        return embeddings
+
+
+## Models loaded in this process by (model_name, kwargs), loading one does not block the others
+_models: dict[str, BaseEmbedding] = {}
+_caches: dict[Path, EmbeddingCache] = {}
+_model_locks: dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+
+
+def _model_key(model_name: EmbeddingName, kwargs: dict) -> str:
+    return f"{model_name}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+
+
+def get_embedding(
+    model_name: EmbeddingName = None, cache_dir: str | Path = None, **kwargs
+) -> BaseEmbedding:
+    """
+    The embedding model of model_name, loaded once per process and shared by all callers.
+    Args:
+        model_name (EmbeddingName): Defaults to EmbeddingName.openai_default
+        cache_dir (str | Path): When given, text embeddings are cached on disk in a
+            subdirectory per model and kwargs so unchanged texts are not embedded again
+        kwargs: Passed to the model when it is first built
+    """
+    if not model_name:
+        model_name = EmbeddingName.openai_default
+    key = _model_key(model_name, kwargs)
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model_lock = _model_locks.setdefault(key, threading.Lock())
+        with model_lock:
+            model = _models.get(key)
+            if model is None:
+                model = make_embedding(model_name, **kwargs)
+                _models[key] = model
+    if cache_dir is None:
+        return model
+    ## Models built with other kwargs, e.g. dimensions, must not share vectors
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+    directory = Path(cache_dir) / f"{EmbeddingName(model_name).short_name()}-{digest}"
+    with _lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = EmbeddingCache(directory)
+            _caches[directory] = cache
+    return CachedEmbedding(model, cache)
@@ -30,7 +30,8 @@ from pi_log import get_app_logger, getLogger
 from qai.storage.llama.openai_llm import CustomOpenAI
 from qai.storage.retriever import Retriever
 
-from .embeddings import EmbeddingName, get_embedding
+from .collection_aliases import get_aliases, resolve_collection
+from .embeddings import EmbeddingName, exclude_path_metadata, get_embedding
 
 log = getLogger(__name__)
 print(f" app logger name: {get_app_logger().name}, logger name: {log.name}")
@@ -52,6 +53,8 @@ class LlamaChromaConfig:
         # default_factory=lambda: {"model_name": "BAAI/bge-base-en-v1.5"}
         default_factory=lambda: {}
     )
+    ## Text embeddings are cached on disk here when given, see get_embedding
+    embedding_cache_dir: str = None
 
 
 @dataclass
@@ -96,14 +99,7 @@ class LlamaChroma(Retriever):
 
     @staticmethod
     def _get_last_collection(chroma_client: ClientAPI, name: str) -> chromadb.Collection:
-        collections = chroma_client.list_collections()
-        print("All collections", collections)
-        col_list = [c for c in collections if c.name.startswith(name)]
-        col_list = sorted(col_list, key=lambda x: x.name, reverse=True)
-        print(f"Filtered collections = {col_list}")
-        if len(col_list) == 0:
-            raise ValueError(f"No collections found with name {name}")
-        return col_list[0]
+        return resolve_collection(chroma_client, name)
 
     def get_last_collection(self, name: str) -> chromadb.Collection:
         return LlamaChroma._get_last_collection(self.client, name)
@@ -122,6 +118,7 @@ class LlamaChroma(Retriever):
         documents = SimpleDirectoryReader(
             input_dir=document_location, recursive=recursive
         ).load_data()
+        exclude_path_metadata(documents)
 
         chroma_collection = self.client.get_or_create_collection(collection_name)
 
@@ -130,7 +127,9 @@ class LlamaChroma(Retriever):
         embed_model_params = self.config.embed_model_params.copy()
         if model_name:
             embed_model_params["model_name"] = model_name
-        embed_model = get_embedding(**embed_model_params)
+        embed_model = get_embedding(
+            cache_dir=self.config.embedding_cache_dir, **embed_model_params
+        )
 
         self.index = VectorStoreIndex.from_documents(
             documents, storage_context=storage_context, embed_model=embed_model
@@ -150,7 +149,9 @@ class LlamaChroma(Retriever):
         Create or update a collection with the given name and document location.
         This will remove the previous collection if it exists.
         """
+        alias = None
         if use_timestr:
+            alias = collection_name
             collection_name = f"{collection_name}_{time.strftime('%Y%m%d-%H%M%S')}"
         try:
             collection = self.client.get_collection(collection_name)
@@ -170,6 +171,8 @@ class LlamaChroma(Retriever):
             collection = self.get_or_create_collection(
                 collection_name, document_location, recursive=recursive, model_name=model_name
             )
+        if alias:
+            get_aliases(self.client).set(alias, collection_name, only_newer=True)
         return collection
 
     def search(self, query: str) -> str:
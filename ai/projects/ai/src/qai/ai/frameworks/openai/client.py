@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import weakref
+from typing import Any
+
+from openai import AsyncOpenAI, OpenAI
+
+## Process wide clients, each keeps its own connection pool so reusing them avoids a
+## new pool (and TLS handshake) per query
+_client: OpenAI = None
+## Async connections are bound to the event loop they were opened on, one client per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+
+def get_client(**kwargs: Any) -> OpenAI:
+    """
+    The shared OpenAI client, created on first use.
+    Args:
+        kwargs: Passed to OpenAI when the client is created, ignored afterwards
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = OpenAI(**kwargs)
+    return _client
+
+
+def get_async_client(**kwargs: Any) -> AsyncOpenAI:
+    """
+    The shared AsyncOpenAI client of the running event loop, created on first use.
+    Args:
+        kwargs: Passed to AsyncOpenAI when the client is created, ignored afterwards
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(**kwargs)
+            _async_clients[loop] = client
+    return client
+
+
+def reset_clients() -> None:
+    """Drop the shared clients, e.g. after the api key changed or in a forked process"""
+    global _client
+    with _lock:
+        _client = None
+        _async_clients.clear()
@@ -1,19 +1,29 @@
+import asyncio
+import logging
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Any
 
 import openai
 import requests
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from openai.types.chat import ChatCompletion
 from qai.ai import Query, QueryReturn
+from qai.ai.cache import ResponseCache, cache_key
 from qai.ai.config import cfg
+from qai.ai.frameworks.openai.client import get_async_client, get_client
 from qai.ai.llm import LLM
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
+log = logging.getLogger(__name__)
+
 date = datetime.now().strftime("%m%d%Y_%H:%M:%S")
 
 sentinel = object()
 
+## Queries in flight at once in query_batch, unless set by "max_concurrency" in the config
+DEFAULT_MAX_CONCURRENCY = 16
+
 
 @retry(wait=wait_random_exponential(multiplier=1, max=40), stop=stop_after_attempt(3))
 def chat_completion_request(messages, tools=None, tool_choice=None, model=None):
@@ -44,6 +54,9 @@ def chat_completion_request(messages, tools=None, tool_choice=None, model=None):
 @dataclass(kw_only=True)
 class OpenAILLM(LLM):
     client: OpenAI = None
+    async_client: AsyncOpenAI = None
+    ## Opt in response cache, also built from a "cache" table in the config
+    cache: ResponseCache = None
 
     def __post_init__(self):
         if self.config is None:
@@ -52,12 +65,29 @@ class OpenAILLM(LLM):
             self.config["temperature"] = 0.0
         if not "name" in self.config:
             raise ValueError("A default model name must be provided")
+        if self.cache is None and self.config.get("cache"):
+            self.cache = ResponseCache(**self.config["cache"])
 
     @property
     def model(self):
         return self.config.get("name")
 
-    def query(
+    @property
+    def max_concurrency(self) -> int:
+        return self.config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)
+
+    def _get_client(self) -> OpenAI:
+        if self.client is None:
+            self.client = get_client()
+        return self.client
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        ## Not stored on the instance, the shared client depends on the running event loop
+        if self.async_client is not None:
+            return self.async_client
+        return get_async_client()
+
+    def _make_query(
         self,
         query: str | Query = None,
         messages: list[dict] = None,
@@ -66,11 +96,8 @@ class OpenAILLM(LLM):
         tool_choice: str | dict = None,
         temperature: float = None,
         system_message=None,
-        repeat: int = None,
-        validate: bool = False,
-        required_fields: list[str] = None,
         **kwargs,
-    ) -> QueryReturn:
+    ) -> Query:
         if query is None and messages is None:
             raise ValueError("query or messages must be provided")
         if messages is None:
@@ -93,52 +120,210 @@ class OpenAILLM(LLM):
             query.tool_choice = {"type": "function", "function": {"name": tool_choice}}
         if not query.model:
             query.model = self.model if not "name" in kwargs else kwargs.get("name")
-        if not query.model:
-            model = self.model
         if not query.temperature:
             query.temperature = self.config.get("temperature", 0.0)
-        # print(model, temperature, messages, tools, tool_choice)
-        if self.client is None:
-            self.client = OpenAI()
+        return query
+
+    def _create_args(self, query: Query, **kwargs) -> dict[str, Any]:
+        return dict(
+            model=query.model,
+            temperature=query.temperature,
+            messages=query.messages,
+            tools=query.tools,
+            tool_choice=query.tool_choice,
+            **kwargs,
+        )
+
+    def _on_error(self, query: Query, e: Exception, attempt: int, nrepeats: int) -> None:
+        print(f"Attempt {attempt+1}/{nrepeats} failed. Exception: {e}")
+        print(f"Query: {query}")
+        if attempt >= nrepeats - 1:
+            raise e
+
+    def _to_return(
+        self,
+        completion: ChatCompletion,
+        query: Query,
+        messages: list[dict],
+        model: str,
+        temperature: float,
+        validate: bool,
+        required_fields: list[str],
+        attempt: int,
+        nrepeats: int,
+    ) -> QueryReturn | None:
+        """The QueryReturn of a completion, or None if it failed validation and is repeated"""
+        qr = QueryReturn(
+            data=completion,
+            model=model,
+            query=query,
+            messages=messages,
+            temperature=temperature,
+        )
+        try:
+            if validate:
+                qr.validate(required_fields=required_fields)
+        except Exception as e:
+            if attempt >= nrepeats - 1:
+                raise e
+            print(f"Attempt {attempt+1}/{nrepeats} failed. Validation error: {e}")
+            return None
+        return qr
+
+    def _from_cache(
+        self,
+        key: str,
+        query: Query,
+        messages: list[dict],
+        model: str,
+        temperature: float,
+        validate: bool,
+        required_fields: list[str],
+    ) -> QueryReturn | None:
+        """The QueryReturn of a cached completion, None on a miss or if it fails validation"""
+        completion = self.cache.get(key)
+        if completion is None:
+            return None
+        try:
+            return self._to_return(
+                completion, query, messages, model, temperature, validate, required_fields,
+                attempt=0, nrepeats=0,
+            )
+        except Exception as e:
+            log.debug(f"OpenAILLM: ignoring cached response that failed validation: {e}")
+            return None
+
+    def query(
+        self,
+        query: str | Query = None,
+        messages: list[dict] = None,
+        model: str = None,
+        tools: list[dict] = None,
+        tool_choice: str | dict = None,
+        temperature: float = None,
+        system_message=None,
+        repeat: int = None,
+        validate: bool = False,
+        required_fields: list[str] = None,
+        use_cache: bool = True,
+        **kwargs,
+    ) -> QueryReturn:
+        query = self._make_query(
+            query, messages, model, tools, tool_choice, temperature, system_message, **kwargs
+        )
+        client = self._get_client()
+        args = self._create_args(query, **kwargs)
+        key = cache_key(args) if self.cache is not None and use_cache else None
+        if key is not None:
+            qr = self._from_cache(
+                key, query, messages, model, temperature, validate, required_fields
+            )
+            if qr is not None:
+                return qr
         nrepeats = repeat or 1
         for i in range(nrepeats):
             try:
-                completion = self.client.chat.completions.create(
-                    model=query.model,
-                    temperature=query.temperature,
-                    messages=query.messages,
-                    tools=query.tools,
-                    tool_choice=query.tool_choice,
-                    **kwargs,
-                )
+                completion = client.chat.completions.create(**args)
             except Exception as e:
-                print(model, temperature, messages, tools, tool_choice)
-                print(f"Attempt {i+1}/{nrepeats} failed. Exception: {e}")
-                print(f"Query: {query}")
-                if i >= nrepeats - 1:
-                    raise e
+                self._on_error(query, e, i, nrepeats)
                 continue
-            r: ChatCompletion = completion.choices[0].message
-            # print("Attempt ", i+1, query.messages[-1])
-            # pprint(completion)
+            qr = self._to_return(
+                completion, query, messages, model, temperature, validate, required_fields,
+                attempt=i, nrepeats=nrepeats,
+            )
+            if qr is not None:
+                break
+        if key is not None:
+            self.cache.set(key, completion)
+        return qr
 
-            qr = QueryReturn(
-                data=completion,
-                model=model,
-                query=query,
-                messages=messages,
-                temperature=temperature,
+    async def aquery(
+        self,
+        query: str | Query = None,
+        messages: list[dict] = None,
+        model: str = None,
+        tools: list[dict] = None,
+        tool_choice: str | dict = None,
+        temperature: float = None,
+        system_message=None,
+        repeat: int = None,
+        validate: bool = False,
+        required_fields: list[str] = None,
+        use_cache: bool = True,
+        **kwargs,
+    ) -> QueryReturn:
+        """Async version of query, sent with the shared async client"""
+        query = self._make_query(
+            query, messages, model, tools, tool_choice, temperature, system_message, **kwargs
+        )
+        client = self._get_async_client()
+        args = self._create_args(query, **kwargs)
+        key = cache_key(args) if self.cache is not None and use_cache else None
+        if key is not None:
+            qr = self._from_cache(
+                key, query, messages, model, temperature, validate, required_fields
             )
+            if qr is not None:
+                return qr
+        nrepeats = repeat or 1
+        for i in range(nrepeats):
             try:
-                if validate:
-                    qr.validate(required_fields=required_fields)
-                break
+                completion = await client.chat.completions.create(**args)
             except Exception as e:
-                if i >= nrepeats - 1:
-                    raise e
-                print(f"Attempt {i+1}/{nrepeats} failed. Validation error: {e}")
+                self._on_error(query, e, i, nrepeats)
                 continue
-        # if qr.response:
-        #     messages.append(dict(r))
-
+            qr = self._to_return(
+                completion, query, messages, model, temperature, validate, required_fields,
+                attempt=i, nrepeats=nrepeats,
+            )
+            if qr is not None:
+                break
+        if key is not None:
+            self.cache.set(key, completion)
         return qr
+
+    async def aquery_batch(
+        self,
+        queries: list[str | Query | dict[str, Any]],
+        max_concurrency: int = None,
+        return_exceptions: bool = False,
+        **kwargs,
+    ) -> list[QueryReturn | BaseException]:
+        """
+        Run many queries concurrently, at most max_concurrency in flight at once.
+        Args:
+            queries (list): Queries, or dicts of aquery arguments
+            max_concurrency (int): Defaults to the "max_concurrency" of the config
+            return_exceptions (bool): Return exceptions in place of failed results
+                instead of raising the first one
+            kwargs: Passed to every aquery call
+        Returns:
+            list: The results in the order of queries
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def run(q: str | Query | dict[str, Any]) -> QueryReturn:
+            args = {**kwargs, **q} if isinstance(q, dict) else {**kwargs, "query": q}
+            async with semaphore:
+                return await self.aquery(**args)
+
+        return await asyncio.gather(
+            *[run(q) for q in queries], return_exceptions=return_exceptions
+        )
+
+    def query_batch(
+        self,
+        queries: list[str | Query | dict[str, Any]],
+        max_concurrency: int = None,
+        return_exceptions: bool = False,
+        **kwargs,
+    ) -> list[QueryReturn | BaseException]:
+        """Synchronous entry point to aquery_batch, must not be called from a running event loop"""
+        return asyncio.run(
+            self.aquery_batch(
+                queries,
+                max_concurrency=max_concurrency,
+                return_exceptions=return_exceptions,
+                **kwargs,
+            )
+        )
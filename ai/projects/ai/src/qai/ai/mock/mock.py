@@ -49,3 +49,18 @@ class MockChat:
 @dataclass
 class MockLLMClient:
     chat: MockChat = field(default_factory=MockChat)
+
+
+class AsyncCompletions(Completions):
+    async def create(self, *, messages, model, **kwargs) -> ChatCompletion:
+        return super().create(messages=messages, model=model, **kwargs)
+
+
+@dataclass
+class MockAsyncChat:
+    completions: AsyncCompletions = field(default_factory=AsyncCompletions)
+
+
+@dataclass
+class MockAsyncLLMClient:
+    chat: MockAsyncChat = field(default_factory=MockAsyncChat)
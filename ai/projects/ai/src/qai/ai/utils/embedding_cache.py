@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.tsv"
+META_FILE = "meta.json"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Embeddings of one model keyed by the hash of the embedded text, kept on disk in a
+    directory with a memory mapped float32 vector file and an append only index of
+    "<hash>\\t<row>" lines. Vectors are written before their index line, so an interrupted
+    write leaves at most an unreferenced vector. Safe to share between threads
+    """
+
+    def __init__(self, directory: str | Path):
+        """
+        Args:
+            directory (str | Path): Where the cache files are kept, one directory per model
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._rows: dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._load()
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, text: str) -> bool:
+        return content_hash(text) in self._rows
+
+    def _load(self):
+        meta_path = self.directory / META_FILE
+        if not meta_path.exists():
+            return
+        self._dim = json.loads(meta_path.read_text())["dim"]
+        nrows = self._num_rows()
+        index_path = self.directory / INDEX_FILE
+        if not index_path.exists():
+            return
+        with open(index_path, "r+") as f:
+            text = f.read()
+            if not text.endswith("\n"):
+                ## Drop the partial last line of an interrupted write before appending to it
+                text = text[: text.rfind("\n") + 1]
+                f.truncate(len(text.encode("utf-8")))
+        for line in text.splitlines():
+            key, _, row = line.partition("\t")
+            ## Rows past the end of the vectors were not completely written
+            if row.isdigit() and int(row) < nrows:
+                self._rows[key] = int(row)
+
+    def _num_rows(self) -> int:
+        path = self.directory / VECTORS_FILE
+        if self._dim is None or not path.exists():
+            return 0
+        return os.path.getsize(path) // (4 * self._dim)
+
+    def _mapped(self, row: int) -> np.memmap:
+        """The vector file mapped at least up to row, remapped after appends"""
+        if self._vectors is None or row >= self._vectors.shape[0]:
+            nrows = self._num_rows()
+            self._vectors = np.memmap(
+                self.directory / VECTORS_FILE, dtype=np.float32, mode="r", shape=(nrows, self._dim)
+            )
+        return self._vectors
+
+    def get(self, text: str) -> Optional[list[float]]:
+        return self.get_many([text])[0]
+
+    def get_many(self, texts: Sequence[str]) -> list[Optional[list[float]]]:
+        """The cached embedding of each text, None for the ones not cached"""
+        with self._lock:
+            rows = [self._rows.get(content_hash(t)) for t in texts]
+            if all(r is None for r in rows):
+                return [None] * len(texts)
+            vectors = self._mapped(max(r for r in rows if r is not None))
+            return [None if r is None else vectors[r].tolist() for r in rows]
+
+    def put(self, text: str, embedding: Sequence[float]) -> None:
+        self.put_many([text], [embedding])
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[Sequence[float]]) -> None:
+        """Add embeddings, texts that are already cached are skipped"""
+        with self._lock:
+            new = {}
+            for text, embedding in zip(texts, embeddings):
+                key = content_hash(text)
+                if key not in self._rows and key not in new:
+                    new[key] = embedding
+            if not new:
+                return
+            array = np.asarray(list(new.values()), dtype=np.float32)
+            if self._dim is None:
+                self._dim = array.shape[1]
+                (self.directory / META_FILE).write_text(json.dumps({"dim": self._dim}))
+            elif array.shape[1] != self._dim:
+                raise ValueError(
+                    f"EmbeddingCache: embedding dimension {array.shape[1]} != {self._dim}"
+                )
+            start = self._num_rows()
+            with open(self.directory / VECTORS_FILE, "ab") as f:
+                ## Drop the tail of an interrupted write so rows stay aligned
+                f.truncate(start * 4 * self._dim)
+                f.write(array.tobytes())
+            lines = []
+            for i, key in enumerate(new):
+                self._rows[key] = start + i
+                lines.append(f"{key}\t{start + i}\n")
+            with open(self.directory / INDEX_FILE, "a") as f:
+                f.writelines(lines)
@@ -1,5 +1,7 @@
+import functools
 import re
-from typing import TYPE_CHECKING, Set, Union
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Optional, Set, Union
 
 import nltk
 
@@ -32,6 +34,111 @@ stopwords = {"english": set(stopwords.words("english"))}
 contractions_re = re.compile("(%s)" % "|".join(contractions_dict.keys()))
 
 
+## Distinct (word, part of speech) lemmas and stems remembered by a Normalizer
+TOKEN_CACHE_SIZE = 100_000
+
+
+@dataclass
+class Normalizer:
+    """
+    Normalizes sentences with the same steps and options as normalize, with the stopwords,
+    lemmatizer and stemmer built once. Lemmas and stems are memoized per token
+    """
+
+    to_lower: bool = True
+    to_alphanumeric: bool = True
+    use_word_map: bool = True
+    remove_filler_words: bool = True
+    contractions: bool = True
+    stopwords: Union[bool, str] = True
+    stem: Union[bool, str] = False
+    lemma: Union[bool, str] = True
+    tag_pos: Union[bool, str] = True
+    language: str = "english"
+    cache_size: Optional[int] = TOKEN_CACHE_SIZE
+
+    def __post_init__(self):
+        self._stopwords = (
+            get_stopwords(self.stopwords if isinstance(self.stopwords, str) else self.language)
+            if self.stopwords
+            else set()
+        )
+        stem_language = self.stem if isinstance(self.stem, str) else self.language
+        self._stemmer = SnowballStemmer(stem_language) if self.stem else None
+        self._lemmatizer = WordNetLemmatizer() if self.lemma else None
+        self._lemmatize = functools.lru_cache(maxsize=self.cache_size)(self._lemmatize_token)
+        self._stem = functools.lru_cache(maxsize=self.cache_size)(self._stem_token)
+
+    def _lemmatize_token(self, word: str, tag: Optional[str]) -> str:
+        wordnet_pos = get_wordnet_pos(tag) if tag else ""
+        if not wordnet_pos:
+            return self._lemmatizer.lemmatize(word)
+        return self._lemmatizer.lemmatize(word, pos=wordnet_pos)
+
+    def _stem_token(self, word: str) -> str:
+        return self._stemmer.stem(word)
+
+    def tokenize(self, sentence: str) -> list[str]:
+        """The steps before part of speech tagging"""
+        if self.to_lower:
+            sentence = lower(sentence)
+        if self.contractions:
+            sentence = expand_contractions(sentence)
+        if self.to_alphanumeric:
+            sentence = alphanumeric(sentence)
+        tokens = wordpunct_tokenize(sentence)
+        if self.stopwords:
+            tokens = [w for w in tokens if w not in self._stopwords]
+        if self.remove_filler_words:
+            tokens = [w for w in tokens if w not in remove_words]
+        if self.use_word_map:
+            tokens = [word_maps.get(w, w) for w in tokens]
+        return tokens
+
+    def _finish(self, tokens: list[str], tags: Optional[list[tuple[str, str]]]) -> str:
+        if self.lemma:
+            if tags:
+                tokens = [self._lemmatize(w, t) for w, t in tags]
+            else:
+                tokens = [self._lemmatize(w, None) for w in tokens]
+        if self.stem:
+            tokens = [self._stem(w) for w in tokens]
+        return " ".join(tokens)
+
+    def normalize(self, string_or_query: Union[str, Query]) -> Union[str, Query]:
+        return self.normalize_many([string_or_query])[0]
+
+    __call__ = normalize
+
+    def normalize_many(self, items: Iterable[Union[str, Query]]) -> list[Union[str, Query]]:
+        """
+        Normalize many sentences, tagging the parts of speech of all of them in one call.
+        Queries are updated in place and returned like normalize does
+        """
+        items = list(items)
+        sentences = [i.query if isinstance(i, Query) else i for i in items]
+        token_lists = [self.tokenize(s) for s in sentences]
+        if self.tag_pos:
+            tag_lists = pos_tag_sents(token_lists)
+        else:
+            tag_lists = [None] * len(token_lists)
+        results = []
+        for item, tokens, tags in zip(items, token_lists, tag_lists):
+            text = self._finish(tokens, tags)
+            if isinstance(item, Query):
+                item.query = text
+                results.append(item)
+            else:
+                results.append(text)
+        return results
+
+
+@functools.lru_cache(maxsize=32)
+def get_normalizer(**options) -> Normalizer:
+    """A shared Normalizer for a set of normalize options"""
+    return Normalizer(**options)
+
+
 def normalize(
     string_or_query: Union[str, Query],
     to_lower: bool = True,
@@ -44,42 +151,23 @@ def normalize(
     lemma: Union[bool, str] = True,
     tag_pos: Union[bool, str] = True,
 ) -> Union[str, Query]:
-    if isinstance(string_or_query, Query):
-        is_query = True
-        sentence = string_or_query.query
-    else:
-        is_query = False
-        sentence = string_or_query
-    if to_lower:
-        sentence = lower(sentence)
-    if contractions:
-        sentence = expand_contractions(sentence)
-
-    if to_alphanumeric:
-        sentence = alphanumeric(sentence)
-
-    tokens = wordpunct_tokenize(sentence)
-    if stopwords:
-        tokens = remove_stopwords(tokens)
-    if remove_filler_words:
-        tokens = [w for w in tokens if w not in remove_words]
-    if use_word_map:
-        tokens = [word_maps.get(w, w) for w in tokens]
-    if tag_pos:
-        pos = pos_tag(tokens)
-    if lemma:
-        tokens = lemmatize(tokens, pos)
-    if stem:
-        tokens = stemming(tokens)
-    if is_query:
-        string_or_query.query = " ".join(tokens)
-        return string_or_query
-    return " ".join(tokens)
+    normalizer = get_normalizer(
+        to_lower=to_lower,
+        to_alphanumeric=to_alphanumeric,
+        use_word_map=use_word_map,
+        remove_filler_words=remove_filler_words,
+        contractions=contractions,
+        stopwords=stopwords,
+        stem=stem,
+        lemma=lemma,
+        tag_pos=tag_pos,
+    )
+    return normalizer.normalize(string_or_query)
 
 
 def get_stopwords(language: str = "english") -> Set[str]:
     if language not in stopwords:
-        stopwords[language] = set(stopwords.words(language))
+        stopwords[language] = set(nltk.corpus.stopwords.words(language))
     return stopwords[language]
 
 
@@ -141,6 +229,10 @@ def pos_tag(tokens: list[str]) -> list[str]:
     return nltk.pos_tag(tokens)
 
 
+def pos_tag_sents(token_lists: list[list[str]]) -> list[list[tuple[str, str]]]:
+    return nltk.pos_tag_sents(token_lists)
+
+
 def get_wordnet_pos(treebank_tag):
     if treebank_tag.startswith("J"):
         return wordnet.ADJ
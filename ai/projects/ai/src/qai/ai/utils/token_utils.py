@@ -1,19 +1,140 @@
-from typing import Dict, Union
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Protocol
 
 import tiktoken
 
 default_encoding_name = "cl100k_base"  # gpt-4, gpt-3.5-turbo, text-embedding-ada-002
 
+## Token counts kept in the memo, each entry is a 16 byte digest and an int
+MEMO_SIZE = 100_000
+
+
+class Encoding(Protocol):
+    def encode(self, text: str, **kwargs: Any) -> list[int]: ...
+
+
+_encodings: dict[str, Encoding] = {}
+_lock = threading.Lock()
+
+
+def register_encoding(encoding_name: str, encoding: Encoding) -> None:
+    """Use encoding for encoding_name instead of the tiktoken one"""
+    with _lock:
+        _encodings[encoding_name] = encoding
+        _memo.clear()
+
+
+def get_encoding(encoding_name: str = default_encoding_name) -> Encoding:
+    """The process wide encoder of encoding_name, loaded once"""
+    encoding = _encodings.get(encoding_name)
+    if encoding is None:
+        with _lock:
+            encoding = _encodings.get(encoding_name)
+            if encoding is None:
+                encoding = tiktoken.get_encoding(encoding_name)
+                _encodings[encoding_name] = encoding
+    return encoding
+
+
+class _TokenMemo:
+    """Bounded LRU of token counts keyed by (encoding, content hash)"""
+
+    def __init__(self, maxsize: int = MEMO_SIZE):
+        self.maxsize = maxsize
+        self._counts: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str, encoding_name: str) -> int:
+        key = (encoding_name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+        with self._lock:
+            n = self._counts.get(key)
+            if n is not None:
+                self._counts.move_to_end(key)
+                return n
+        n = len(get_encoding(encoding_name).encode(text))
+        with self._lock:
+            self._counts[key] = n
+            if len(self._counts) > self.maxsize:
+                self._counts.popitem(last=False)
+        return n
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+_memo = _TokenMemo()
+
+
+def count_tokens(text: str, encoding_name: str = default_encoding_name) -> int:
+    """Number of tokens in text, memoized by content so repeated texts are encoded once"""
+    if not text:
+        return 0
+    return _memo.count(text, encoding_name)
+
 
 def num_tokens(
     string_or_messages: str | list[dict[str, str]],
     encoding_name: str = default_encoding_name,
 ) -> int:
+    """
+    Number of tokens in a string, or in the contents of messages joined by newlines.
+    The joined text is encoded as a whole, so the count is exact, use TokenBudget to
+    count a growing list of messages incrementally
+    """
     if isinstance(string_or_messages, list):
         content = [m["content"] for m in string_or_messages]
         string_or_messages = "\n".join(content)
     if not isinstance(string_or_messages, str):
         raise ValueError(f"string_or_messages must be str or  dict, got {type(string_or_messages)}")
-    encoding = tiktoken.get_encoding(encoding_name)
-    num_tokens = len(encoding.encode(string_or_messages))
-    return num_tokens
+    return count_tokens(string_or_messages, encoding_name)
+
+
+@dataclass
+class TokenBudget:
+    """
+    Running token total while assembling a prompt, every text is encoded once.
+    Args:
+        limit (int): Tokens available, None or 0 for no limit
+        per_message (int): Tokens added for every text on top of its own, e.g. for separators
+        encoding_name (str): The encoding to count with
+    """
+
+    limit: Optional[int] = None
+    per_message: int = 0
+    encoding_name: str = default_encoding_name
+    used: int = 0
+
+    def cost(self, text: str) -> int:
+        """Tokens add(text) would use"""
+        return count_tokens(text, self.encoding_name) + self.per_message
+
+    def add(self, text: str) -> int:
+        """Account for text, returns the tokens it used"""
+        n = self.cost(text)
+        self.used += n
+        return n
+
+    def fits(self, text: str) -> bool:
+        return not self.limit or self.used + self.cost(text) <= self.limit
+
+    def try_add(self, text: str) -> bool:
+        """Add text if it fits in the budget, returns whether it was added"""
+        if not self.fits(text):
+            return False
+        self.add(text)
+        return True
+
+    @property
+    def remaining(self) -> Optional[int]:
+        return None if not self.limit else self.limit - self.used
+
+    @property
+    def exceeded(self) -> bool:
+        return bool(self.limit) and self.used > self.limit
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from qai.ai import Query
+from qai.ai.frameworks.openai.llm import OpenAILLM
+from qai.ai.mock.mock import AsyncCompletions, MockAsyncLLMClient, MockLLMClient
+
+
+class CountingCompletions(AsyncCompletions):
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, *, messages, model, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return await super().create(messages=messages, model=model, **kwargs)
+
+
+@pytest.fixture
+def chatbot():
+    return OpenAILLM(
+        config={"name": "mock-model-1.0"},
+        client=MockLLMClient(),
+        async_client=MockAsyncLLMClient(),
+    )
+
+
+def test_aquery(chatbot):
+    q = Query("What is the capital of France?")
+    query_result = asyncio.run(chatbot.aquery(q, params={"response": "Paris"}))
+    assert query_result.response == "Paris"
+
+
+def test_query_batch_keeps_order(chatbot):
+    queries = [{"query": f"q{i}", "params": {"response": str(i)}} for i in range(20)]
+    results = chatbot.query_batch(queries, max_concurrency=4)
+    assert [r.response for r in results] == [str(i) for i in range(20)]
+
+
+def test_query_batch_concurrency_limit(chatbot):
+    completions = CountingCompletions()
+    chatbot.async_client.chat.completions = completions
+    results = chatbot.query_batch([f"q{i}" for i in range(12)], max_concurrency=3)
+    assert len(results) == 12
+    assert completions.max_in_flight == 3
+
+
+def test_query_batch_return_exceptions(chatbot):
+    results = chatbot.query_batch(["ok", {"messages": None}], return_exceptions=True)
+    assert results[0].response == "Mocked Response"
+    assert isinstance(results[1], ValueError)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-W", "ignore:Module already imported:pytest.PytestWarning"])
@@ -0,0 +1,50 @@
+import chromadb
+import pytest
+
+from qai.ai.frameworks.llama.collection_aliases import CollectionAliases
+
+
+@pytest.fixture
+def client():
+    client = chromadb.EphemeralClient()
+    yield client
+    for c in client.list_collections():
+        client.delete_collection(c.name)
+
+
+def test_resolve_alias(client):
+    for t in ["20240101", "20240202"]:
+        client.create_collection(f"acme.simplified_md.{t}.hf_v1_5")
+    aliases = CollectionAliases(client, ttl=0)
+    ## Without an alias the latest collection is listed
+    assert aliases.resolve("acme.simplified_md").name.endswith("20240202.hf_v1_5")
+
+    assert aliases.set("acme.simplified_md", "acme.simplified_md.20240101.hf_v1_5")
+    assert aliases.resolve("acme.simplified_md").name.endswith("20240101.hf_v1_5")
+    assert not aliases.set(
+        "acme.simplified_md", "acme.simplified_md.20231231.hf_v1_5", only_newer=True
+    )
+    assert aliases.get("acme.simplified_md") == "acme.simplified_md.20240101.hf_v1_5"
+
+
+def test_resolve_is_cached(client):
+    client.create_collection("acme.simplified_md.1")
+    aliases = CollectionAliases(client, ttl=60)
+    first = aliases.resolve("acme.simplified_md")
+    client.create_collection("acme.simplified_md.2")
+    assert aliases.resolve("acme.simplified_md") is first
+    aliases.set("acme.simplified_md", "acme.simplified_md.2")
+    assert aliases.resolve("acme.simplified_md").name == "acme.simplified_md.2"
+
+
+def test_missing_collection_falls_back(client):
+    client.create_collection("acme.simplified_md.1")
+    aliases = CollectionAliases(client, ttl=0)
+    aliases.set("acme.simplified_md", "acme.simplified_md.deleted")
+    assert aliases.resolve("acme.simplified_md").name == "acme.simplified_md.1"
+    with pytest.raises(ValueError):
+        aliases.resolve("other")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-W", "ignore:Module already imported:pytest.PytestWarning"])
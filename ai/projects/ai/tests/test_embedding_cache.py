@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+from llama_index.core.schema import Document, MetadataMode
+from qai.ai.frameworks.llama.embeddings import exclude_path_metadata
+from qai.ai.utils.embedding_cache import INDEX_FILE, VECTORS_FILE, EmbeddingCache
+
+
+def test_put_and_get(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    assert cache.get("a") is None
+    cache.put_many(["a", "b", "a"], [[1, 2], [3, 4], [5, 6]])
+    assert len(cache) == 2
+    assert cache.get_many(["b", "c", "a"]) == [[3, 4], None, [1, 2]]
+    cache.put("c", [7, 8])
+    assert cache.get("c") == [7, 8]
+    assert "c" in cache and "d" not in cache
+    with pytest.raises(ValueError):
+        cache.put("d", [1, 2, 3])
+
+
+def test_reload(tmp_path):
+    EmbeddingCache(tmp_path).put_many(["a", "b"], [[0.5, 1.5], [2.5, 3.5]])
+    cache = EmbeddingCache(tmp_path)
+    assert cache.dim == 2
+    assert cache.get_many(["a", "b"]) == [[0.5, 1.5], [2.5, 3.5]]
+
+
+def test_interrupted_write(tmp_path):
+    EmbeddingCache(tmp_path).put_many(["a", "b"], [[1, 2], [3, 4]])
+    ## A partial vector and a partial index line
+    with open(tmp_path / VECTORS_FILE, "ab") as f:
+        f.write(b"\0\0")
+    with open(tmp_path / INDEX_FILE, "a") as f:
+        f.write("abc\t1")
+    cache = EmbeddingCache(tmp_path)
+    assert len(cache) == 2
+    cache.put("c", [5, 6])
+    assert EmbeddingCache(tmp_path).get_many(["a", "c"]) == [[1, 2], [5, 6]]
+
+
+def test_threads(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+
+    def work(n):
+        texts = [f"{n}-{i}" for i in range(50)]
+        cache.put_many(texts, [[n, i] for i in range(50)])
+        assert cache.get_many(texts) == [[n, i] for i in range(50)]
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(EmbeddingCache(tmp_path)) == 400
+
+
+def test_snapshots_embed_the_same_text():
+    docs = [
+        Document(text="About acme", metadata={"file_path": f"/websites/acme/{t}/about.md"})
+        for t in ["20240101", "20240202"]
+    ]
+    exclude_path_metadata(docs)
+    exclude_path_metadata(docs)
+    texts = {d.get_content(MetadataMode.EMBED) for d in docs}
+    assert texts == {"About acme"}
+    assert "file_path" in docs[0].get_content(MetadataMode.LLM)
+    assert docs[0].excluded_embed_metadata_keys.count("file_path") == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-W", "ignore:Module already imported:pytest.PytestWarning"])
@@ -1,6 +1,7 @@
 import pytest
 
-from qai.ai.utils.nltk_utils import normalize
+from qai.ai import Query
+from qai.ai.utils.nltk_utils import Normalizer, normalize
 
 def test_sentence_normalize():
     sentence = "This is a test sentence."
@@ -22,5 +23,21 @@ def test_removes_filler():
     normalized_sentence = normalize(sentence, stopwords=True)
     assert normalized_sentence == ""
 
+def test_normalize_many_matches_normalize():
+    sentences = ["This is a test sentence.", "We'll be running tests", "Running dogs", ""]
+    normalizer = Normalizer(stem=True)
+    expected = [normalize(s, stem=True) for s in sentences]
+    assert normalizer.normalize_many(sentences) == expected
+
+def test_normalize_many_query():
+    q = Query("This is a test sentence.")
+    assert Normalizer().normalize_many([q])[0] is q
+    assert q.query == "test sentence"
+
+def test_token_cache():
+    normalizer = Normalizer()
+    normalizer.normalize_many(["test sentence", "test sentence"])
+    assert normalizer._lemmatize.cache_info().hits == 2
+
 if __name__ == "__main__":
     pytest.main([__file__,"-W", "ignore:Module already imported:pytest.PytestWarning"])
\ No newline at end of file
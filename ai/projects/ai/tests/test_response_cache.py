@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+from openai.types.chat import ChatCompletion
+from qai.ai.cache import ResponseCache, cache_key
+from qai.ai.frameworks.openai.llm import OpenAILLM
+from qai.ai.mock.mock import Completions, MockAsyncLLMClient, MockLLMClient
+
+
+class CountingCompletions(Completions):
+    calls = 0
+
+    def create(self, *, messages, model, **kwargs):
+        self.calls += 1
+        return super().create(messages=messages, model=model, **kwargs)
+
+
+@pytest.fixture
+def chatbot(tmp_path):
+    client = MockLLMClient()
+    client.chat.completions = CountingCompletions()
+    return OpenAILLM(
+        config={"name": "mock-model-1.0", "cache": {"path": tmp_path / "cache.db"}},
+        client=client,
+        async_client=MockAsyncLLMClient(),
+    )
+
+
+def test_cache_hit_matches_live(chatbot):
+    live = chatbot.query("What is the capital of France?", params={"response": "Paris"})
+    cached = chatbot.query("What is the capital of France?", params={"response": "Paris"})
+    assert chatbot.client.chat.completions.calls == 1
+    assert isinstance(cached.data, ChatCompletion)
+    assert cached.data == live.data
+    assert cached.response == "Paris"
+
+    ## The async path shares the cache
+    q = chatbot.aquery("What is the capital of France?", params={"response": "Paris"})
+    assert asyncio.run(q).response == "Paris"
+
+
+def test_cache_key_params(chatbot):
+    chatbot.query("q", params={"response": "a"})
+    chatbot.query("q", params={"response": "a"}, temperature=0.5)
+    chatbot.query("q", params={"response": "a"}, tools=[{"type": "function"}])
+    chatbot.query("q", params={"response": "a"}, use_cache=False)
+    assert chatbot.client.chat.completions.calls == 4
+    assert len(chatbot.cache) == 3
+
+    assert cache_key({"model": "m", "tools": None}) == cache_key({"model": "m"})
+    a = cache_key({"model": "m", "messages": [{"role": "user", "content": "x"}]})
+    b = cache_key({"messages": [{"content": "x", "role": "user"}], "model": "m"})
+    assert a == b
+
+
+def test_ttl_and_eviction(tmp_path):
+    completion = Completions().create(messages=[], model="m")
+    cache = ResponseCache(tmp_path / "cache.db", ttl=0.05)
+    cache.set("a", completion)
+    assert cache.get("a") == completion
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", completion)
+    cache.set("b", completion)
+    cache.get("a")
+    cache.set("c", completion)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_cache_persists(tmp_path):
+    completion = Completions().create(messages=[], model="m", params={"response": "kept"})
+    ResponseCache(tmp_path / "cache.db").set("a", completion)
+    assert ResponseCache(tmp_path / "cache.db").get("a").choices[0].message.content == "kept"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-W", "ignore:Module already imported:pytest.PytestWarning"])
@@ -0,0 +1,64 @@
+import pytest
+from qai.ai.utils import token_utils
+from qai.ai.utils.token_utils import TokenBudget, count_tokens, num_tokens, register_encoding
+
+
+class WordEncoding:
+    """One token per whitespace separated word, counts how often it encodes"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, **kwargs):
+        self.calls += 1
+        return text.split()
+
+
+@pytest.fixture
+def encoding():
+    enc = WordEncoding()
+    register_encoding("words", enc)
+    return enc
+
+
+def test_count_tokens_memoized(encoding):
+    assert count_tokens("a b c", "words") == 3
+    assert count_tokens("a b c", "words") == 3
+    assert count_tokens("", "words") == 0
+    assert encoding.calls == 1
+    assert token_utils.get_encoding("words") is encoding
+
+
+def test_num_tokens_messages(encoding):
+    messages = [{"role": "user", "content": "a b"}, {"role": "assistant", "content": "c"}]
+    ## The joined contents are encoded, as they were before the memo
+    assert num_tokens(messages, "words") == len(encoding.encode("a b\nc")) == 3
+    assert num_tokens(messages, "words") == 3
+    assert num_tokens("a b", "words") == 2
+    assert encoding.calls == 3
+    with pytest.raises(ValueError):
+        num_tokens(3, "words")
+
+
+def test_token_budget(encoding):
+    budget = TokenBudget(limit=5, per_message=1, encoding_name="words")
+    assert budget.try_add("a b")
+    assert budget.used == 3 and budget.remaining == 2
+    assert not budget.fits("c d")
+    assert not budget.try_add("c d")
+    budget.add("c d")
+    assert budget.exceeded
+    assert not TokenBudget(encoding_name="words", used=100).exceeded
+
+
+def test_growing_history_encodes_each_message_once(encoding):
+    history = [f"message {i}" for i in range(50)]
+    budget = TokenBudget(limit=1000, encoding_name="words")
+    for i, text in enumerate(history):
+        budget.add(text)
+        assert budget.used == sum(count_tokens(t, "words") for t in history[: i + 1])
+    assert encoding.calls == 50
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-W", "ignore:Module already imported:pytest.PytestWarning"])
@@ -11,9 +11,10 @@ from llama_index.core.tools import QueryEngineTool, ToolMetadata
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from pi_log import logs
 
-from qai.ai.frameworks.llama.llama_chroma import LlamaChroma, LlamaChromaConfig
+from qai.ai.frameworks.llama.collection_aliases import company_alias
 from qai.ai.frameworks.openai.llm import OpenAILLM
 from qai.chat import VERSION
+from qai.chat.context_pool import ContextPool
 from qai.chat.db.chroma.chroma import Chroma
 
 log = logs.getLogger(__name__)
@@ -24,6 +25,37 @@ def _make_key(user_id: str, company_name: str = None):
     return f"{user_id}:{company_name}"
 
 
+def _make_client(host: str, port: int) -> chromadb.ClientAPI:
+    return chromadb.HttpClient(host=host, port=port)
+
+
+def _build_context(company_name: str, chroma_collection: chromadb.Collection):
+    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+    index = VectorStoreIndex.from_vector_store(
+        vector_store=vector_store,
+    )
+    company_tool = QueryEngineTool(
+        query_engine=index.as_query_engine(similarity_top_k=3),
+        metadata=ToolMetadata(
+            name=f"{company_name}_data",
+            description=(
+                f"Provides information from the {company_name} website. "
+                f"Use a detailed plain text question as input to the tool."
+            ),
+        ),
+    )
+    return index, company_tool
+
+
+## Warm retrieval contexts, so repeat questions about a company skip the client,
+## collection resolution and index setup
+context_pool = ContextPool(
+    make_client=_make_client,
+    resolve=Chroma._get_last_collection,
+    build=_build_context,
+)
+
+
 def company_query(
     query: str,
     user_id: str,
@@ -35,7 +67,7 @@ def company_query(
     chroma_cfg: dict = None,
 ) -> AgentChatResponse:
 
-    collection_name = f"{company_name}_simplified_md"
+    collection_name = company_alias(company_name)
 
     log.debug(
         f"company_name={company_name}, company_id={company_id} col_name={collection_name}",
@@ -47,28 +79,8 @@ def company_query(
 
     model = model or model_cfg.name
 
-    conf = LlamaChromaConfig(host=chroma_cfg.host, port=chroma_cfg.port)
-    c = LlamaChroma(config=conf)
-    chroma_collection = c.get_last_collection(collection_name)
-
-    chroma_client = chromadb.HttpClient(host=chroma_cfg.host, port=chroma_cfg.port)
-    chroma_collection = Chroma._get_last_collection(chroma_client, collection_name)
-    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-    index = VectorStoreIndex.from_vector_store(
-        vector_store=vector_store,
-    )
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
-
-    company_tool = QueryEngineTool(
-        query_engine=index.as_query_engine(similarity_top_k=3),
-        metadata=ToolMetadata(
-            name=f"{company_name}_data",
-            description=(
-                f"Provides information from the {company_name} website. "
-                f"Use a detailed plain text question as input to the tool."
-            ),
-        ),
-    )
+    context = context_pool.get(company_name, collection_name, chroma_cfg.host, chroma_cfg.port)
+    company_tool = context.tool
     key = _make_key(user_id, company_name)
     thread_id_tuple = thread_ids.get(key, None)
     log.debug(f"user_id={user_id} thread_id={thread_id_tuple}", flush=True)
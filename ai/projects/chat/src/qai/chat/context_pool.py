@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from pi_log import logs
+
+log = logs.getLogger(__name__)
+
+
+@dataclass
+class RetrievalContext:
+    """Everything company_query needs to answer from one collection"""
+
+    company_name: str
+    collection: Any
+    index: Any = None
+    tool: Any = None
+    ## When the collection was last checked to still be the latest one
+    checked: float = field(default_factory=time.monotonic)
+
+    @property
+    def collection_name(self) -> str:
+        return self.collection.name
+
+
+class ContextPool:
+    """
+    Warm RetrievalContexts by (host, port, collection prefix), least recently used first out.
+    A context is checked against the latest collection at most every check_interval seconds
+    and rebuilt when a newer timestamped collection has appeared.
+    Clients are shared by all contexts of the same server
+    """
+
+    def __init__(
+        self,
+        make_client: Callable[[str, int], Any],
+        resolve: Callable[[Any, str], Any],
+        build: Callable[[str, Any], tuple[Any, Any]],
+        max_size: int = 32,
+        check_interval: float = 60.0,
+    ):
+        """
+        Args:
+            make_client (Callable): (host, port) -> client
+            resolve (Callable): (client, collection prefix) -> the latest collection
+            build (Callable): (company_name, collection) -> (index, tool)
+            max_size (int): Contexts kept before evicting the least recently used
+            check_interval (float): Seconds a context is used before checking for a newer
+                collection, 0 to check on every get
+        """
+        self.make_client = make_client
+        self.resolve = resolve
+        self.build = build
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._contexts: OrderedDict[tuple, RetrievalContext] = OrderedDict()
+        self._clients: dict[tuple[str, int], Any] = {}
+        self._lock = threading.Lock()
+        ## Builds of different companies run concurrently, those of one company once
+        self._key_locks: dict[tuple, threading.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def client(self, host: str, port: int) -> Any:
+        with self._lock:
+            client = self._clients.get((host, port))
+            if client is None:
+                client = self.make_client(host, port)
+                self._clients[(host, port)] = client
+            return client
+
+    def get(self, company_name: str, prefix: str, host: str, port: int) -> RetrievalContext:
+        """The context of the latest collection starting with prefix, built if needed"""
+        key = (host, port, prefix)
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is not None:
+                self._contexts.move_to_end(key)
+                if time.monotonic() - context.checked < self.check_interval:
+                    return context
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            return self._refresh(key, company_name, prefix)
+
+    def _refresh(self, key: tuple, company_name: str, prefix: str) -> RetrievalContext:
+        context = self._contexts.get(key)
+        if context is not None and time.monotonic() - context.checked < self.check_interval:
+            ## Refreshed by another thread while waiting for the lock
+            return context
+        collection = self.resolve(self.client(*key[:2]), prefix)
+        if context is not None and context.collection_name == collection.name:
+            context.checked = time.monotonic()
+            return context
+        if context is not None:
+            log.debug(
+                f"ContextPool: {context.collection_name} replaced by newer {collection.name}"
+            )
+        index, tool = self.build(company_name, collection)
+        context = RetrievalContext(
+            company_name=company_name, collection=collection, index=index, tool=tool
+        )
+        with self._lock:
+            self._contexts[key] = context
+            self._contexts.move_to_end(key)
+            while len(self._contexts) > self.max_size:
+                evicted, _ = self._contexts.popitem(last=False)
+                self._key_locks.pop(evicted, None)
+        return context
+
+    def invalidate(self, prefix: str = None) -> None:
+        """Drop the contexts of a collection prefix, or all of them"""
+        with self._lock:
+            for key in list(self._contexts):
+                if prefix is None or key[2] == prefix:
+                    del self._contexts[key]
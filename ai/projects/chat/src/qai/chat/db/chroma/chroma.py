@@ -8,6 +8,7 @@ from chromadb.api import AdminAPI, ClientAPI, QueryResult
 from chromadb.api.models.Collection import Collection as ChromaCollection
 from chromadb.config import Settings
 from pi_conf import Config
+from qai.ai.frameworks.llama.collection_aliases import resolve_collection
 
 from qai.chat.db import Retriever
 from qai.chat.prompt.config import CONTEXT_TOKEN_LIMIT
@@ -50,14 +51,7 @@ class Chroma(Retriever):
 
     @staticmethod
     def _get_last_collection(chroma_client: ClientAPI, name: str) -> Collection:
-        collections = chroma_client.list_collections()
-        print("All collections", collections)
-        col_list = [c for c in collections if c.name.startswith(name)]
-        col_list = sorted(col_list, key=lambda x: x.name, reverse=True)
-        print(f"Filtered collections = {col_list}")
-        if len(col_list) == 0:
-            raise ValueError(f"No collections found with name {name}")
-        return col_list[0]
+        return resolve_collection(chroma_client, name)
 
     def get_last_collection(self, name: str) -> Collection:
         return Chroma._get_last_collection(self.chroma_client, name)
@@ -1,9 +1,8 @@
 from enum import StrEnum
-from functools import partial
 from typing import Dict
 
 import pandas as pd
-from qai.ai.utils.nltk_utils import normalize
+from qai.ai.utils.nltk_utils import Normalizer
 
 from qai.chat.layers.fact_table.table import FactTable
 from qai.chat.layers.query import QueryReturn
@@ -48,8 +47,7 @@ def facts_from_csv_file(
 def get_fact_table(fact_file: str, company_name: str = "", type: str = TableType.NORMAL):
     facts = facts_from_csv_file(fact_file, company_name)
     if type == TableType.NORMAL:
-        norm = partial(
-            normalize,
+        norm = Normalizer(
             to_lower=True,
             to_alphanumeric=True,
             use_word_map=False,
@@ -61,11 +59,10 @@ def get_fact_table(fact_file: str, company_name: str = "", type: str = TableType
             tag_pos=False,
         )
 
-        nfacts = {norm(k): v for k, v in facts.items()}
+        nfacts = dict(zip(norm.normalize_many(facts.keys()), facts.values()))
         return FactTable("FactTable:normal", fact_table=nfacts, preprocessing_functions=[norm])
     if type == TableType.NORMALIZED:
-        norm = partial(
-            normalize,
+        norm = Normalizer(
             to_lower=True,
             to_alphanumeric=True,
             use_word_map=True,
@@ -77,11 +74,10 @@ def get_fact_table(fact_file: str, company_name: str = "", type: str = TableType
             tag_pos=True,
         )
 
-        nfacts = {norm(k): v for k, v in facts.items()}
+        nfacts = dict(zip(norm.normalize_many(facts.keys()), facts.values()))
         return FactTable("FactTable:normalized", fact_table=nfacts, preprocessing_functions=[norm])
     if type == TableType.STEM:
-        norm = partial(
-            normalize,
+        norm = Normalizer(
             to_lower=True,
             to_alphanumeric=True,
             use_word_map=True,
@@ -93,6 +89,6 @@ def get_fact_table(fact_file: str, company_name: str = "", type: str = TableType
             tag_pos=True,
         )
 
-        nfacts = {norm(k): v for k, v in facts.items()}
+        nfacts = dict(zip(norm.normalize_many(facts.keys()), facts.values()))
         return FactTable("FactTable:stemmed", fact_table=nfacts, preprocessing_functions=[norm])
     raise ValueError(f"Unknown table type {type}")
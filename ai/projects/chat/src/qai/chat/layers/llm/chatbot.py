@@ -14,6 +14,7 @@ import requests
 from dotenv import load_dotenv
 from openai import OpenAI
 from openai.types.chat import ChatCompletion
+from qai.ai.frameworks.openai.client import get_client
 try:
     from termcolor import colored
 except ImportError:
@@ -66,6 +67,7 @@ def pretty_print_conversation(messages):
 @dataclass(kw_only=True)
 class LLM:
     config: dict[str, Any]
+    client: OpenAI = None
 
     def __post_init__(self):
         if self.config is None:
@@ -77,6 +79,11 @@ class LLM:
     def model(self):
         return self.config.get("name")
 
+    def _get_client(self) -> OpenAI:
+        if self.client is None:
+            self.client = get_client()
+        return self.client
+
     def simple_query(
         self,
         query: str = None,
@@ -105,7 +112,7 @@ class LLM:
         #     model=model, temperature=temperature, messages=messages, **kwargs
         # )
 
-        client = OpenAI()
+        client = self._get_client()
         completion = client.chat.completions.create(
             model=model,
             temperature=temperature,
@@ -139,7 +146,7 @@ class LLM:
         )
         qp = kwargs.get("query_params", {})
         temperature = qp.get("temperature", self.config["temperature"])
-        client = OpenAI()
+        client = self._get_client()
         completion = client.chat.completions.create(
             model=model, temperature=temperature, messages=messages, **kwargs
         )
@@ -4,7 +4,7 @@ import os
 from dataclasses import dataclass, field
 from typing import Any
 
-from qai.ai.utils.token_utils import num_tokens
+from qai.ai.utils.token_utils import TokenBudget
 
 from qai.chat.db import Retriever, get_retriever
 from qai.chat.layers.query import Query
@@ -91,6 +91,8 @@ class PromptMaker:
     ) -> list[dict[str, str]]:
         messages = []
         hist_check = collections.defaultdict(set)
+        ## Each message also takes about one token for its role and one for its separator
+        budget = TokenBudget(limit=history_token_limit, per_message=2)
         for i, msg in enumerate(reversed(chat_history)):
             if i >= history_limit:
                 break
@@ -101,8 +103,8 @@ class PromptMaker:
             hist_check[role].add(text)
 
             messages.insert(0, {"role": role, "content": text})
-            token_estimate = num_tokens(messages) + len(messages)
-            if history_token_limit and token_estimate > history_token_limit:
+            budget.add(text)
+            if budget.exceeded:
                 break
         return messages
 
@@ -133,7 +135,6 @@ class PromptMaker:
         # srcs = [os.path.basename(s["source"]) for s in srcs]
         # docs = result["documents"][0]
         # distances = result["distances"][0]
-        total_tokens = 0
         # if self.index is None and USE_LOCAL_INDEX:
         #     self.index = LLamaIndex.get_or_create_index(
         #         db_location=db_location,
@@ -152,11 +153,12 @@ class PromptMaker:
             text = n.get_text()
             sources[text] = meta
 
+        budget = TokenBudget(limit=context_token_limit)
         for text, meta in sources.items():
-            token_estimate = num_tokens(text)
+            token_estimate = budget.cost(text)
             log.debug(f"fpath {text} token_estimate = {token_estimate}")
             # print(f"fpath {wf} token_estimate = {token_estimate}")
-            if total_tokens + token_estimate > context_token_limit:
+            if not budget.try_add(text):
                 break
             d = {
                 "role": "user",
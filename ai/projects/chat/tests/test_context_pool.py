@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+
+import pytest
+
+from qai.chat.context_pool import ContextPool
+
+
+@dataclass
+class Collection:
+    name: str
+
+
+class Server:
+    def __init__(self):
+        self.collections = ["acme_simplified_md.20240101"]
+        self.resolves = 0
+        self.builds = 0
+        self.clients = 0
+
+    def make_client(self, host, port):
+        self.clients += 1
+        return self
+
+    def resolve(self, client, prefix):
+        self.resolves += 1
+        return Collection(max(c for c in self.collections if c.startswith(prefix)))
+
+    def build(self, company_name, collection):
+        self.builds += 1
+        return f"index:{collection.name}", f"tool:{company_name}"
+
+
+def make_pool(server, **kwargs):
+    return ContextPool(server.make_client, server.resolve, server.build, **kwargs)
+
+
+def test_reuses_context():
+    server = Server()
+    pool = make_pool(server)
+    context = pool.get("acme", "acme_simplified_md", "localhost", 8000)
+    assert context.tool == "tool:acme"
+    assert pool.get("acme", "acme_simplified_md", "localhost", 8000) is context
+    assert (server.clients, server.resolves, server.builds) == (1, 1, 1)
+
+
+def test_newer_collection_rebuilds():
+    server = Server()
+    pool = make_pool(server, check_interval=0)
+    first = pool.get("acme", "acme_simplified_md", "localhost", 8000)
+    assert pool.get("acme", "acme_simplified_md", "localhost", 8000) is first
+    assert server.builds == 1
+
+    server.collections.append("acme_simplified_md.20240202")
+    second = pool.get("acme", "acme_simplified_md", "localhost", 8000)
+    assert second.collection_name == "acme_simplified_md.20240202"
+    assert second.index == "index:acme_simplified_md.20240202"
+    assert server.builds == 2
+
+
+def test_lru_eviction_and_invalidate():
+    server = Server()
+    server.collections += ["b_simplified_md.1", "c_simplified_md.1"]
+    pool = make_pool(server, max_size=2)
+    for name in ["acme", "b", "acme", "c"]:
+        pool.get(name, f"{name}_simplified_md", "localhost", 8000)
+    assert len(pool) == 2
+    assert server.builds == 3
+    pool.get("acme", "acme_simplified_md", "localhost", 8000)
+    assert server.builds == 3
+    pool.get("b", "b_simplified_md", "localhost", 8000)
+    assert server.builds == 4
+
+    pool.invalidate("b_simplified_md")
+    pool.get("b", "b_simplified_md", "localhost", 8000)
+    assert server.builds == 5
+    assert server.clients == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
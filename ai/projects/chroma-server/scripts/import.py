@@ -2,10 +2,14 @@ import glob
 import os
 from threading import Event, Thread
 
+import boto3
 import chromadb
-from llama_chroma import ChromaType, EmbeddingName, import_website, make_client
+from llama_chroma import ChromaType, import_website, make_client, set_alias
+from manifest import Manifest, Snapshot, list_snapshots
 from pi_conf import load_config
-from s3_utils import download_all
+from qai.ai.frameworks.llama.collection_aliases import SIMPLIFIED_MD, company_alias
+from qai.ai.frameworks.llama.embeddings import EmbeddingName
+from s3_utils import download_all, download_objects
 
 cfg = load_config("chroma-server")
 cfg.to_env()
@@ -20,8 +24,10 @@ INITIAL_WAIT_TIME = 1
 SUBSEQUENT_WAIT_TIME = 60 * 15  # 15 minutes
 WEBSITE_PREFIX = "/websites/"
 BUCKET_NAME = "qrev-website-storage"
-SUBDIR = "simplified_md"
+SUBDIR = SIMPLIFIED_MD
 EMBED_MODEL = EmbeddingName.hf_bge_small_en_v1_5
+MANIFEST_PATH = os.path.join(LOCAL_WEBDIR, ".import_manifest.json")
+EMBEDDING_CACHE_DIR = os.path.join(LOCAL_WEBDIR, ".embedding_cache")
 
 
 def get_last(names: list[str]) -> str:
@@ -30,6 +36,10 @@ def get_last(names: list[str]) -> str:
     return col_list[0]
 
 
+def make_alias(company: str) -> str:
+    return company_alias(company, SUBDIR)
+
+
 def make_collection_name(company: str, time_path: str) -> str:
     company = os.path.basename(company)
     timestr = os.path.basename(time_path)
@@ -48,14 +58,101 @@ def import_all(
             col_name = make_collection_name(company, time_path)
             try:
                 col: chromadb.Collection = chroma_client.get_collection(col_name)
-                print(f"Collection {col_name} exists, skipping. count={col.count()}", flush=True)
-                continue
             except:
                 print(
                     "Collection does not exist and this is fine. Ignore previous error", flush=True
                 )
+            else:
+                print(f"Collection {col_name} exists, skipping. count={col.count()}", flush=True)
+                set_alias(chroma_client, make_alias(company), col_name)
+                continue
             import_path = os.path.join(time_path, SUBDIR)
-            import_website(chroma_client, company, import_path, col_name, embed_model=EMBED_MODEL)
+            import_website(
+                chroma_client,
+                company,
+                import_path,
+                col_name,
+                embed_model=EMBED_MODEL,
+                embedding_cache_dir=EMBEDDING_CACHE_DIR,
+            )
+            ## Only once the import succeeded, readers never see a partial collection
+            set_alias(chroma_client, make_alias(company), col_name)
+
+
+def collection_exists(chroma_client, col_name: str) -> bool:
+    try:
+        chroma_client.get_collection(col_name)
+    except Exception:
+        return False
+    return True
+
+
+def download_snapshot(boto_client, snapshot: Snapshot, webdir: str) -> str:
+    """Make the local copy of the snapshot match the objects in the bucket"""
+    subdir_path = os.path.join(webdir, snapshot.company, snapshot.timestamp, SUBDIR)
+    objects = [
+        (key, os.path.join(webdir, os.path.relpath(key, WEBSITE_PREFIX)), size, etag, None)
+        for key, etag, size in snapshot.objects
+    ]
+    ## Files deleted from the bucket must not be imported again
+    targets = {os.path.normpath(o[1]) for o in objects}
+    for path in glob.glob(f"{subdir_path}/**", recursive=True):
+        if os.path.isfile(path) and os.path.normpath(path) not in targets:
+            os.remove(path)
+    download_objects(BUCKET_NAME, objects, client=boto_client)
+    return subdir_path
+
+
+def sync_and_import(
+    host: str = None,
+    port: int = None,
+    type: ChromaType = ChromaType.HTTP,
+    webdir: str = None,
+    manifest_path: str = MANIFEST_PATH,
+) -> list[Snapshot]:
+    """
+    Import the snapshots that are new or changed since they were recorded in the manifest.
+    An idle cycle is one paginated listing of the bucket, nothing is downloaded
+    """
+    boto_client = boto3.client("s3")
+    manifest = Manifest(manifest_path)
+    snapshots = list_snapshots(boto_client, BUCKET_NAME, WEBSITE_PREFIX, subdir=SUBDIR)
+    changed = manifest.diff(snapshots)
+    print(f"{len(snapshots)} snapshots, {len(changed)} new or changed", flush=True)
+    if not changed:
+        return []
+    chroma_client = make_client(host, port, type)
+    imported = []
+    for snapshot in changed:
+        time_path = os.path.join(webdir, snapshot.company, snapshot.timestamp)
+        col_name = make_collection_name(snapshot.company, time_path)
+        alias = make_alias(snapshot.company)
+        try:
+            if snapshot not in manifest and collection_exists(chroma_client, col_name):
+                ## Imported before there was a manifest
+                print(f"Collection {col_name} exists, recording it", flush=True)
+                set_alias(chroma_client, alias, col_name)
+                manifest.record(snapshot, col_name)
+                continue
+            if snapshot in manifest:
+                print(f"Snapshot {snapshot.name} changed, reimporting {col_name}", flush=True)
+                if collection_exists(chroma_client, col_name):
+                    chroma_client.delete_collection(col_name)
+            import_path = download_snapshot(boto_client, snapshot, webdir)
+            import_website(
+                chroma_client,
+                snapshot.company,
+                import_path,
+                col_name,
+                embed_model=EMBED_MODEL,
+                embedding_cache_dir=EMBEDDING_CACHE_DIR,
+            )
+            set_alias(chroma_client, alias, col_name)
+            manifest.record(snapshot, col_name)
+            imported.append(snapshot)
+        except Exception as e:
+            print(f"Error importing snapshot={snapshot.name}", e, flush=True)
+    return imported
 
 
 class MyThread(Thread):
@@ -76,12 +173,11 @@ class MyThread(Thread):
                 print("Importing")
                 # call a function
                 self.importing.set()
-                download_all(bucket_name, WEBSITE_PREFIX, LOCAL_WEBDIR)
-                import_all(host=HOST, port=PORT, type=ChromaType.HTTP, webdir=LOCAL_WEBDIR)
-
-                self.importing.clear()
+                sync_and_import(host=HOST, port=PORT, type=ChromaType.HTTP, webdir=LOCAL_WEBDIR)
             except Exception as e:
                 print(f"Error importing", e, flush=True)
+            finally:
+                self.importing.clear()
 
 
 importingFlag = Event()
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Snapshot:
+    """The objects of one <prefix><company>/<timestamp>/<subdir>/ folder in the bucket"""
+
+    company: str
+    timestamp: str
+    ## (key, ETag, size) of every object
+    objects: list[tuple[str, str, int]] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f"{self.company}/{self.timestamp}"
+
+    @property
+    def content_hash(self) -> str:
+        h = hashlib.sha256()
+        for key, etag, size in sorted(self.objects):
+            h.update(f"{key}\t{etag}\t{size}\n".encode("utf-8"))
+        return h.hexdigest()
+
+
+def list_snapshots(
+    boto_client, bucket_name: str, prefix: str, subdir: str = None
+) -> dict[str, Snapshot]:
+    """
+    All snapshots under prefix from one paginated listing of the bucket.
+    Args:
+        boto_client: A boto3 s3 client
+        prefix (str): e.g. "/websites/", with the trailing /
+        subdir (str): Only list objects in this folder of each snapshot, e.g. "simplified_md"
+    Returns:
+        dict: Snapshots by name ("<company>/<timestamp>")
+    """
+    snapshots: dict[str, Snapshot] = {}
+    paginator = boto_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for o in page.get("Contents", []):
+            key = o["Key"]
+            parts = key[len(prefix) :].split("/")
+            ## company/timestamp/<subdir>/file, folder markers end with /
+            if len(parts) < 3 or not parts[-1]:
+                continue
+            if subdir is not None and parts[2] != subdir:
+                continue
+            company, timestamp = parts[0], parts[1]
+            name = f"{company}/{timestamp}"
+            if name not in snapshots:
+                snapshots[name] = Snapshot(company, timestamp)
+            snapshots[name].objects.append((key, o.get("ETag", ""), o.get("Size", 0)))
+    return snapshots
+
+
+class Manifest:
+    """
+    Snapshots that were imported, kept in a json file of
+    {"<company>/<timestamp>": {"hash": content_hash, "collection": collection_name}}
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self.entries: dict[str, dict[str, str]] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def __contains__(self, snapshot: Snapshot) -> bool:
+        return snapshot.name in self.entries
+
+    def is_current(self, snapshot: Snapshot) -> bool:
+        entry = self.entries.get(snapshot.name)
+        return entry is not None and entry["hash"] == snapshot.content_hash
+
+    def diff(self, snapshots: dict[str, Snapshot]) -> list[Snapshot]:
+        """The new or changed snapshots, oldest first per company"""
+        changed = [s for s in snapshots.values() if not self.is_current(s)]
+        return sorted(changed, key=lambda s: (s.company, s.timestamp))
+
+    def record(self, snapshot: Snapshot, collection_name: str) -> None:
+        """Mark snapshot as imported and save, so an interrupted run keeps its progress"""
+        self.entries[snapshot.name] = {
+            "hash": snapshot.content_hash,
+            "collection": collection_name,
+        }
+        self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -1,10 +1,15 @@
+import hashlib
 import os
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from operator import attrgetter
 
 import boto3
 
+## Concurrent downloads
+MAX_WORKERS = 16
+
 S3Obj = namedtuple("S3Obj", ["key", "mtime", "size", "ETag"])
 
 
@@ -127,33 +132,99 @@ def __prev_str(s):
     return s
 
 
-def download_dir(bucket: str | object, s3_folder, dest_dir=None):
+def _is_unchanged(path: str, size: int, etag: str, mtime: float = None) -> bool:
+    """Same size and mtime (set by download), or same md5 for single part ETags"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if stat.st_size != size:
+        return False
+    if mtime is not None and int(stat.st_mtime) == int(mtime):
+        return True
+    etag = (etag or "").strip('"')
+    if not etag or "-" in etag:
+        return False
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest() == etag
+
+
+def download_objects(
+    bucket_name: str,
+    objects: list[tuple[str, str, int, str, float]],
+    max_workers: int = MAX_WORKERS,
+    client=None,
+) -> int:
+    """
+    Download objects with a bounded thread pool, skipping files that are unchanged locally.
+    Like qai.storage's TransferManager, a failed file doesn't stop the others, the
+    failures are raised together once every download ran
+    Args:
+        objects: (key, target, size, ETag, mtime) of each object, mtime may be None
+    Returns:
+        the number of files downloaded
+    """
+    client = client or boto3.client("s3")
+    todo = [o for o in objects if not _is_unchanged(o[1], o[2], o[3], o[4])]
+
+    def download(o):
+        key, target, _, _, mtime = o
+        try:
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            client.download_file(bucket_name, key, target)
+            if mtime is not None:
+                os.utime(target, (mtime, mtime))
+        except Exception as e:
+            return key, str(e)
+        return key, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        failed = {key: error for key, error in executor.map(download, todo) if error}
+    if failed:
+        examples = ", ".join(f"{k}: {e}" for k, e in list(failed.items())[:5])
+        raise RuntimeError(f"{len(failed)} of {len(todo)} downloads failed, e.g. {examples}")
+    return len(todo)
+
+
+def list_prefixes(client, bucket_name: str, prefix: str) -> list[str]:
+    """The "folders" directly under prefix, from all pages of the listing"""
+    names = []
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, Delimiter="/"):
+        for o in page.get("CommonPrefixes", []):
+            names.append(o.get("Prefix").replace(prefix, "").strip("/"))
+    return names
+
+
+def download_dir(bucket: str | object, s3_folder, dest_dir=None, max_workers=MAX_WORKERS):
     """
-    From: https://stackoverflow.com/questions/49772151/download-a-folder-from-s3-using-boto3
-    Download the contents of a folder directory
+    Download the contents of a folder directory in parallel, skipping unchanged files
     Args:
         bucket_name: the name of the s3 bucket
         s3_folder: the folder path in the s3 bucket
         dest_dir: a relative or absolute directory path in the local file system
     """
-    if isinstance(bucket, str):
-        s3 = boto3.resource("s3")
-        bucket = s3.Bucket(bucket)
+    bucket_name = bucket if isinstance(bucket, str) else bucket.name
     if dest_dir is not None:
         dest_dir = os.path.expanduser(dest_dir)
-    s3 = boto3.resource("s3")
+    client = boto3.client("s3")
     print(f"Downloading {s3_folder} to {dest_dir}", flush=True)
-    for obj in bucket.objects.filter(Prefix=s3_folder):
-        target = (
-            obj.key
-            if dest_dir is None
-            else os.path.join(dest_dir, os.path.relpath(obj.key, s3_folder))
-        )
-        if not os.path.exists(os.path.dirname(target)):
-            os.makedirs(os.path.dirname(target))
-        if obj.key[-1] == "/":
-            continue
-        bucket.download_file(obj.key, target)
+    objects = []
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=s3_folder):
+        for o in page.get("Contents", []):
+            key = o["Key"]
+            if key[-1] == "/":
+                continue
+            target = (
+                key if dest_dir is None else os.path.join(dest_dir, os.path.relpath(key, s3_folder))
+            )
+            objects.append((key, target, o["Size"], o["ETag"], o["LastModified"].timestamp()))
+    n = download_objects(bucket_name, objects, max_workers=max_workers, client=client)
+    print(f"Downloaded {n}/{len(objects)} changed files of {s3_folder}", flush=True)
 
 
 @dataclass
@@ -168,13 +239,7 @@ def download_company(bucket_name: str, webdir: str, company: str, boto_client) -
     os.makedirs(company_path, exist_ok=True)
 
     prefix = f"/websites/{company}/"
-    result = boto_client.list_objects(Bucket=bucket_name, Prefix=prefix, Delimiter="/")
-    print("result=", result)
-    times = []
-    for o in result.get("CommonPrefixes"):
-        print("sub folder : ", o.get("Prefix"), o)
-        name = o.get("Prefix").replace(prefix, "").strip("/")
-        times.append(name)
+    times = list_prefixes(boto_client, bucket_name, prefix)
     print("Times", times)
     exists = []
     downloaded: list[Company] = []
@@ -184,25 +249,19 @@ def download_company(bucket_name: str, webdir: str, company: str, boto_client) -
         if not os.path.exists(time_path):
             print(f"Downloading {company}_{t} to {time_path}", flush=True)
             download_dir(bucket_name, f"/websites/{company}/{t}", time_path)
-            company = Company(time_path, company, False)
+            downloaded.append(Company(time_path, company, False))
         else:
             print(f"Skipping download of {company}_{t} as it exists at '{time_path}'", flush=True)
             exists.append(t)
-            company = Company(time_path, company, True)
-        downloaded.append(company)
+            downloaded.append(Company(time_path, company, True))
     print(f"    {company} {exists}", flush=True)
     return downloaded
 
 
 def download_all(bucket_name: str, prefix: str, webdir: str) -> list[str]:
     client = boto3.client("s3")
-    company_names = []
     # Make sure you provide / in the end
-    result = client.list_objects(Bucket=bucket_name, Prefix=prefix, Delimiter="/")
-    for o in result.get("CommonPrefixes"):
-        # print("sub folder : ", o.get("Prefix"), o)
-        name = o.get("Prefix").replace(prefix, "").strip("/")
-        company_names.append(name)
+    company_names = list_prefixes(client, bucket_name, prefix)
     print(f"Download companies={company_names}", flush=True)
     companies: list[Company] = []
     for company_name in company_names:
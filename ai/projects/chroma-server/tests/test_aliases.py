@@ -0,0 +1,33 @@
+import os
+import sys
+
+import chromadb
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from llama_chroma import set_alias  # noqa: E402
+from qai.ai.frameworks.llama.collection_aliases import (  # noqa: E402
+    company_alias,
+    resolve_collection,
+)
+
+
+@pytest.fixture
+def client():
+    client = chromadb.EphemeralClient()
+    yield client
+    for c in client.list_collections():
+        client.delete_collection(c.name)
+
+
+def test_reader_resolves_importer_alias(client):
+    ## Named as import.make_collection_name does, the reader only knows the company name
+    old = client.create_collection("acme.simplified_md.20240101.hf_v1_5")
+    new = client.create_collection("acme.simplified_md.20240202.hf_v1_5")
+    assert set_alias(client, company_alias("/root/websites/acme"), new.name)
+    assert not set_alias(client, company_alias("acme"), old.name)
+
+    ## Another collection sorting later than the alias is not served until it is aliased
+    client.create_collection("acme.simplified_md.20240303.hf_v1_5")
+    assert resolve_collection(client, company_alias("acme")).name == new.name
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from manifest import Manifest, list_snapshots  # noqa: E402
+
+
+class FakePaginator:
+    def __init__(self, objects: list[dict], page_size: int):
+        self.objects = objects
+        self.page_size = page_size
+        self.calls = 0
+
+    def paginate(self, Bucket: str, Prefix: str):
+        self.calls += 1
+        objects = [o for o in self.objects if o["Key"].startswith(Prefix)]
+        for i in range(0, len(objects), self.page_size):
+            yield {"Contents": objects[i : i + self.page_size]}
+
+
+class FakeClient:
+    def __init__(self, objects: list[dict], page_size: int = 2):
+        self.paginator = FakePaginator(objects, page_size)
+
+    def get_paginator(self, name: str):
+        assert name == "list_objects_v2"
+        return self.paginator
+
+
+def obj(key: str, etag: str = "e1", size: int = 1) -> dict:
+    return {"Key": key, "ETag": etag, "Size": size}
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "manifest.json")
+        self.objects = [
+            obj("/websites/acme/2024/simplified_md/a.md"),
+            obj("/websites/acme/2024/simplified_md/b.md"),
+            obj("/websites/acme/2024/raw/a.html"),
+            obj("/websites/acme/2024/simplified_md/"),
+            obj("/websites/beta/2023/simplified_md/a.md"),
+        ]
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_list_snapshots(self):
+        client = FakeClient(self.objects)
+        snapshots = list_snapshots(client, "bucket", "/websites/", subdir="simplified_md")
+        self.assertEqual(sorted(snapshots), ["acme/2024", "beta/2023"])
+        self.assertEqual(len(snapshots["acme/2024"].objects), 2)
+        self.assertEqual(client.paginator.calls, 1)
+
+    def test_diff(self):
+        client = FakeClient(self.objects)
+        snapshots = list_snapshots(client, "bucket", "/websites/", subdir="simplified_md")
+        manifest = Manifest(self.path)
+        self.assertEqual([s.name for s in manifest.diff(snapshots)], ["acme/2024", "beta/2023"])
+        for s in snapshots.values():
+            manifest.record(s, f"{s.company}.col")
+
+        ## Idle cycle
+        manifest = Manifest(self.path)
+        self.assertEqual(manifest.diff(snapshots), [])
+
+        ## A changed object and a new snapshot
+        self.objects[1] = obj("/websites/acme/2024/simplified_md/b.md", etag="e2")
+        self.objects.append(obj("/websites/beta/2024/simplified_md/a.md"))
+        snapshots = list_snapshots(FakeClient(self.objects), "bucket", "/websites/", "simplified_md")
+        changed = manifest.diff(snapshots)
+        self.assertEqual([s.name for s in changed], ["acme/2024", "beta/2024"])
+        self.assertIn(changed[0], manifest)
+        self.assertNotIn(changed[1], manifest)
+
+
+if __name__ == "__main__":
+    unittest.main()
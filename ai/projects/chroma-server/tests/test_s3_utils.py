@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from s3_utils import download_objects  # noqa: E402
+
+
+class FlakyClient:
+    def __init__(self, failing: set[str]):
+        self.failing = failing
+        self.keys = []
+
+    def download_file(self, Bucket: str, Key: str, Filename: str):
+        self.keys.append(Key)
+        if Key in self.failing:
+            raise OSError("disk full")
+        with open(Filename, "w") as f:
+            f.write(Key)
+
+
+class TestDownloadObjects(unittest.TestCase):
+    def test_failures_raise_after_the_other_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            objects = [(f"k{i}", os.path.join(tmp, f"k{i}"), 2, "", None) for i in range(5)]
+            client = FlakyClient({"k1"})
+            with self.assertRaisesRegex(RuntimeError, "1 of 5 downloads failed"):
+                download_objects("b", objects, max_workers=2, client=client)
+            self.assertEqual(sorted(client.keys), ["k0", "k1", "k2", "k3", "k4"])
+            self.assertTrue(os.path.exists(os.path.join(tmp, "k4")))
+
+
+if __name__ == "__main__":
+    unittest.main()
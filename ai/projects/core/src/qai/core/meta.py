@@ -8,7 +8,7 @@ from datetime import datetime, timezone
 from enum import StrEnum
 from importlib import import_module
 from pathlib import Path, PurePath
-from typing import Any, Dict, List, Optional, Self, TextIO, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Self, TextIO, Type, Union
 from uuid import UUID, uuid4
 
 from pydantic import (
@@ -20,7 +20,10 @@ from pydantic import (
     field_validator,
     model_validator,
 )
+from pydantic_core import to_jsonable_python
 
+from qai.core.meta_index import MetaIndex
+from qai.core.meta_journal import MetaJournal
 from qai.core.utils.class_utils import get_full_class_name
 
 sentinel = object()
@@ -107,10 +110,41 @@ class MetaBase(BaseModel):
         else:
             raise ValueError(f"Unknown class type: {class_name}")
 
+    def _root(self) -> Optional["Meta"]:
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node if isinstance(node, Meta) else None
+
+    def _record(self, make_entry: Callable[[], dict[str, Any]]):
+        """Record a mutation in the journal of the root Meta, if journaling is enabled"""
+        root = self._root()
+        if root is not None and root._journal is not None:
+            root._journal.record(make_entry)
+
+    def _index_add(self, node: "MetaBase"):
+        """Add the node to the index of the root Meta, if the index is built"""
+        root = self._root()
+        if root is not None and root._index is not None:
+            root._index.add(node)
+
+    def _index_invalidate(self):
+        root = self._root()
+        if root is not None:
+            root._index = None
+
     def add_metadata(self, key: str, value: Any):
         if not self.metadata:
             self.metadata = {}
         self.metadata[key] = value
+        self._record(
+            lambda: {
+                "op": "set_metadata",
+                "id": str(self.id),
+                "key": key,
+                "value": to_jsonable_python(self.metadata.get(key), exclude_none=True),
+            }
+        )
 
     def add_origin(self, origin: "MetaBase") -> UUID:
         """
@@ -132,6 +166,7 @@ class MetaBase(BaseModel):
         if not self._origins:
             self._origins = []
         self._origins.append(origin)
+        self._record(lambda: {"op": "add_origin", "id": str(self.id), "origin_id": str(origin.id)})
         return origin.id
 
     def get_sources(self, depth: SearchDepth = SearchDepth.all) -> Iterator["MetaBase"]:
@@ -241,6 +276,7 @@ class MetaDir(MetaPath):
     _is_dir: bool = True
 
     def _populate_from_directory(self):
+        self._index_invalidate()
         self.files = []
         self.directories = []
         for item in self.path.iterdir():
@@ -256,11 +292,49 @@ class MetaDir(MetaPath):
         file.parent_id = self.id
         file._parent = self
         self.files.append(file)
+        self._index_add(file)
+        self._record(
+            lambda: {
+                "op": "add_file",
+                "parent_id": str(self.id),
+                "node": file.model_dump(exclude_none=True, mode="json"),
+            }
+        )
 
     def add_dir(self, directory: "MetaDir"):
         directory.parent_id = self.id
         directory._parent = self
         self.directories.append(directory)
+        self._index_add(directory)
+        self._record(
+            lambda: {
+                "op": "add_dir",
+                "parent_id": str(self.id),
+                "node": directory.model_dump(exclude_none=True, mode="json"),
+            }
+        )
+
+    def remove(self, node: MetaPath):
+        """
+        Remove a direct child file or directory from this directory
+        Args:
+            node (MetaPath): The file or directory to remove
+        """
+        ## Compare by identity, model equality compares whole subtrees
+        children = self.files if node.is_file else self.directories
+        for i, child in enumerate(children):
+            if child is node:
+                break
+        else:
+            raise ValueError(f"{node} is not in {self}")
+        root = self._root()
+        if root is not None and root._index is not None:
+            root._index.remove(node)
+        del children[i]
+        node._parent = None
+        node.parent_id = None
+        if root is not None and root._journal is not None:
+            root._journal.record(lambda: {"op": "remove", "id": str(node.id)})
 
     def get_files(self, recursive: bool = True) -> Iterator[MetaFile]:
         """
@@ -296,6 +370,35 @@ class MetaDir(MetaPath):
         is_file: bool = True,
         is_dir: bool = True,
     ) -> "MetaPath":
+        """
+        Get a file or directory by its name, or its path relative to its parent.
+        Searches this level first, then the subdirectories depth first
+        Args:
+            name (str): The name or relative path
+            default (Any): Returned if not found, otherwise a ValueError is raised
+            recursive (bool): Whether to search subdirectories
+        """
+        root = self._root()
+        if root is not None:
+            result = root._get_index().find(
+                self, name, recursive=recursive, is_file=is_file, is_dir=is_dir
+            )
+            if result is not None:
+                return result
+            if default is not sentinel:
+                return default
+            raise ValueError(f"File not found: {name}")
+        return self._scan(name, default=default, recursive=recursive, is_file=is_file, is_dir=is_dir)
+
+    def _scan(
+        self,
+        name: str,
+        default: Any = sentinel,
+        recursive: bool = True,
+        is_file: bool = True,
+        is_dir: bool = True,
+    ) -> "MetaPath":
+        """Linear search of the tree, used for directories not attached to a Meta"""
         # Helper function to match the conditions
         def matches(meta: MetaPath, name: str) -> bool:
 
@@ -327,7 +430,7 @@ class MetaDir(MetaPath):
         # If recursive, search in subdirectories
         if recursive and self.directories:
             for directory in self.directories:
-                result = directory.get(
+                result = directory._scan(
                     name,
                     default=None,
                     recursive=recursive,
@@ -344,25 +447,32 @@ class MetaDir(MetaPath):
 
     def get_by_path(
         self,
-        path: str | list,
+        path: str | Path,
         default: Any = sentinel,
         is_file: bool = True,
     ) -> "MetaPath":
-        raise NotImplementedError("This method is not yet implemented")
-        if isinstance(path, str):
-            path = PurePath(path).parts
-        g = self
-        full_name = ""
-        for p in path:
-            full_name = os.path.join(full_name, p)
-            g = g.get(full_name, is_file=is_file, is_dir=not is_file, default=None)
-            if g is None:
-                if default != sentinel:
-                    return default
-                raise ValueError(
-                    f"Group {path} could not be found. Group {p} does not exist in {g}"
-                )
-        return g
+        """
+        Get a file or directory below this directory by its path
+        Args:
+            path (str | Path): Absolute path, or a path relative to this directory
+            default (Any): Returned if not found, otherwise a ValueError is raised
+            is_file (bool): Whether to look for a file (True) or a directory (False)
+        """
+        path = Path(path)
+        if not path.is_absolute() and self.path:
+            path = self.path / path
+        root = self._root()
+        if root is not None:
+            node = root._get_index().by_path.get(path)
+            if node is not None and node is not self and not MetaIndex._is_below(self, node):
+                node = None
+        else:
+            node = next((n for n in self.get_all(recursive=True) if n.path == path), None)
+        if node is not None and node.is_file == is_file:
+            return node
+        if default is not sentinel:
+            return default
+        raise ValueError(f"Path not found: {path}")
 
     def get_dir(
         self,
@@ -377,7 +487,7 @@ class MetaDir(MetaPath):
         except ValueError:
             if create:
                 new_dir = MetaDir(path=self.path / name, _parent=self, parent_id=self.id)
-                self.directories.append(new_dir)
+                self.add_dir(new_dir)
                 return new_dir
             raise
 
@@ -394,7 +504,7 @@ class MetaDir(MetaPath):
         except ValueError:
             if create:
                 new_file = MetaFile(path=self.path / name, _parent=self, parent_id=self.id)
-                self.files.append(new_file)
+                self.add_file(new_file)
                 return new_file
             raise
 
@@ -426,12 +536,44 @@ class Meta(MetaDir):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     _metafile_location: Optional[Path] = None
+    _journal: Optional[MetaJournal] = None
+    _index: Optional[MetaIndex] = None
 
     def set_save_location(self, location: Path):
         self._metafile_location = location
 
+    def _get_index(self) -> MetaIndex:
+        """The lookup index of the tree, built on first use and kept up to date on add/remove"""
+        if self._index is None:
+            index = MetaIndex()
+            index.by_id[self.id] = self
+            for meta in self.metas or []:
+                index.add(meta)
+            for meta in self.get_all(recursive=True):
+                index.add(meta)
+            self._index = index
+        return self._index
+
+    def get_by_id(self, id: UUID | str, default: Any = sentinel) -> MetaBase:
+        """
+        Get any node of the tree, including metas, by its id
+        """
+        if isinstance(id, str):
+            id = UUID(id)
+        node = self._get_index().by_id.get(id)
+        if node is not None:
+            return node
+        if default is not sentinel:
+            return default
+        raise ValueError(f"Id not found: {id}")
+
     def add_meta(self, meta: MetaBase):
         self.metas.append(meta)
+        if self._index is not None:
+            self._index.add(meta)
+        self._record(
+            lambda: {"op": "add_meta", "node": meta.model_dump(exclude_none=True, mode="json")}
+        )
 
     @classmethod
     def create_from_directory(cls, directory: Path) -> "Meta":
@@ -449,34 +591,123 @@ class Meta(MetaDir):
         meta_root._populate_from_directory()
         return meta_root
 
+    def _resolve_dest(self, dest: str | Path = sentinel) -> Path:
+        if dest == sentinel and self._metafile_location:
+            dest = self._metafile_location
+        elif dest == sentinel:
+            dest = "metadata.json"
+        return Path(dest)
+
+    def _write_snapshot(self, dest: Path, indent: int = 2):
+        if not dest.parent.exists():
+            dest.parent.mkdir(parents=True)
+        ## Create a temporary file next to the destination, then atomically move it
+        with tempfile.NamedTemporaryFile("w", dir=dest.parent, delete=False) as f:
+            json.dump(self.model_dump(exclude_none=True, mode="json"), f, indent=indent)
+        os.replace(f.name, dest)
+
+    def _is_journal_dest(self, dest: Path) -> bool:
+        return self._journal is not None and dest.resolve() == self._journal.snapshot_path.resolve()
+
     def save(self, dest: str | Path = sentinel, overwrite: bool = False, indent: int = 2):
         """
-        Save the metadata to a file
+        Save the metadata to a file.
+        When journaling is enabled and dest is the journaled snapshot, only the
+        changes since the last save are appended to the journal
         Args:
             dest (Path): The path to save the metadata to
             overwrite (bool): Whether to overwrite the destination file if it exists
         """
-        if dest == sentinel and self._metafile_location:
-            dest = self._metafile_location
-        elif dest == sentinel:
-            dest = "metadata.json"
-        dest = Path(dest)
+        dest = self._resolve_dest(dest)
+        if self._is_journal_dest(dest) and dest.exists():
+            self._journal.flush()
+            if self._journal.should_compact():
+                self.compact(indent=indent)
+            return
         if dest.exists() and not overwrite:
             raise ValueError(f"Destination file already exists: {dest}")
-        if not dest.parent.exists():
-            dest.parent.mkdir(parents=True)
-        
-        ## Create a temporary file to write to
-        with tempfile.NamedTemporaryFile("w", delete=False) as f:
-            json.dump(self.model_dump(exclude_none=True, mode="json"), f, indent=indent)
+        self._write_snapshot(dest, indent=indent)
+        if self._is_journal_dest(dest):
+            self._journal.clear()
 
-            ## Now move the temporary file to the destination
-            os.replace(f.name, dest)
+    def enable_journal(self, dest: str | Path = sentinel, compact_every: int = 1000):
+        """
+        Switch to incremental persistence. Mutations (add_file, add_dir, add_meta,
+        add_metadata, add_origin) are appended to '<dest>.journal' on save, and folded
+        into the snapshot every compact_every entries or on close
+        Args:
+            dest (Path): The snapshot location, defaults to the save location
+            compact_every (int): Journal entries before compacting, None to only compact on close
+        """
+        dest = self._resolve_dest(dest)
+        self._journal = MetaJournal(dest, compact_every=compact_every)
+        ## Start from a snapshot that matches the in memory tree
+        self.compact()
+
+    def compact(self, indent: int = 2):
+        """Write the full snapshot and truncate the journal"""
+        if self._journal is None:
+            raise ValueError("Journaling is not enabled, use save instead")
+        ## Flush first, a crash before the journal is cleared then replays to the same state
+        self._journal.flush()
+        self._write_snapshot(self._journal.snapshot_path, indent=indent)
+        self._journal.clear()
+
+    def close(self):
+        """Compact the journal, if enabled"""
+        if self._journal is not None:
+            self.compact()
+
+    def _replay(self, entries: Iterator[dict[str, Any]]):
+        """
+        Apply journal entries to the tree. Replaying is idempotent,
+        entries already contained in the snapshot are skipped
+        """
+        nodes: dict[UUID, MetaBase] = {self.id: self}
+        if self.metas:
+            nodes.update({m.id: m for m in self.metas})
+        nodes.update({m.id: m for m in self.get_all(recursive=True)})
+
+        for entry in entries:
+            op = entry["op"]
+            if op in ("add_file", "add_dir", "add_meta"):
+                data = dict(entry["node"])
+                if UUID(data["id"]) in nodes:
+                    continue
+                node = MetaBase.deserialize(data)
+                if op == "add_meta":
+                    self.metas.append(node)
+                elif op == "add_file":
+                    nodes[UUID(entry["parent_id"])].add_file(node)
+                else:
+                    nodes[UUID(entry["parent_id"])].add_dir(node)
+                nodes[node.id] = node
+                if isinstance(node, MetaDir):
+                    nodes.update({m.id: m for m in node.get_all(recursive=True)})
+            elif op == "remove":
+                node = nodes.pop(UUID(entry["id"]), None)
+                ## Nodes of a replayed subtree have no _parent yet, go through parent_id
+                parent = nodes.get(node.parent_id) if node is not None else None
+                if parent is not None:
+                    node._parent = parent
+                    parent.remove(node)
+            elif op == "set_metadata":
+                nodes[UUID(entry["id"])].add_metadata(entry["key"], entry["value"])
+            elif op == "add_origin":
+                node = nodes[UUID(entry["id"])]
+                origin_id = UUID(entry["origin_id"])
+                if not node.origin_ids:
+                    node.origin_ids = []
+                if origin_id not in node.origin_ids:
+                    node.origin_ids.append(origin_id)
+            else:
+                raise ValueError(f"Unknown journal operation: {op}")
 
     def _populate_references(self):
         """
         Resolve parent links for all MetaPath instances in the tree
         """
+        self._index = None
         mapping = {self.id: self}
         if self.metas:
             mapping.update({meta.id: meta for meta in self.metas})
@@ -493,11 +724,24 @@ class Meta(MetaDir):
             if meta.origin_ids:
                 meta._origins = [mapping[origin_id] for origin_id in meta.origin_ids]
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Meta":
+        """
+        Build the metadata from model_dump(exclude_none=True), e.g. to hand a copy to another process
+        """
+        root: Self = cls.deserialize(dict(data))
+        root._populate_references()
+        return root
+
     @classmethod
     def load(cls, path: Path, set_save_location: bool = False) -> "Meta":
+        """
+        Load the metadata snapshot, replaying its journal if one exists
+        """
         with path.open("r") as f:
             data = json.load(f)
         root: Self = cls.deserialize(data)
+        root._replay(MetaJournal.read(path))
         ## Now resolve our references
         root._populate_references()
         if set_save_location:
@@ -510,12 +754,16 @@ class Meta(MetaDir):
         create: bool = False,
         name="metadata.json",
         set_save_location: bool = False,
+        journal: bool = False,
+        compact_every: int = 1000,
     ) -> "Meta":
         """
         Load metadata from a directory
         Args:
             location (str | Path): The location to load the metadata from
             create (bool): Whether to create the metadata if it doesn't exist
+            journal (bool): Whether to save incrementally through a journal, see enable_journal
+            compact_every (int): Journal entries before compacting into the snapshot
         Returns:
             Meta: The metadata
         """
@@ -535,10 +783,13 @@ class Meta(MetaDir):
             )
         if set_save_location:
             m.set_save_location(location)
+        if journal:
+            m.enable_journal(location, compact_every=compact_every)
         return m
 
     def _populate_from_directory(self):
         """ """
+        self._index = None
         self.files: list[MetaFile] = []
         self.directories: list[MetaDir] = []
         for item in self.path.iterdir():
@@ -0,0 +1,143 @@
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional
+from uuid import UUID
+
+if TYPE_CHECKING:
+    from qai.core.meta import MetaBase, MetaDir, MetaPath
+
+
+def iter_subtree(node: "MetaBase") -> Iterator["MetaBase"]:
+    """The node and, for directories, everything below it"""
+    yield node
+    get_all = getattr(node, "get_all", None)
+    if get_all is not None:
+        yield from get_all(recursive=True)
+
+
+class MetaIndex:
+    """
+    Lookup tables for a Meta tree, by id, by absolute path and by name.
+    A node is indexed by name under both its file name and its path relative
+    to its parent, the same names MetaDir.get matches against.
+    """
+
+    def __init__(self):
+        self.by_id: dict[UUID, "MetaBase"] = {}
+        self.by_path: dict[Path, "MetaPath"] = {}
+        self.by_name: defaultdict[str, list["MetaPath"]] = defaultdict(list)
+
+    @staticmethod
+    def names(node: "MetaPath") -> list[str]:
+        path = getattr(node, "path", None)
+        if not path:
+            return []
+        names = [path.name]
+        parent = node._parent
+        if parent is not None and getattr(parent, "path", None):
+            try:
+                rel = str(path.relative_to(parent.path))
+            except ValueError:
+                rel = None
+            if rel and rel != path.name:
+                names.append(rel)
+        return names
+
+    def add(self, node: "MetaBase"):
+        for n in iter_subtree(node):
+            self.by_id[n.id] = n
+            path = getattr(n, "path", None)
+            if path:
+                self.by_path[path] = n
+                for name in self.names(n):
+                    self.by_name[name].append(n)
+
+    def remove(self, node: "MetaBase"):
+        for n in iter_subtree(node):
+            self.by_id.pop(n.id, None)
+            path = getattr(n, "path", None)
+            if path:
+                if self.by_path.get(path) is n:
+                    del self.by_path[path]
+                for name in self.names(n):
+                    nodes = self.by_name.get(name)
+                    if not nodes:
+                        continue
+                    ## Compare by identity, model equality compares whole subtrees
+                    self.by_name[name] = [x for x in nodes if x is not n]
+                    if not self.by_name[name]:
+                        del self.by_name[name]
+
+    @staticmethod
+    def _matches_type(node: "MetaPath", is_file: bool, is_dir: bool) -> bool:
+        if is_file and is_dir:
+            return True
+        if is_file and not node.is_file:
+            return False
+        if is_dir and node.is_file:
+            return False
+        return True
+
+    @staticmethod
+    def _is_below(base: "MetaDir", node: "MetaPath") -> bool:
+        parent = node._parent
+        while parent is not None:
+            if parent is base:
+                return True
+            parent = parent._parent
+        return False
+
+    @staticmethod
+    def _search_key(
+        base: "MetaDir", node: "MetaPath", positions: dict[int, dict[int, int]]
+    ) -> tuple:
+        """
+        Position of node in the depth first search MetaDir.get does from base.
+        The search checks the files then directories of a level before descending,
+        so (0, ...) sorts direct children before (1, ...) nodes in subdirectories.
+        """
+
+        def position(nodes: list, n) -> int:
+            if id(nodes) not in positions:
+                positions[id(nodes)] = {id(x): i for i, x in enumerate(nodes)}
+            return positions[id(nodes)][id(n)]
+
+        chain = [node]
+        parent = node._parent
+        while parent is not base:
+            chain.append(parent)
+            parent = parent._parent
+        chain.reverse()
+        key = []
+        level = base
+        for n in chain[:-1]:
+            key.extend((1, position(level.directories, n)))
+            level = n
+        if node.is_file:
+            key.extend((0, 0, position(level.files, node)))
+        else:
+            key.extend((0, 1, position(level.directories, node)))
+        return tuple(key)
+
+    def find(
+        self,
+        base: "MetaDir",
+        name: str,
+        recursive: bool = True,
+        is_file: bool = True,
+        is_dir: bool = True,
+    ) -> Optional["MetaPath"]:
+        """The node MetaDir.get would return for name, searching from base"""
+        matches = [
+            n
+            for n in self.by_name.get(name, [])
+            if n is not base
+            and self._matches_type(n, is_file, is_dir)
+            and (n._parent is base if not recursive else self._is_below(base, n))
+        ]
+        if not matches:
+            return None
+        if len(matches) == 1:
+            return matches[0]
+        positions: dict[int, dict[int, int]] = {}
+        return min(matches, key=lambda n: self._search_key(base, n, positions))
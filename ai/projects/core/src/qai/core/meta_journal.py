@@ -0,0 +1,89 @@
+import json
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Callable
+
+
+class MetaJournal:
+    """
+    Append only log of Meta mutations stored next to the snapshot file.
+    Entries are buffered until flush, and written as one json object per line.
+    """
+
+    suffix = ".journal"
+
+    def __init__(self, snapshot_path: str | Path, compact_every: int = 1000):
+        """
+        Args:
+            snapshot_path (Path): The snapshot (metadata.json) this journal applies to
+            compact_every (int): Number of journaled entries before compacting into the snapshot
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.path = self.path_for(self.snapshot_path)
+        self.compact_every = compact_every
+        self.num_entries = self._count_entries()
+        self._pending: list[Callable[[], dict[str, Any]]] = []
+
+    @classmethod
+    def path_for(cls, snapshot_path: str | Path) -> Path:
+        snapshot_path = Path(snapshot_path)
+        return snapshot_path.with_name(snapshot_path.name + cls.suffix)
+
+    def _count_entries(self) -> int:
+        if not self.path.exists():
+            return 0
+        with self.path.open("rb") as f:
+            return sum(1 for _ in f)
+
+    def record(self, make_entry: Callable[[], dict[str, Any]]):
+        """
+        Buffer an entry. Entries are built lazily at flush time,
+        so the latest state of the mutated node is written
+        """
+        self._pending.append(make_entry)
+
+    @property
+    def num_pending(self) -> int:
+        return len(self._pending)
+
+    def should_compact(self) -> bool:
+        return self.compact_every is not None and self.num_entries >= self.compact_every
+
+    def flush(self):
+        """Append the pending entries to the journal file"""
+        if not self._pending:
+            return
+        lines = [json.dumps(make_entry()) + "\n" for make_entry in self._pending]
+        with self.path.open("a") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.num_entries += len(lines)
+        self._pending = []
+
+    def clear(self):
+        """Drop pending entries and remove the journal file, used after compaction"""
+        self._pending = []
+        self.num_entries = 0
+        if self.path.exists():
+            self.path.unlink()
+
+    @classmethod
+    def read(cls, snapshot_path: str | Path) -> Iterator[dict[str, Any]]:
+        """
+        Read the entries of the journal belonging to the snapshot.
+        A partially written last line (e.g. from a crash) is ignored
+        """
+        path = cls.path_for(snapshot_path)
+        if not path.exists():
+            return
+        with path.open("r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    break
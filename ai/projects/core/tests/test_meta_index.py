@@ -0,0 +1,93 @@
+import pytest
+
+from qai.core.meta import Meta, MetaDir, MetaFile, MetaString
+
+
+def make_tree(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "c").mkdir()
+    (tmp_path / "a" / "page.html").write_text("a")
+    (tmp_path / "a" / "b" / "page.html").write_text("b")
+    (tmp_path / "c" / "page.html").write_text("c")
+    (tmp_path / "c" / "other.html").write_text("c")
+    meta = Meta.from_dir(tmp_path, create=True)
+    meta._populate_from_directory()
+    return meta
+
+
+def test_index_matches_scan(tmp_path):
+    meta = make_tree(tmp_path)
+    for base in [meta, *meta.get_all(recursive=True)]:
+        if base.is_file:
+            continue
+        for name in ["page.html", "other.html", "b", "a", "b/page.html", "missing"]:
+            for recursive in (True, False):
+                for is_file, is_dir in [(True, True), (True, False), (False, True)]:
+                    kwargs = dict(recursive=recursive, is_file=is_file, is_dir=is_dir)
+                    expected = base._scan(name, default=None, **kwargs)
+                    assert base.get(name, default=None, **kwargs) is expected
+
+
+def test_index_follows_add_and_remove(tmp_path):
+    meta = make_tree(tmp_path)
+    assert meta.get_file("page.html") is meta._scan("page.html", is_dir=False)
+
+    (tmp_path / "new.html").write_text("new")
+    new = MetaFile(path=tmp_path / "new.html")
+    meta.add_file(new)
+    assert meta.get_file("new.html") is new
+    ## Files at the current level are found before subdirectories
+    first = MetaFile(path=tmp_path / "page.html")
+    meta.add_file(first)
+    assert meta.get_file("page.html") is first
+
+    a = meta.get_dir("a")
+    meta.remove(a)
+    meta.remove(first)
+    assert meta.get_file("page.html").path == tmp_path / "c" / "page.html"
+    assert meta.get_by_id(first.id, default=None) is None
+    assert meta.get("b", default=None) is None
+    with pytest.raises(ValueError):
+        meta.remove(a)
+
+
+def test_get_by_id_and_path(tmp_path):
+    meta = make_tree(tmp_path)
+    s = MetaString(value="origin")
+    meta.add_meta(s)
+    f = meta.get_dir("c").get_file("other.html")
+    assert meta.get_by_id(f.id) is f
+    assert meta.get_by_id(str(s.id)) is s
+    assert meta.get_by_id(meta.id) is meta
+    assert meta.get_by_id(MetaString(value="x").id, default=None) is None
+
+    assert meta.get_by_path(tmp_path / "c" / "other.html") is f
+    assert meta.get_dir("c").get_by_path("other.html") is f
+    assert meta.get_by_path("a/b", is_file=False) is meta.get_dir("b")
+    ## Paths outside the directory are not found from it
+    assert meta.get_dir("a").get_by_path(tmp_path / "c" / "other.html", default=None) is None
+
+    ## Directories not attached to a Meta fall back to scanning
+    loose = MetaDir(path=tmp_path / "c")
+    loose._populate_from_directory()
+    assert loose.get_by_path("other.html").path == f.path
+
+
+def test_remove_is_journaled(tmp_path):
+    make_tree(tmp_path)
+    meta = Meta.from_dir(tmp_path, create=True, set_save_location=True, journal=True)
+    group = meta.get_dir("c", create=True)
+    for name in ["page.html", "other.html"]:
+        group.add_file(MetaFile(path=tmp_path / "c" / name))
+    meta.save(overwrite=True)
+    group.remove(group.get_file("page.html"))
+    meta.save(overwrite=True)
+
+    loaded = Meta.from_dir(tmp_path)
+    assert [f.path.name for f in loaded.get_dir("c").files] == ["other.html"]
+    assert loaded.get_file("page.html", default=None) is None
+    assert loaded.get_file("other.html").path == tmp_path / "c" / "other.html"
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from qai.core.meta import Meta, MetaDir, MetaFile, MetaString
+from qai.core.meta_journal import MetaJournal
+
+
+def make_site(tmp_path, n: int = 3):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    for i in range(n):
+        (raw / f"page{i}.html").write_text(f"<p>{i}</p>")
+    return raw
+
+
+def test_journal_appends_instead_of_rewriting(tmp_path):
+    raw = make_site(tmp_path)
+    meta = Meta.from_dir(tmp_path, create=True, set_save_location=True, journal=True)
+    location = tmp_path / "metadata.json"
+    snapshot = location.read_text()
+
+    group = meta.get_dir("raw", create=True)
+    meta.save(overwrite=True)
+    for i in range(3):
+        group.add_file(MetaFile(path=raw / f"page{i}.html", metadata={"depth": i}))
+        meta.save(overwrite=True)
+
+    ## The snapshot is untouched, the changes are in the journal
+    assert location.read_text() == snapshot
+    entries = list(MetaJournal.read(location))
+    assert [e["op"] for e in entries] == ["add_dir", "add_file", "add_file", "add_file"]
+
+
+def test_load_replays_journal(tmp_path):
+    raw = make_site(tmp_path)
+    meta = Meta.from_dir(tmp_path, create=True, set_save_location=True, journal=True)
+    group = meta.get_dir("raw", create=True)
+    for i in range(3):
+        group.add_file(MetaFile(path=raw / f"page{i}.html", metadata={"depth": i}))
+    group.add_metadata("scrape_session", {"start_urls": ["https://example.com"]})
+    s = MetaString(value="origin")
+    meta.add_meta(s)
+    group.files[0].add_origin(s)
+    meta.add_metadata("status", "running")
+    meta.add_metadata("status", "done")
+    meta.save(overwrite=True)
+
+    loaded = Meta.from_dir(tmp_path)
+    g = loaded.get_dir("raw")
+    assert [f.path for f in g.files] == [raw / f"page{i}.html" for i in range(3)]
+    assert g.get_file("page1.html").metadata == {"depth": 1}
+    assert g.metadata["scrape_session"] == {"start_urls": ["https://example.com"]}
+    assert loaded.metadata["status"] == "done"
+    assert loaded.metas[0].value == "origin"
+    assert g.files[0].origin_ids == [s.id]
+    assert list(g.files[0].get_sources()) == [loaded.metas[0]]
+
+
+def test_compaction(tmp_path):
+    raw = make_site(tmp_path, n=5)
+    meta = Meta.from_dir(
+        tmp_path, create=True, set_save_location=True, journal=True, compact_every=3
+    )
+    location = tmp_path / "metadata.json"
+    group = meta.get_dir("raw", create=True)
+    for i in range(4):
+        group.add_file(MetaFile(path=raw / f"page{i}.html"))
+        meta.save(overwrite=True)
+    ## add_dir + 2 add_file reach 3 entries and are compacted, the rest is journaled
+    assert len(list(MetaJournal.read(location))) == 2
+    with location.open() as f:
+        assert len(json.load(f)["directories"][0]["files"]) == 2
+
+    meta.close()
+    assert not MetaJournal.path_for(location).exists()
+    with location.open() as f:
+        assert len(json.load(f)["directories"][0]["files"]) == 4
+    assert len(Meta.load(location).get_dir("raw").files) == 4
+
+
+def test_replay_is_idempotent(tmp_path):
+    """A crash between writing the snapshot and clearing the journal replays cleanly"""
+    raw = make_site(tmp_path)
+    meta = Meta.from_dir(tmp_path, create=True, set_save_location=True, journal=True)
+    location = tmp_path / "metadata.json"
+    group = meta.get_dir("raw", create=True)
+    for i in range(3):
+        group.add_file(MetaFile(path=raw / f"page{i}.html"))
+    meta.add_metadata("status", "done")
+    meta.save(overwrite=True)
+    journal = MetaJournal.path_for(location).read_text()
+
+    meta._write_snapshot(location)
+    MetaJournal.path_for(location).write_text(journal + '{"op": "add_fi')
+
+    loaded = Meta.load(location)
+    assert len(loaded.get_dir("raw").files) == 3
+    assert loaded.metadata["status"] == "done"
+
+
+def test_add_dir_subtree(tmp_path):
+    raw = make_site(tmp_path)
+    meta = Meta.from_dir(tmp_path, create=True, set_save_location=True, journal=True)
+    sub = MetaDir(path=raw)
+    sub._populate_from_directory()
+    meta.add_dir(sub)
+    meta.save()
+
+    loaded = Meta.from_dir(tmp_path)
+    assert len(loaded.get_dir("raw").files) == 3
+    assert loaded.get_file("page2.html").path == raw / "page2.html"
+
+
+def test_no_journal_by_default(tmp_path):
+    make_site(tmp_path)
+    meta = Meta.from_dir(tmp_path, create=True, set_save_location=True)
+    meta.get_dir("raw", create=True)
+    meta.save(overwrite=True)
+    assert not MetaJournal.path_for(tmp_path / "metadata.json").exists()
+    with pytest.raises(ValueError):
+        meta.compact()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,4 +1,10 @@
-from qai.schema.extensions import DocExtensions, ExtendedDocument
+from qai.schema.extensions import (
+    BulkUpsertResult,
+    DocExtensions,
+    ExtendedDocument,
+    disable_lookup_cache,
+    enable_lookup_cache,
+)
 from qai.schema.models.addons import Provenance
 from qai.schema.models.address_model import Address
 from qai.schema.models.company_model import Company, CompanyType
@@ -29,8 +35,11 @@ from qai.schema.models.phone_number_model import PhoneNumber, PhoneType
 from qai.schema.models.social_media_model import SocialMedia, SocialMediaType
 
 __all__ = [
+    "BulkUpsertResult",
     "DocExtensions",
     "ExtendedDocument",
+    "disable_lookup_cache",
+    "enable_lookup_cache",
     "Provenance",
     "Address",
     "Campaign",
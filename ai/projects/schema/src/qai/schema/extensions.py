@@ -1,12 +1,14 @@
-import asyncio
 import json
 import types
 from abc import abstractmethod
+from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
 from typing import (
     Any,
     Dict,
     Generic,
+    Iterable,
     List,
     Mapping,
     Optional,
@@ -19,19 +21,37 @@ from typing import (
 )
 from urllib.parse import urlparse
 
-from beanie import Document, View
+from beanie import (
+    Delete,
+    Document,
+    Insert,
+    PydanticObjectId,
+    Replace,
+    Save,
+    SaveChanges,
+    Update,
+    View,
+    after_event,
+    before_event,
+)
 from beanie.exceptions import CollectionWasNotInitialized
 from beanie.odm.actions import ActionDirections, EventTypes, wrap_with_actions
 from beanie.odm.documents import DocType, DocumentProjectionType
 from beanie.odm.fields import WriteRules
 from beanie.odm.settings.document import DocumentSettings
+from beanie.odm.utils.dump import get_dict
 from beanie.odm.utils.self_validation import validate_self_before
 from beanie.odm.utils.state import save_state_after
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pi_conf.config_settings import ConfigSettings, TomlConfigSource
+from pydantic import model_validator
 from pydantic._internal._model_construction import ModelMetaclass
+from pymongo import InsertOne, ReplaceOne, UpdateOne
 from pymongo.client_session import ClientSession
 from qai.schema.mergers.merge import NORMAL_PRIORITY, Priority, merge_model
+from qai.schema.utils.link_utils import DEFAULT_CHUNK_SIZE, fetch_links_batched
+from qai.schema.utils.lookup_cache import DEFAULT_MAX_SIZE, DEFAULT_TTL, LookupCache
+from qai.schema.utils.query_match import matches
 
 T = TypeVar("T", bound=Document)
 ET = TypeVar("ET", bound="ExtendedDocument")
@@ -40,9 +60,63 @@ sentinel = types.new_class("Sentinel", (List[int],))()
 
 offline_settings = DocumentSettings()
 
+DEFAULT_BULK_BATCH_SIZE = 500
+## The links of the results and of their linked documents, like fetch_all_links
+DEFAULT_FETCH_DEPTH = 2
+
 # Create a global registry dictionary
 extended_document_registry: dict[str, Any] = {}
 
+## Collections whose documents all store their Settings.match_keys, see backfill_match_keys
+backfilled_collections: set[str] = set()
+
+## Shared by all ExtendedDocuments when enabled, see enable_lookup_cache
+lookup_cache: Optional[LookupCache] = None
+
+
+def enable_lookup_cache(ttl: float = DEFAULT_TTL, max_size: int = DEFAULT_MAX_SIZE) -> LookupCache:
+    """
+    Serve find_one_cached, get_cached and the lookups of find_or_insert from an in-process
+    cache. Writes in this process invalidate the entries of the written document.
+    upsert always reads from the database
+    Args:
+        ttl (float): Seconds a document is served from the cache
+        max_size (int): Lookups kept before evicting the least recently used
+    """
+    global lookup_cache
+    lookup_cache = LookupCache(ttl=ttl, max_size=max_size)
+    return lookup_cache
+
+
+def disable_lookup_cache() -> None:
+    global lookup_cache
+    lookup_cache = None
+
+
+@dataclass
+class BulkUpsertResult(Generic[ET]):
+    """
+    Outcome of ExtendedDocument.bulk_upsert. The counts are of stored documents,
+    documents holds the stored document of each input document in order
+    """
+
+    documents: list[ET] = field(default_factory=list)
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def add(self, other: "BulkUpsertResult[ET]") -> None:
+        self.documents.extend(other.documents)
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+
+
+def _chunks(iterable: Iterable[Any], size: int) -> Iterable[list[Any]]:
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
 
 # Define the metaclass for registering subclasses
 class ExtendedDocumentMeta(type):
@@ -109,13 +183,19 @@ class ExtendedDocument(Document, metaclass=CombinedMeta):
         return doc
 
     @classmethod
-    async def find_many_fetch(cls, *args) -> list[Self]:
+    async def find_many_fetch(
+        cls, *args, depth: int = DEFAULT_FETCH_DEPTH, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> list[Self]:
+        """
+        find_many with the links of the results resolved, depth levels deep, using one $in
+        query per linked document class and chunk_size ids
+        """
         if args:
             ecs = await cls.find_many(*args).to_list()
         else:
             ecs = await cls.find_all().to_list()
 
-        await asyncio.gather(*[ec.fetch_all_links() for ec in ecs])
+        await fetch_links_batched(ecs, depth=depth, chunk_size=chunk_size)
         return ecs
 
     @wrap_with_actions(EventTypes.SAVE)
@@ -151,6 +231,7 @@ class ExtendedDocument(Document, metaclass=CombinedMeta):
             args = tuple([params])  # type: ignore
         if skip_actions:
             raise NotImplementedError("skip_actions is not implemented")
+        ## Not through the lookup cache, callers may change and save what they get back
         doc = await self.find_one(
             args[0],
             projection_model=projection_model,
@@ -201,7 +282,7 @@ class ExtendedDocument(Document, metaclass=CombinedMeta):
         if not args:
             params = document.match_query()
             args = tuple([params])  # type: ignore
-        doc = await document.find_one(
+        doc = await document._find_one_lookup(
             args[0],
             projection_model=projection_model,
             session=session,
@@ -222,6 +303,166 @@ class ExtendedDocument(Document, metaclass=CombinedMeta):
             **insert_kwargs,
         )
 
+    @classmethod
+    async def find_one_cached(cls: type[ET], query: Mapping[str, Any]) -> Optional[ET]:
+        """find_one(query) through the lookup cache when it is enabled"""
+        if lookup_cache is None:
+            return await cls.find_one(query)
+        doc = lookup_cache.get(cls.__name__, query)
+        if doc is None:
+            doc = await cls.find_one(query)
+            lookup_cache.set(cls.__name__, query, doc)
+        return doc
+
+    @classmethod
+    async def get_cached(cls: type[ET], document_id: Any) -> Optional[ET]:
+        return await cls.find_one_cached({"_id": document_id})
+
+    @classmethod
+    async def _find_one_lookup(cls: type[ET], query: Mapping[str, Any], **kwargs) -> Optional[ET]:
+        ## Only lookups without projections, sessions or fetching options are cached
+        if lookup_cache is not None and not any(kwargs.values()):
+            return await cls.find_one_cached(query)
+        return await cls.find_one(query, **kwargs)
+
+    @after_event(Insert, Replace, Save, SaveChanges, Update, Delete)
+    def _invalidate_lookup_cache(self) -> None:
+        if lookup_cache is not None and self.id is not None:
+            lookup_cache.invalidate(type(self).__name__, self.id)
+
+    @classmethod
+    async def bulk_upsert(
+        cls: type[ET],
+        docs: Iterable[ET],
+        batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+        priority: Priority = NORMAL_PRIORITY,
+        existing_priority: Priority = NORMAL_PRIORITY,
+        session: Optional[ClientSession] = None,
+        merge: bool = True,
+    ) -> BulkUpsertResult[ET]:
+        """
+        Insert docs or merge them into the documents they match, batch_size at a time.
+        Each batch costs one find with the $or of the match queries and one unordered
+        bulk write, instead of a find and a save per document.
+        Docs matching each other within docs are merged before writing.
+        Args:
+            docs (Iterable): The documents, consumed lazily one batch at a time
+            batch_size (int): Documents per find and bulk write
+            priority (Priority): Merge priority of docs
+            existing_priority (Priority): Merge priority of the stored documents
+            merge (bool): When False only inserts, matched documents are returned as
+                stored like find_or_insert does
+        Returns:
+            BulkUpsertResult: inserted, updated and unchanged counts and the stored documents
+        """
+        result: BulkUpsertResult[ET] = BulkUpsertResult()
+        for batch in _chunks(docs, batch_size):
+            queries = [doc.match_query() for doc in batch]
+            existing = await cls.find({"$or": queries}, session=session).to_list()
+            plan, inserts, updates = cls._plan_bulk_upsert(
+                batch, queries, existing, priority, existing_priority, merge=merge
+            )
+            keep_nulls = cls.get_settings().keep_nulls
+            ops: list[InsertOne | ReplaceOne] = [
+                InsertOne(get_dict(doc, to_db=True, keep_nulls=keep_nulls)) for doc in inserts
+            ]
+            ops += [
+                ReplaceOne({"_id": doc.id}, get_dict(doc, to_db=True, keep_nulls=keep_nulls))
+                for doc in updates
+            ]
+            if ops:
+                await cls.get_motor_collection().bulk_write(ops, ordered=False, session=session)
+            if lookup_cache is not None:
+                for doc in updates:
+                    lookup_cache.invalidate(cls.__name__, doc.id)
+            result.add(plan)
+        return result
+
+    @classmethod
+    async def backfill_match_keys(
+        cls,
+        batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+        session: Optional[ClientSession] = None,
+    ) -> int:
+        """
+        Store the Settings.match_keys fields of the documents written before the fields
+        existed, i.e. that have none of them. Keys are recomputed when documents are loaded.
+        Run by beanie_utils.init, afterwards match_query only matches on the keys.
+        Returns:
+            int: The number of documents written
+        """
+        fields = getattr(getattr(cls, "Settings", None), "match_keys", None)
+        if not fields:
+            return 0
+        written = 0
+        ops: list[UpdateOne] = []
+        ## Keys are stored even when None, so written documents are not found again
+        missing = {"$and": [{f: {"$exists": False}} for f in fields]}
+        async for doc in cls.find(missing, session=session):
+            ops.append(UpdateOne({"_id": doc.id}, {"$set": {f: getattr(doc, f) for f in fields}}))
+            if len(ops) >= batch_size:
+                await cls.get_motor_collection().bulk_write(ops, ordered=False, session=session)
+                written += len(ops)
+                ops = []
+        if ops:
+            await cls.get_motor_collection().bulk_write(ops, ordered=False, session=session)
+            written += len(ops)
+        backfilled_collections.add(cls.get_settings().name)
+        return written
+
+    @classmethod
+    def match_keys_backfilled(cls) -> bool:
+        """
+        Whether backfill_match_keys ran for the collection in this process. Until then
+        match_query also matches on the fields the keys are computed from
+        """
+        return getattr(getattr(cls, "Settings", None), "name", None) in backfilled_collections
+
+    @classmethod
+    def _plan_bulk_upsert(
+        cls: type[ET],
+        batch: list[ET],
+        queries: list[dict[str, Any]],
+        existing: list[ET],
+        priority: Priority = NORMAL_PRIORITY,
+        existing_priority: Priority = NORMAL_PRIORITY,
+        merge: bool = True,
+    ) -> tuple[BulkUpsertResult[ET], list[ET], list[ET]]:
+        """
+        Match and merge a batch in memory, without merge matched documents are left as is.
+        Returns:
+            tuple: (result, documents to insert, documents to replace)
+        """
+        ## [document, dump, is_new, matched, changed], dumps are refreshed after merging
+        rows = [[e, e.model_dump(by_alias=True), False, False, False] for e in existing]
+        result: BulkUpsertResult[ET] = BulkUpsertResult()
+        for doc, query in zip(batch, queries):
+            row = next((r for r in rows if matches(query, r[1])), None)
+            if row is None:
+                if doc.id is None:
+                    doc.id = PydanticObjectId()
+                rows.append([doc, doc.model_dump(by_alias=True), True, True, False])
+                result.documents.append(doc)
+                continue
+            target = row[0]
+            row[3] = True
+            if not merge:
+                result.documents.append(target)
+                continue
+            target.merge(doc, self_priority=existing_priority, other_priority=priority)
+            target.update_match_keys()
+            dump = target.model_dump(by_alias=True)
+            if dump != row[1]:
+                row[1] = dump
+                row[4] = True
+            result.documents.append(target)
+        inserts = [r[0] for r in rows if r[2]]
+        updates = [r[0] for r in rows if not r[2] and r[4]]
+        result.inserted = len(inserts)
+        result.updated = len(updates)
+        result.unchanged = sum(1 for r in rows if not r[2] and r[3] and not r[4])
+        return result, inserts, updates
+
     @classmethod
     def from_str(cls: type[ET], s: str, *args, **kwargs) -> ET:
         raise NotImplementedError("from_str must be implemented in the subclass of Extended")
@@ -299,6 +540,21 @@ class ExtendedDocument(Document, metaclass=CombinedMeta):
             getattr(self, field_name) is None for field_name in self.Settings.equality_fields
         )
 
+    def update_match_keys(self) -> None:
+        """
+        Recompute the normalized fields match_query uses, for models that have them.
+        Called on validation and before every write
+        """
+
+    @model_validator(mode="after")
+    def _update_match_keys_after_validation(self) -> Self:
+        self.update_match_keys()
+        return self
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def _update_match_keys_before_write(self) -> None:
+        self.update_match_keys()
+
     def match_query(self) -> dict[str, Any]:
         """
         Return a query that will match this document.
@@ -53,12 +53,39 @@ class SmartPreferTrustedStrategy(MergeStrategy[T]):
             return preferred
 
 
+def equality_key(item: Any) -> Optional[Hashable]:
+    """
+    The identity of item for list merges: its equality_hash() if it has one, otherwise the
+    values of Settings.equality_fields. None when neither exists or all the values are None
+    """
+    if hasattr(item, "equality_hash") and callable(getattr(item, "equality_hash")):
+        return item.equality_hash()
+    fields = getattr(getattr(item, "Settings", None), "equality_fields", None)
+    if not fields:
+        return None
+    values = tuple(getattr(item, f, None) for f in fields)
+    if all(v is None for v in values):
+        return None
+    key = (type(item).__name__, *values)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _can_merge(item: Any) -> bool:
+    return hasattr(item, "__merge__") and callable(getattr(item, "__merge__"))
+
+
 class SmartListMergeStrategy(MergeStrategy[List[Any]]):
     def __merge__(
         self, value1: List[Any], value2: List[Any], priority1: Priority, priority2: Priority
     ) -> List[Any]:
         merged = []
-        seen_complex: Dict[int, Any] = {}
+        ## position in merged by equality_hash, and of the first mergeable item of each type
+        seen_complex: Dict[Hashable, int] = {}
+        seen_types: Dict[type, int] = {}
 
         for item in value1 + value2:
             if isinstance(item, (int, str, float, bool)):
@@ -67,23 +94,18 @@ class SmartListMergeStrategy(MergeStrategy[List[Any]]):
                 if hasattr(item, "equality_hash") and callable(getattr(item, "equality_hash")):
                     item_hash = item.equality_hash()
                     if item_hash in seen_complex:
-                        existing = seen_complex[item_hash]
-                        if hasattr(existing, "__merge__") and callable(
-                            getattr(existing, "__merge__")
-                        ):
-                            merged[merged.index(existing)] = existing.__merge__(
-                                item, priority1, priority2
-                            )
+                        pos = seen_complex[item_hash]
+                        if _can_merge(merged[pos]):
+                            merged[pos] = merged[pos].__merge__(item, priority1, priority2)
                     else:
+                        seen_complex[item_hash] = len(merged)
                         merged.append(item)
-                        seen_complex[item_hash] = item
-                elif hasattr(item, "__merge__") and callable(getattr(item, "__merge__")):
-                    existing = next((x for x in merged if type(x) == type(item)), None)
-                    if existing:
-                        merged[merged.index(existing)] = existing.__merge__(
-                            item, priority1, priority2
-                        )
+                elif _can_merge(item):
+                    pos = seen_types.get(type(item))
+                    if pos is not None:
+                        merged[pos] = merged[pos].__merge__(item, priority1, priority2)
                     else:
+                        seen_types[type(item)] = len(merged)
                         merged.append(item)
                 else:
                     merged.append(item)
@@ -92,6 +114,12 @@ class SmartListMergeStrategy(MergeStrategy[List[Any]]):
 
 
 class SmartListAsSetMergeStrategy(MergeStrategy[List[Any]]):
+    """
+    Union of two lists keeping the first occurrence of each item. Items with the same
+    equality_key are merged, items without one are deduplicated by str(item).
+    Lookups are hashed, so merging is linear in the length of the lists
+    """
+
     def __merge__(
         self,
         target_value: List[Any],
@@ -100,29 +128,32 @@ class SmartListAsSetMergeStrategy(MergeStrategy[List[Any]]):
         source_priority: Priority,
     ) -> List[Any]:
         merged = []
-        seen_complex = {}
+        seen_simple: set[Any] = set()
+        ## key -> (position in merged, priority of the item there)
+        seen_complex: Dict[Hashable, tuple[int, Priority]] = {}
 
         def add_item(item, priority):
             if isinstance(item, (int, str, float, bool)):
-                if item not in merged:
-                    merged.append(item)
-            elif hasattr(item, "equality_hash") and callable(getattr(item, "equality_hash")):
-                item_hash = item.equality_hash()
-                if item_hash in seen_complex:
-                    existing, existing_priority = seen_complex[item_hash]
-                    if hasattr(existing, "__merge__") and callable(getattr(existing, "__merge__")):
-                        merged_item = existing.__merge__(item, existing_priority, priority)
-                        merged[merged.index(existing)] = merged_item
-                        seen_complex[item_hash] = (merged_item, max(existing_priority, priority))
-                else:
+                if item not in seen_simple:
+                    seen_simple.add(item)
                     merged.append(item)
-                    seen_complex[item_hash] = (item, priority)
-            else:
-                # For objects without equality_hash, we'll use their string representation as a hash
-                item_str = str(item)
+                return
+            item_key = equality_key(item)
+            if item_key is None:
+                # For objects without an equality key, we'll use their string representation
+                item_str = ("__str__", str(item))
                 if item_str not in seen_complex:
+                    seen_complex[item_str] = (len(merged), priority)
                     merged.append(item)
-                    seen_complex[item_str] = (item, priority)
+            elif item_key in seen_complex:
+                pos, existing_priority = seen_complex[item_key]
+                existing = merged[pos]
+                if _can_merge(existing):
+                    merged[pos] = existing.__merge__(item, existing_priority, priority)
+                    seen_complex[item_key] = (pos, max(existing_priority, priority))
+            else:
+                seen_complex[item_key] = (len(merged), priority)
+                merged.append(item)
 
         for item in target_value:
             add_item(item, target_priority)
@@ -10,8 +10,8 @@ from qai.schema.models.email_model import Email
 from qai.schema.models.person_model import Person
 from qai.schema.models.phone_number_model import PhoneNumber
 from qai.schema.models.qbeanie import Link
-from qai.schema.models.social_media_model import SocialMedia, SocialMediaType
-from qai.schema.utils.utils import clean_domain
+from qai.schema.models.social_media_model import SocialMedia, SocialMediaType, linkedin_handles
+from qai.schema.utils.utils import clean_domain, linkedin_handle, normalize_domain
 
 
 class CompanyType(StrEnum):
@@ -76,12 +76,31 @@ class Company(CreatedAtDoc, Taggable, Labels, Deleteable):
         default=None, description="The existing customers of the company"
     )
 
+    ## Normalized copies kept by update_match_keys, indexed for match_query
+    domain_keys: Optional[list[str]] = Field(
+        default=None, description="The lowercased domains, cleaned with clean_domain"
+    )
+    linkedin_handles: Optional[list[str]] = Field(
+        default=None, description="The lowercased LinkedIn vanity names"
+    )
+
     class Settings:
         name = "companies"
         equality_fields = ["id"]
         keep_nulls = False
+        match_keys = ["domain_keys", "linkedin_handles"]
+        ## Other fields match_query and find_by_linkedin_url query
+        match_fields = ["linkedin_id", "social_media.url"]
+        ## Also created by beanie when init runs without provision_indexes
+        indexes = match_keys + match_fields
+
+    def update_match_keys(self) -> None:
+        self.domain_keys = sorted({normalize_domain(d) for d in self.domains or [] if d}) or None
+        self.linkedin_handles = linkedin_handles(self.social_media) or None
 
     def match_query(self) -> dict[str, Any]:
+        """Exact matches on the indexed keys kept by update_match_keys"""
+        self.update_match_keys()
         query: list[dict[str, Any]] = []
 
         # Match by ID
@@ -89,21 +108,34 @@ class Company(CreatedAtDoc, Taggable, Labels, Deleteable):
             query.append({"_id": self.id})
 
         # Match by name and domains
-        if self.name and self.domains:
-            query.append({"$and": [{"name": self.name}, {"domains": {"$in": self.domains}}]})
+        if self.name and self.domain_keys:
+            query.append(
+                {"$and": [{"name": self.name}, {"domain_keys": {"$in": self.domain_keys}}]}
+            )
 
-        # Match by LinkedIn URL
-        if self.social_media:
-            linkedin_urls = [
-                sm.url for sm in self.social_media if sm.type == SocialMediaType.LINKEDIN and sm.url
-            ]
-            if linkedin_urls:
-                query.append({"$or": [{"social_media.url": url} for url in linkedin_urls]})
+        # Match by LinkedIn handle
+        if self.linkedin_handles:
+            query.append({"linkedin_handles": {"$in": self.linkedin_handles}})
 
         # Match by LinkedIn ID
         if self.linkedin_id:
             query.append({"linkedin_id": self.linkedin_id})
 
+        ## Documents stored before the match keys match by url until backfill_match_keys has
+        ## run, urls without a handle always do
+        backfilled = self.match_keys_backfilled()
+        linkedin_urls = [
+            sm.url
+            for sm in self.social_media or []
+            if sm.type == SocialMediaType.LINKEDIN
+            and sm.url
+            and not (backfilled and linkedin_handle(sm.url))
+        ]
+        if not backfilled and self.name and self.domains:
+            query.append({"$and": [{"name": self.name}, {"domains": {"$in": self.domains}}]})
+        if linkedin_urls:
+            query.append({"social_media.url": {"$in": linkedin_urls}})
+
         if not query:
             raise ValueError(f"Couldn't create match_query for company {self}")
 
@@ -117,7 +149,12 @@ class Company(CreatedAtDoc, Taggable, Labels, Deleteable):
 
     @classmethod
     def find_by_linkedin_url(cls, linkedin_url: str) -> dict[str, Any]:
-        return {"social_media.url": linkedin_url}
+        handle = linkedin_handle(linkedin_url)
+        if not handle:
+            return {"social_media.url": linkedin_url}
+        if not cls.match_keys_backfilled():
+            return {"$or": [{"linkedin_handles": handle}, {"social_media.url": linkedin_url}]}
+        return {"linkedin_handles": handle}
 
     @field_validator("domains", mode="before")
     def strip_protocols(cls, v):
@@ -154,6 +191,8 @@ class Company(CreatedAtDoc, Taggable, Labels, Deleteable):
                     "updated_at",
                     "deleted_at",
                     "is_deleted",
+                    "domain_keys",
+                    "linkedin_handles",
                 ],
                 exclude_empty=True,
             )
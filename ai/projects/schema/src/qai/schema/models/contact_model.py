@@ -1,8 +1,9 @@
-from typing import TYPE_CHECKING, Any, Optional, TypeVar
+from typing import TYPE_CHECKING, Any, Iterable, Optional, TypeVar
 
 from beanie import PydanticObjectId
 from pydantic import Field
 
+from qai.schema.extensions import DEFAULT_BULK_BATCH_SIZE
 from qai.schema.models.addons import (
     CreatedAtDoc,
     DateRange,
@@ -101,6 +102,24 @@ class Contact(CreatedAtDoc, Taggable, Labels, Deleteable):
             raise ValueError(f"Couldn't find or insert contact {contact}")
         return found
 
+    @classmethod
+    async def get_or_create_many(
+        cls: type["Contact"],
+        people_companies: Iterable[tuple[Person, Company]],
+        campaign: "Campaign",
+        batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+    ) -> list["Contact"]:
+        """
+        get_or_create for many (person, company) pairs with one find and write per batch.
+        Like get_or_create, existing contacts are returned unchanged
+        """
+        contacts = (
+            cls.from_data(person=person, company=company, campaign=campaign)
+            for person, company in people_companies
+        )
+        result = await cls.bulk_upsert(contacts, batch_size=batch_size, merge=False)
+        return result.documents
+
     @property
     def safe_company_name(self) -> str:
         return self.company.name if self.company else ""
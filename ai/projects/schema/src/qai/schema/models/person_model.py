@@ -19,7 +19,8 @@ from qai.schema.models.job_model import Job, _sort_job_key
 from qai.schema.models.models import GenderEnum
 from qai.schema.models.name_model import Name
 from qai.schema.models.phone_number_model import PhoneNumber
-from qai.schema.models.social_media_model import SocialMedia, SocialMediaType
+from qai.schema.models.social_media_model import SocialMedia, SocialMediaType, linkedin_handles
+from qai.schema.utils.utils import linkedin_handle, normalize_email
 
 
 class Person(CreatedAtDoc, Deleteable, Taggable, Labels):
@@ -63,10 +64,26 @@ class Person(CreatedAtDoc, Deleteable, Taggable, Labels):
         default=None, description="Additional data of the person, a catch-all field"
     )
 
+    ## Normalized copies kept by update_match_keys, indexed for match_query
+    email_keys: Optional[list[str]] = Field(
+        default=None, description="The lowercased email addresses"
+    )
+    linkedin_handles: Optional[list[str]] = Field(
+        default=None, description="The lowercased LinkedIn vanity names"
+    )
+    name_address_keys: Optional[list[str]] = Field(
+        default=None, description="The lowercased first|last|street|city|state|postal|country"
+    )
+
     class Settings:
         name = "people"
         equality_fields = ["id"]
         keep_nulls = False
+        match_keys = ["email_keys", "linkedin_handles", "name_address_keys"]
+        ## Other fields match_query queries, every $or branch needs an index
+        match_fields = ["social_media.url"]
+        ## Also created by beanie when init runs without provision_indexes
+        indexes = match_keys + match_fields
 
     @property
     def full_name(self) -> str:
@@ -142,57 +159,49 @@ class Person(CreatedAtDoc, Deleteable, Taggable, Labels):
             # If any job lacks dates, return the first job's title without sorting
             return self.work_history[0].title
 
+    def update_match_keys(self) -> None:
+        self.email_keys = (
+            sorted({normalize_email(e.address) for e in self.emails or [] if e.address}) or None
+        )
+        self.linkedin_handles = linkedin_handles(self.social_media) or None
+        keys = set()
+        if self.name and (self.name.first or self.name.last):
+            for address in self.addresses or []:
+                parts = [
+                    address.street,
+                    address.city,
+                    address.state,
+                    address.postal_code,
+                    address.country,
+                ]
+                if any(parts):
+                    key = [self.name.first, self.name.last, *parts]
+                    keys.add("|".join((p or "").strip().lower() for p in key))
+        self.name_address_keys = sorted(keys) or None
+
     def match_query(self) -> dict[str, Any]:
+        """Exact matches on the indexed keys kept by update_match_keys"""
+        self.update_match_keys()
         query: list[dict[str, Any]] = []
 
         # Match by email
-        if self.emails and isinstance(self.emails, list):
-            email_conditions = [
-                {"emails.address": re.compile(f"^{re.escape(email.address)}$", re.IGNORECASE)}
-                for email in self.emails
-                if email.address
-            ]
-            if email_conditions:
-                query.append({"$or": email_conditions})
+        if self.email_keys:
+            query.append({"email_keys": {"$in": self.email_keys}})
 
         # Match by name and address
-        if self.name and self.addresses and isinstance(self.addresses, list):
-            for address in self.addresses:
-                address_conditions = {}
-                if self.name.first:
-                    address_conditions["name.first"] = re.compile(
-                        f"^{re.escape(self.name.first)}$", re.IGNORECASE
-                    )
-                if self.name.last:
-                    address_conditions["name.last"] = re.compile(
-                        f"^{re.escape(self.name.last)}$", re.IGNORECASE
-                    )
-                if address.street:
-                    address_conditions["addresses.street"] = re.compile(
-                        f"^{re.escape(address.street)}$", re.IGNORECASE
-                    )
-                if address.city:
-                    address_conditions["addresses.city"] = re.compile(
-                        f"^{re.escape(address.city)}$", re.IGNORECASE
-                    )
-                if address.state:
-                    address_conditions["addresses.state"] = re.compile(
-                        f"^{re.escape(address.state)}$", re.IGNORECASE
-                    )
-                if address.postal_code:
-                    address_conditions["addresses.postal_code"] = address.postal_code
-                if address.country:
-                    address_conditions["addresses.country"] = re.compile(
-                        f"^{re.escape(address.country)}$", re.IGNORECASE
-                    )
+        if self.name_address_keys:
+            query.append({"name_address_keys": {"$in": self.name_address_keys}})
 
-                if len(address_conditions) > 0:
-                    query.append({"$and": [{k: v} for k, v in address_conditions.items()]})
+        # Match by LinkedIn handle
+        if self.linkedin_handles:
+            query.append({"linkedin_handles": {"$in": self.linkedin_handles}})
 
-        # Match by social media profiles
+        # Match by other social media profiles, and LinkedIn urls without a handle
         if self.social_media and isinstance(self.social_media, list):
             for sm in self.social_media:
-                if sm.url and sm.type:
+                if not sm.url or not sm.type:
+                    continue
+                if sm.type != SocialMediaType.LINKEDIN or not linkedin_handle(sm.url):
                     query.append(
                         {
                             "$and": [
@@ -202,12 +211,54 @@ class Person(CreatedAtDoc, Deleteable, Taggable, Labels):
                         }
                     )
 
+        if not self.match_keys_backfilled():
+            query += self._legacy_match_conditions()
+
         if not query:
             raise ValueError(f"Couldn't create match_query for person {self}")
 
         q = {"$or": query}
         return q
 
+    def _legacy_match_conditions(self) -> list[dict[str, Any]]:
+        """
+        Conditions on the source fields, matching documents stored before the match keys.
+        Only used until backfill_match_keys has run, regexes can't use an index
+        """
+        conditions: list[dict[str, Any]] = []
+        emails = [
+            {"emails.address": re.compile(f"^{re.escape(e.address)}$", re.IGNORECASE)}
+            for e in self.emails or []
+            if e.address
+        ]
+        if emails:
+            conditions.append({"$or": emails})
+        if self.name:
+            for address in self.addresses or []:
+                fields = {
+                    "name.first": self.name.first,
+                    "name.last": self.name.last,
+                    "addresses.street": address.street,
+                    "addresses.city": address.city,
+                    "addresses.state": address.state,
+                    "addresses.country": address.country,
+                }
+                address_conditions = [
+                    {k: re.compile(f"^{re.escape(v)}$", re.IGNORECASE)}
+                    for k, v in fields.items()
+                    if v
+                ]
+                if address.postal_code:
+                    address_conditions.append({"addresses.postal_code": address.postal_code})
+                if address_conditions:
+                    conditions.append({"$and": address_conditions})
+        for sm in self.social_media or []:
+            if sm.url and sm.type == SocialMediaType.LINKEDIN:
+                conditions.append(
+                    {"$and": [{"social_media.url": sm.url}, {"social_media.type": str(sm.type)}]}
+                )
+        return conditions
+
     @property
     def summary(self) -> str:
         return json.dumps(
@@ -220,6 +271,9 @@ class Person(CreatedAtDoc, Deleteable, Taggable, Labels):
                     "updated_at",
                     "deleted_at",
                     "is_deleted",
+                    "email_keys",
+                    "linkedin_handles",
+                    "name_address_keys",
                 ]
             )
         )
@@ -4,6 +4,7 @@ from typing import Optional
 from pydantic import BaseModel, Field
 
 from qai.schema.models.addons import Provenance
+from qai.schema.utils.utils import linkedin_handle
 
 
 class SocialMediaType(StrEnum):
@@ -26,3 +27,14 @@ class SocialMedia(BaseModel):
 
     class Settings:
         equality_fields = ["url"]
+
+
+def linkedin_handles(social_media: Optional[list[SocialMedia]]) -> list[str]:
+    """The sorted, distinct LinkedIn handles of the LinkedIn urls in social_media"""
+    handles = set()
+    for sm in social_media or []:
+        if sm.type == SocialMediaType.LINKEDIN and sm.url:
+            handle = linkedin_handle(sm.url)
+            if handle:
+                handles.add(handle)
+    return sorted(handles)
@@ -5,14 +5,26 @@ from beanie import init_beanie
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo.typings import _DocumentType
 from qai.schema.extensions import get_extended_documents
+from qai.schema.utils.index_utils import ensure_indexes, stored_collection
 from qai.schema.models.mongo_model import MongoConfig
 
 log = getLogger(__name__)
 
 
 async def init(
-    mongo_uri: str, mongo_db: Optional[str] = None, mongo_config: Optional[MongoConfig] = None
+    mongo_uri: str,
+    mongo_db: Optional[str] = None,
+    mongo_config: Optional[MongoConfig] = None,
+    provision_indexes: bool = True,
 ) -> AsyncIOMotorDatabase:
+    """
+    Connect and initialize every extended document.
+    Args:
+        provision_indexes (bool): Create the indexes the match queries of the documents need
+            and log redundant or unused ones, see index_utils.ensure_indexes. Then store the
+            match keys of documents written before they existed, see backfill_match_keys.
+            Without it match_query also matches on the unindexed source fields
+    """
     if mongo_config:
         mongo_uri = mongo_config.uri
         mongo_db = mongo_config.db
@@ -21,5 +33,14 @@ async def init(
         raise ValueError("MongoDB database name is required")
     client: AsyncIOMotorClient = AsyncIOMotorClient(mongo_uri)
     db = client.get_database(name=mongo_db)
-    await init_beanie(database=db, document_models=get_extended_documents())
+    document_models = get_extended_documents()
+    await init_beanie(database=db, document_models=document_models)
+    if provision_indexes:
+        await ensure_indexes(document_models)
+        for doc_cls in document_models:
+            if stored_collection(doc_cls) is None:
+                continue
+            written = await doc_cls.backfill_match_keys()
+            if written:
+                log.info(f"init: stored the match keys of {written} {doc_cls.__name__} documents")
     return db
@@ -0,0 +1,145 @@
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, Iterable, Optional
+
+from pymongo import ASCENDING
+
+log = getLogger(__name__)
+
+IndexKey = tuple[tuple[str, int], ...]
+
+
+@dataclass
+class IndexReport:
+    """What ensure_indexes did and found for one collection"""
+
+    collection: str
+    missing: list[IndexKey] = field(default_factory=list)
+    created: list[IndexKey] = field(default_factory=list)
+    ## Indexes whose keys are a prefix of another index of the collection
+    redundant: list[str] = field(default_factory=list)
+    ## Indexes with no recorded use since the server started, None if unknown
+    unused: Optional[list[str]] = None
+
+
+def _field(name: str) -> str:
+    return "_id" if name == "id" else name
+
+
+def stored_collection(doc_cls: type) -> Optional[str]:
+    """The collection of doc_cls if its own Settings names one, None for embedded models"""
+    settings = doc_cls.__dict__.get("Settings")
+    return getattr(settings, "name", None) if settings is not None else None
+
+
+def required_indexes(doc_cls: type) -> list[IndexKey]:
+    """
+    The indexes match_query of doc_cls relies on: one per Settings.match_keys and
+    Settings.match_fields field, and one compound index of Settings.equality_fields.
+    _id is always indexed and left out
+    """
+    settings = getattr(doc_cls, "Settings", None)
+    required: list[IndexKey] = []
+    fields = [
+        *(getattr(settings, "match_keys", None) or []),
+        *(getattr(settings, "match_fields", None) or []),
+    ]
+    for name in fields:
+        required.append(((_field(name), ASCENDING),))
+    equality = [_field(f) for f in getattr(settings, "equality_fields", None) or []]
+    if equality and equality != ["_id"]:
+        required.append(tuple((f, ASCENDING) for f in equality))
+    return list(dict.fromkeys(required))
+
+
+def _keys(info: dict[str, Any]) -> IndexKey:
+    return tuple((k, int(d)) if isinstance(d, (int, float)) else (k, d) for k, d in info["key"])
+
+
+def is_covered(required: IndexKey, existing: Iterable[IndexKey]) -> bool:
+    """
+    Whether an existing index serves equality matches on the fields of required, i.e. its
+    leading fields are those fields in any order
+    """
+    fields = {k for k, _ in required}
+    return any({k for k, _ in index[: len(required)]} == fields for index in existing)
+
+
+def redundant_indexes(index_information: dict[str, dict[str, Any]]) -> list[str]:
+    """Names of indexes that are a strict prefix of another index, _id and unique ones aside"""
+    keys = {name: _keys(info) for name, info in index_information.items()}
+    redundant = []
+    for name, key in keys.items():
+        info = index_information[name]
+        ## Indexes with options do more than speed up queries
+        if name == "_id_" or any(o in info for o in ("unique", "sparse", "expireAfterSeconds")):
+            continue
+        if any(
+            other != name and len(other_key) > len(key) and other_key[: len(key)] == key
+            for other, other_key in keys.items()
+        ):
+            redundant.append(name)
+    return redundant
+
+
+async def _unused_indexes(collection: Any) -> Optional[list[str]]:
+    try:
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+    except Exception as e:
+        log.debug(f"ensure_indexes: no $indexStats for {collection.name}: {e}")
+        return None
+    return [s["name"] for s in stats if s["name"] != "_id_" and not s["accesses"]["ops"]]
+
+
+async def ensure_collection_indexes(
+    collection: Any, required: list[IndexKey], create: bool = True
+) -> IndexReport:
+    """
+    Create the required indexes a motor collection is missing and report redundant and
+    unused ones.
+    Args:
+        collection: The motor collection
+        required (list): Index keys as lists of (field, direction)
+        create (bool): Only report missing indexes when False
+    """
+    report = IndexReport(collection=collection.name)
+    information = await collection.index_information()
+    existing = [_keys(info) for info in information.values()]
+    for key in required:
+        if is_covered(key, existing):
+            continue
+        report.missing.append(key)
+        if create:
+            log.info(f"ensure_indexes: creating index {key} on {collection.name}")
+            await collection.create_index(list(key), background=True)
+            report.created.append(key)
+            existing.append(key)
+        else:
+            log.warning(f"ensure_indexes: {collection.name} is missing index {key}")
+    report.redundant = redundant_indexes(information)
+    report.unused = await _unused_indexes(collection)
+    if report.redundant:
+        log.warning(f"ensure_indexes: redundant indexes on {collection.name}: {report.redundant}")
+    if report.unused:
+        log.info(f"ensure_indexes: unused indexes on {collection.name}: {report.unused}")
+    return report
+
+
+async def ensure_indexes(document_models: Iterable[type], create: bool = True) -> list[IndexReport]:
+    """
+    ensure_collection_indexes for every initialized document model stored in its own
+    collection, with the indexes required_indexes derives from its Settings
+    """
+    reports = []
+    seen = set()
+    for doc_cls in document_models:
+        name = stored_collection(doc_cls)
+        if name is None or name in seen:
+            continue
+        seen.add(name)
+        required = required_indexes(doc_cls)
+        collection = doc_cls.get_motor_collection()
+        if collection is None:
+            continue
+        reports.append(await ensure_collection_indexes(collection, required, create=create))
+    return reports
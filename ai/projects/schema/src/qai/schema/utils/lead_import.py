@@ -0,0 +1,260 @@
+"""
+Streaming import of lead lists, e.g. uploaded csv files of
+name,email,company_name,company_url,job_title,linkedin_url,timezone
+Rows are read lazily, normalized in batches by a pool of workers and written in chunks
+with bulk_upsert, so memory stays bounded by chunk_size whatever the size of the list.
+"""
+
+import asyncio
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional
+
+from pydantic import BaseModel
+
+from qai.schema.extensions import BulkUpsertResult
+from qai.schema.models.company_model import Company
+from qai.schema.models.contact_model import Contact
+from qai.schema.models.email_model import Email
+from qai.schema.models.job_model import Job
+from qai.schema.models.name_model import Name
+from qai.schema.models.person_model import Person
+from qai.schema.models.phone_number_model import PhoneNumber
+from qai.schema.models.social_media_model import SocialMedia, SocialMediaType
+from qai.schema.utils.utils import clean_domain, linkedin_handle
+
+if TYPE_CHECKING:
+    from qai.schema.models.outreach.campaign_model import Campaign
+
+log = getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+## Row errors kept in the progress, later ones are only counted
+MAX_ERRORS = 1000
+
+Row = dict[str, Any]
+
+
+@dataclass
+class Lead:
+    row: int
+    person: Person
+    company: Optional[Company] = None
+
+
+@dataclass
+class LeadImportProgress:
+    """Counts so far, the result lists of bulk_upsert are left empty to bound memory"""
+
+    rows: int = 0
+    failed: int = 0
+    ## (row number, error) of the first MAX_ERRORS failed rows
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    companies: BulkUpsertResult = field(default_factory=BulkUpsertResult)
+    people: BulkUpsertResult = field(default_factory=BulkUpsertResult)
+    contacts: BulkUpsertResult = field(default_factory=BulkUpsertResult)
+
+    def fail(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((row, error))
+
+
+def _count(into: BulkUpsertResult, result: BulkUpsertResult) -> None:
+    into.inserted += result.inserted
+    into.updated += result.updated
+    into.unchanged += result.unchanged
+
+
+def _clean_row(row: Any) -> Row:
+    if isinstance(row, BaseModel):
+        row = row.model_dump()
+    return {
+        str(k).strip().lower(): v.strip() if isinstance(v, str) else v
+        for k, v in row.items()
+        if k is not None
+    }
+
+
+def iter_rows(source: str | Path | Iterable[Any]) -> Iterator[Row]:
+    """
+    The rows of a .csv, or .ndjson / .jsonl, file, or of an iterable of dicts or models,
+    with lowercased keys and stripped values
+    """
+    if not isinstance(source, (str, Path)):
+        for row in source:
+            yield _clean_row(row)
+        return
+    path = Path(source)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.suffix.lower() in (".ndjson", ".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield _clean_row(json.loads(line))
+        else:
+            for row in csv.DictReader(f):
+                yield _clean_row(row)
+
+
+def lead_from_row(row_number: int, row: Row) -> Lead:
+    """
+    Normalize one row. Raises ValueError for rows that can't be matched to a person,
+    i.e. without a valid email or a linkedin_url with a profile handle
+    """
+    fields: dict[str, Any] = {}
+    if row.get("name"):
+        fields["name"] = Name.from_str(row["name"])
+    if row.get("email"):
+        fields["emails"] = [Email(address=row["email"])]
+    if row.get("linkedin_url"):
+        fields["social_media"] = [
+            SocialMedia(url=row["linkedin_url"], type=SocialMediaType.LINKEDIN)
+        ]
+    if row.get("phone"):
+        fields["phone_numbers"] = [PhoneNumber.from_str(row["phone"])]
+    if row.get("timezone"):
+        fields["additional_data"] = {"timezone": row["timezone"]}
+    ## A LinkedIn url without a profile handle, e.g. the feed, doesn't identify anyone
+    if not fields.get("emails") and not (
+        row.get("linkedin_url") and linkedin_handle(row["linkedin_url"])
+    ):
+        raise ValueError("Row has no email or LinkedIn profile url to match the person by")
+
+    company = None
+    domain = clean_domain(row["company_url"]).lower() if row.get("company_url") else None
+    company_name = row.get("company_name") or domain
+    ## Without a domain the company has no key to be matched by, it is only named in the job
+    if domain:
+        company = Company(name=company_name, domains=[domain])
+    if row.get("job_title") or company_name:
+        fields["work_history"] = [
+            Job(title=row.get("job_title"), company=company_name, current=True)
+        ]
+    ## Built last so validation computes the match keys
+    person = Person(**fields)
+    return Lead(row=row_number, person=person, company=company)
+
+
+def normalize_rows(rows: list[tuple[int, Row]]) -> tuple[list[Lead], list[tuple[int, str]]]:
+    """lead_from_row for a batch of (row number, row), run by the workers"""
+    leads = []
+    errors = []
+    for row_number, row in rows:
+        try:
+            leads.append(lead_from_row(row_number, row))
+        except Exception as e:
+            errors.append((row_number, str(e).splitlines()[0]))
+    return leads, errors
+
+
+def _matchable(leads: list[Lead], progress: LeadImportProgress) -> list[Lead]:
+    """The leads bulk_upsert can match, the others fail on their own instead of the chunk"""
+    matchable = []
+    for lead in leads:
+        try:
+            lead.person.match_query()
+            if lead.company is not None:
+                lead.company.match_query()
+        except ValueError as e:
+            progress.fail(lead.row, str(e).splitlines()[0])
+        else:
+            matchable.append(lead)
+    return matchable
+
+
+async def write_leads(
+    leads: list[Lead], campaign: Optional["Campaign"], progress: LeadImportProgress
+) -> None:
+    """Upsert the companies, then the people and then the contacts of a chunk of leads"""
+    leads = _matchable(leads, progress)
+    if not leads:
+        return
+    with_company = [lead for lead in leads if lead.company is not None]
+    companies = await Company.bulk_upsert(
+        [lead.company for lead in with_company], batch_size=len(leads)
+    )
+    _count(progress.companies, companies)
+    for lead, company in zip(with_company, companies.documents):
+        lead.company = company
+        for job in lead.person.work_history or []:
+            job.company_id = company.id
+
+    people = await Person.bulk_upsert([lead.person for lead in leads], batch_size=len(leads))
+    _count(progress.people, people)
+    for lead, person in zip(leads, people.documents):
+        lead.person = person
+
+    if campaign is not None:
+        ## Existing contacts are kept as they are, like Contact.get_or_create does
+        contacts = await Contact.bulk_upsert(
+            [Contact.from_data(lead.person, lead.company, campaign) for lead in leads],
+            batch_size=len(leads),
+            merge=False,
+        )
+        _count(progress.contacts, contacts)
+
+
+async def import_leads(
+    source: str | Path | Iterable[Any],
+    campaign: Optional["Campaign"] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    on_progress: Optional[Callable[[LeadImportProgress], None]] = None,
+) -> LeadImportProgress:
+    """
+    Import a lead list as People, Companies and, with a campaign, its Contacts.
+    Chunks of rows are normalized by the workers while earlier chunks are written, at most
+    max_workers chunks are in flight.
+    Args:
+        source: A csv or ndjson file, or an iterable of rows, see iter_rows
+        campaign (Campaign): The saved campaign to add contacts to, None for no contacts
+        chunk_size (int): Rows per normalization batch and per bulk write
+        max_workers (int): Workers of the default process pool, the cpu count by default
+        executor (Executor): Normalize rows in this executor instead of a process pool
+        on_progress (Callable): Called with the progress after each written chunk
+    Returns:
+        LeadImportProgress: The row, failure and upsert counts
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    own_executor = executor is None
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    loop = asyncio.get_running_loop()
+    progress = LeadImportProgress()
+    pending: deque[asyncio.Future] = deque()
+
+    async def write_next():
+        leads, errors = await pending.popleft()
+        for row_number, error in errors:
+            progress.fail(row_number, error)
+        await write_leads(leads, campaign, progress)
+        if on_progress is not None:
+            on_progress(progress)
+
+    try:
+        rows = enumerate(iter_rows(source), start=1)
+        while chunk := list(islice(rows, chunk_size)):
+            progress.rows += len(chunk)
+            pending.append(loop.run_in_executor(executor, normalize_rows, chunk))
+            if len(pending) >= max_workers:
+                await write_next()
+        while pending:
+            await write_next()
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+    log.info(
+        f"import_leads: {progress.rows} rows, {progress.failed} failed, "
+        f"people +{progress.people.inserted} ~{progress.people.updated}, "
+        f"companies +{progress.companies.inserted} ~{progress.companies.updated}, "
+        f"contacts +{progress.contacts.inserted}"
+    )
+    return progress
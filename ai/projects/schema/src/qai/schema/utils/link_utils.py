@@ -0,0 +1,89 @@
+from typing import Any, Iterable, Optional
+
+from beanie import Link
+from beanie.odm.fields import LinkTypes
+from beanie.operators import In
+from pymongo.client_session import ClientSession
+
+DEFAULT_CHUNK_SIZE = 1000
+
+## Back links are not stored on the document, so there are no ids to collect
+_BACK_LINKS = {
+    LinkTypes.BACK_DIRECT,
+    LinkTypes.BACK_LIST,
+    LinkTypes.OPTIONAL_BACK_DIRECT,
+    LinkTypes.OPTIONAL_BACK_LIST,
+}
+
+ResolvedDocs = dict[tuple[type, Any], Any]
+
+
+def _link_fields(doc: Any) -> list[str]:
+    link_fields = doc.get_link_fields() or {}
+    return [info.field_name for info in link_fields.values() if info.link_type not in _BACK_LINKS]
+
+
+def _links(value: Any) -> list[Link]:
+    if isinstance(value, Link):
+        return [value]
+    if isinstance(value, list):
+        return [v for v in value if isinstance(v, Link)]
+    return []
+
+
+def _wire(doc: Any, resolved: ResolvedDocs) -> None:
+    """Replace the links of doc with their documents, keeping links that were not found"""
+
+    def get(link: Link) -> Any:
+        return resolved.get((link.document_class, link.ref.id), link)
+
+    for name in _link_fields(doc):
+        value = getattr(doc, name, None)
+        if isinstance(value, Link):
+            setattr(doc, name, get(value))
+        elif isinstance(value, list) and any(isinstance(v, Link) for v in value):
+            setattr(doc, name, [get(v) if isinstance(v, Link) else v for v in value])
+
+
+async def fetch_links_batched(
+    docs: Iterable[Any],
+    depth: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    session: Optional[ClientSession] = None,
+) -> None:
+    """
+    Resolve the links of docs in place with one $in query per linked document class and
+    chunk_size ids, instead of queries per document as fetch_all_links does.
+    Args:
+        docs (Iterable): Documents, possibly of different classes
+        depth (int): Levels of links to resolve, 2 also resolves the links of linked documents
+        chunk_size (int): Ids per $in query
+    """
+    resolved: ResolvedDocs = {}
+    level = list(docs)
+    for _ in range(depth):
+        ## Ordered sets of the ids to fetch per document class
+        wanted: dict[type, dict[Any, None]] = {}
+        for doc in level:
+            for name in _link_fields(doc):
+                for link in _links(getattr(doc, name, None)):
+                    key = (link.document_class, link.ref.id)
+                    if key not in resolved:
+                        wanted.setdefault(link.document_class, {})[link.ref.id] = None
+        fetched = []
+        for doc_cls, ids in wanted.items():
+            id_list = list(ids)
+            for start in range(0, len(id_list), chunk_size):
+                found = await doc_cls.find(
+                    In("_id", id_list[start : start + chunk_size]),
+                    with_children=True,
+                    session=session,
+                ).to_list()
+                for d in found:
+                    resolved[(doc_cls, d.id)] = d
+                fetched.extend(found)
+        for doc in level:
+            _wire(doc, resolved)
+        if not fetched:
+            break
+        level = fetched
@@ -0,0 +1,90 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Mapping, Optional
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_SIZE = 10_000
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, re.Pattern):
+        return {"$regex": value.pattern, "$flags": value.flags}
+    return str(value)
+
+
+def lookup_key(collection: str, query: Mapping[str, Any]) -> tuple[str, str]:
+    """(collection, canonical json of query), equal for queries that match the same way"""
+    return collection, json.dumps(query, sort_keys=True, default=_canonical)
+
+
+class LookupCache:
+    """
+    Documents found by lookup queries, least recently used first out, for ttl seconds.
+    Entries of a document are dropped with invalidate when it is written, so writes in
+    this process are seen at once and writes of other processes after at most ttl seconds.
+    Cached documents are copied on the way in and out, callers can change what they get
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_size: int = DEFAULT_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+        ## (collection, document id) -> the keys it is cached under
+        self._keys_by_id: dict[tuple[str, Hashable], set[tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, collection: str, query: Mapping[str, Any]) -> Optional[Any]:
+        key = lookup_key(collection, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            doc = entry[1]
+        return doc.model_copy(deep=True)
+
+    def set(self, collection: str, query: Mapping[str, Any], doc: Any) -> None:
+        if doc is None or doc.id is None:
+            return
+        key = lookup_key(collection, query)
+        doc = doc.model_copy(deep=True)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, doc)
+            self._keys_by_id.setdefault((collection, doc.id), set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        id_key = (key[0], entry[1].id)
+        keys = self._keys_by_id.get(id_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[id_key]
+
+    def invalidate(self, collection: str, doc_id: Hashable) -> None:
+        """Drop every entry of a document"""
+        with self._lock:
+            for key in list(self._keys_by_id.get((collection, doc_id), ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
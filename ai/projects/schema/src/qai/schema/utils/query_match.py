@@ -0,0 +1,69 @@
+import re
+from typing import Any, Iterator
+
+_MISSING = object()
+
+
+def _values(doc: Any, path: list[str]) -> Iterator[Any]:
+    """The values at a dotted path, descending into lists like MongoDB does"""
+    if not path:
+        yield doc
+        return
+    if isinstance(doc, list):
+        for item in doc:
+            yield from _values(item, path)
+        return
+    if not isinstance(doc, dict):
+        return
+    value = doc.get(path[0], _MISSING)
+    if value is _MISSING:
+        return
+    yield from _values(value, path[1:])
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if isinstance(expected, re.Pattern):
+        return isinstance(value, str) and expected.search(value) is not None
+    return value == expected
+
+
+def _value_matches(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, operand in condition.items():
+            if op == "$in":
+                if not any(_value_matches(value, o) for o in operand):
+                    return False
+            elif op == "$eq":
+                if not _value_matches(value, operand):
+                    return False
+            else:
+                raise ValueError(f"matches: unsupported operator {op}")
+        return True
+    if isinstance(value, list) and not isinstance(condition, list):
+        ## A list field matches when any of its elements does
+        return any(_equals(v, condition) for v in value)
+    return _equals(value, condition)
+
+
+def matches(query: dict[str, Any], doc: dict[str, Any]) -> bool:
+    """
+    Whether doc (a dict as stored, e.g. model_dump(by_alias=True)) matches a MongoDB query.
+    Supports the subset used by match_query: dotted paths, equality, compiled regexes,
+    $in, $eq, $and and $or
+    """
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(q, doc) for q in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(q, doc) for q in condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError(f"matches: unsupported operator {key}")
+        else:
+            values = list(_values(doc, key.split(".")))
+            if not values:
+                values = [None]
+            if not any(_value_matches(v, condition) for v in values):
+                return False
+    return True
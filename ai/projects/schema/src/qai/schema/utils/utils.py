@@ -1,5 +1,7 @@
 import re
 from enum import StrEnum
+from typing import Optional
+from urllib.parse import unquote
 
 
 class MatchingAlgorithm(StrEnum):
@@ -22,6 +24,29 @@ def clean_domain(domain: str) -> str:
     return domain
 
 
+def normalize_domain(domain: str) -> str:
+    """clean_domain, lowercased, e.g. "https://www.Acme.com/" -> "acme.com" """
+    return clean_domain(domain.strip()).lower()
+
+
+def normalize_email(address: str) -> str:
+    return address.strip().lower()
+
+
+_LINKEDIN_PATH = re.compile(r"linkedin\.com/(?:in|pub|company|school)/([^/?#]+)", re.IGNORECASE)
+
+
+def linkedin_handle(url: str) -> Optional[str]:
+    """
+    The lowercased vanity name of a LinkedIn profile or company url, e.g.
+    "https://www.linkedin.com/in/Jane-Doe/?trk=x" -> "jane-doe". None if url is not one
+    """
+    m = _LINKEDIN_PATH.search(url)
+    if not m:
+        return None
+    return unquote(m.group(1)).strip().lower() or None
+
+
 def title_matches(
     title: str,
     filter_titles: list[str],
@@ -0,0 +1,83 @@
+import re
+
+import pytest
+from beanie import PydanticObjectId
+
+from qai.schema import BulkUpsertResult, Company, Email, Name, Person
+from qai.schema.utils.query_match import matches
+
+
+def test_matches_dotted_list_paths():
+    doc = {"emails": [{"address": "a@x.com"}, {"address": "b@x.com"}], "domains": ["x.com"]}
+    assert matches({"emails.address": "b@x.com"}, doc)
+    assert matches({"emails.address": re.compile("^B@X.COM$", re.IGNORECASE)}, doc)
+    assert matches({"domains": {"$in": ["y.com", "x.com"]}}, doc)
+    assert not matches({"domains": {"$in": ["y.com"]}}, doc)
+
+
+def test_matches_and_or():
+    doc = {"name": "acme", "domains": ["acme.com"], "linkedin_id": None}
+    assert matches({"$or": [{"linkedin_id": 5}, {"$and": [{"name": "acme"}]}]}, doc)
+    assert not matches({"$and": [{"name": "acme"}, {"linkedin_id": 5}]}, doc)
+    assert matches({"missing": None}, doc)
+
+
+def _person(first: str, email: str, skills=None) -> Person:
+    return Person(name=Name(first=first), emails=[Email(address=email)], skills=skills)
+
+
+def test_plan_inserts_and_merges_duplicates_in_batch():
+    batch = [_person("a", "a@x.com"), _person("b", "b@x.com"), _person("a", "A@x.com", ["go"])]
+    queries = [p.match_query() for p in batch]
+    result, inserts, updates = Person._plan_bulk_upsert(batch, queries, [])
+    assert isinstance(result, BulkUpsertResult)
+    assert (result.inserted, result.updated, result.unchanged) == (2, 0, 0)
+    assert len(inserts) == 2 and not updates
+    assert all(p.id is not None for p in inserts)
+    ## The third person is merged into the first
+    assert result.documents[2] is result.documents[0]
+    assert result.documents[0].skills == ["go"]
+
+
+def test_plan_updates_only_changed_existing():
+    same = _person("a", "a@x.com")
+    same.id = PydanticObjectId()
+    changed = _person("b", "b@x.com")
+    changed.id = PydanticObjectId()
+    batch = [_person("a", "a@x.com"), _person("b", "b@x.com", ["sql"])]
+    queries = [p.match_query() for p in batch]
+    result, inserts, updates = Person._plan_bulk_upsert(batch, queries, [same, changed])
+    assert (result.inserted, result.updated, result.unchanged) == (0, 1, 1)
+    assert updates == [changed]
+    assert changed.skills == ["sql"]
+    assert result.documents == [same, changed]
+
+
+def test_plan_without_merge_keeps_existing():
+    existing = _person("b", "b@x.com")
+    existing.id = PydanticObjectId()
+    batch = [
+        _person("b", "b@x.com", ["sql"]),
+        _person("c", "c@x.com"),
+        _person("c", "c@x.com", ["go"]),
+    ]
+    queries = [p.match_query() for p in batch]
+    result, inserts, updates = Person._plan_bulk_upsert(batch, queries, [existing], merge=False)
+    assert (result.inserted, result.updated, result.unchanged) == (1, 0, 1)
+    assert inserts == [batch[1]] and not updates
+    assert result.documents == [existing, batch[1], batch[1]]
+    assert existing.skills is None and batch[1].skills is None
+
+
+def test_plan_company_domains():
+    existing = Company(name="acme", domains=["acme.com"])
+    existing.id = PydanticObjectId()
+    batch = [Company(name="acme", domains=["https://www.acme.com"], industries=["tools"])]
+    queries = [c.match_query() for c in batch]
+    result, inserts, updates = Company._plan_bulk_upsert(batch, queries, [existing])
+    assert not inserts and updates == [existing]
+    assert existing.industries == ["tools"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
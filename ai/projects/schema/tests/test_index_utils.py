@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from qai.schema import Address, Company, Contact, Email, Name, Person, SocialMedia, SocialMediaType
+from qai.schema import extensions
+from qai.schema.utils.index_utils import (
+    ensure_collection_indexes,
+    is_covered,
+    redundant_indexes,
+    required_indexes,
+    stored_collection,
+)
+
+
+class FakeCursor:
+    def __init__(self, items):
+        self.items = items
+
+    async def to_list(self, length=None):
+        return self.items
+
+
+class FakeCollection:
+    name = "fake"
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self.created = []
+
+    async def index_information(self):
+        return self.indexes
+
+    async def create_index(self, keys, **kwargs):
+        self.created.append(keys)
+
+    def aggregate(self, pipeline):
+        stats = [{"name": n, "accesses": {"ops": 0 if n == "b_1" else 3}} for n in self.indexes]
+        return FakeCursor(stats)
+
+
+def test_required_indexes():
+    assert required_indexes(Person) == [
+        (("email_keys", 1),),
+        (("linkedin_handles", 1),),
+        (("name_address_keys", 1),),
+        (("social_media.url", 1),),
+    ]
+    assert required_indexes(Company) == [
+        (("domain_keys", 1),),
+        (("linkedin_handles", 1),),
+        (("linkedin_id", 1),),
+        (("social_media.url", 1),),
+    ]
+    assert required_indexes(Contact) == [(("person_id", 1), ("campaign_id", 1))]
+
+
+def test_every_match_branch_indexed(monkeypatch):
+    ## A branch of the $or without an index makes MongoDB scan the whole collection
+    monkeypatch.setattr(extensions, "backfilled_collections", {"people"})
+    person = Person(
+        name=Name(first="Jane", last="Doe"),
+        emails=[Email(address="jane@example.com")],
+        addresses=[Address(city="Springfield")],
+        social_media=[
+            SocialMedia(url="https://linkedin.com/in/jane", type=SocialMediaType.LINKEDIN),
+            SocialMedia(url="https://twitter.com/jane", type=SocialMediaType.TWITTER),
+        ],
+    )
+    indexed = {key[0][0] for key in required_indexes(Person)}
+    for branch in person.match_query()["$or"]:
+        fields = [next(iter(c)) for c in branch.get("$and", [branch])]
+        assert indexed.intersection(fields), branch
+
+
+def test_stored_collection():
+    assert stored_collection(Person) == "people"
+    assert stored_collection(Address) is None
+
+
+def test_is_covered_by_prefix_in_any_order():
+    existing = [(("campaign_id", 1), ("person_id", 1), ("x", 1))]
+    assert is_covered((("person_id", 1), ("campaign_id", 1)), existing)
+    assert not is_covered((("x", 1),), existing)
+
+
+def test_redundant_indexes():
+    info = {
+        "_id_": {"key": [("_id", 1)]},
+        "a_1": {"key": [("a", 1)]},
+        "a_1_b_1": {"key": [("a", 1), ("b", 1)]},
+        "b_1": {"key": [("b", 1)], "unique": True},
+    }
+    assert redundant_indexes(info) == ["a_1"]
+
+
+def test_ensure_collection_indexes():
+    collection = FakeCollection(
+        {"_id_": {"key": [("_id", 1)]}, "a_1": {"key": [("a", 1)]}, "b_1": {"key": [("b", 1)]}}
+    )
+    required = [(("a", 1),), (("c", 1), ("d", 1))]
+    report = asyncio.run(ensure_collection_indexes(collection, required))
+    assert collection.created == [[("c", 1), ("d", 1)]]
+    assert report.created == report.missing == [(("c", 1), ("d", 1))]
+    assert report.unused == ["b_1"]
+
+    collection = FakeCollection({"_id_": {"key": [("_id", 1)]}})
+    report = asyncio.run(ensure_collection_indexes(collection, required, create=False))
+    assert not collection.created and len(report.missing) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
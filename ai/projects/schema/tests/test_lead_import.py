@@ -0,0 +1,136 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from beanie import PydanticObjectId
+
+from qai.schema import BulkUpsertResult, Campaign, Company, Contact, Email, Name, Person
+from qai.schema.utils.lead_import import (
+    Lead,
+    LeadImportProgress,
+    import_leads,
+    iter_rows,
+    normalize_rows,
+    write_leads,
+)
+
+HEADER = "name,email,company_name,company_url,job_title,linkedin_url,timezone\n"
+
+
+@pytest.fixture
+def fake_upserts(monkeypatch):
+    """bulk_upsert that only assigns ids, recording the batch sizes"""
+    batches = {}
+
+    def fake(doc_cls):
+        async def bulk_upsert(docs, batch_size=None, **kwargs):
+            docs = list(docs)
+            batches.setdefault(doc_cls.__name__, []).append(len(docs))
+            if doc_cls is not Contact:
+                ## Like bulk_upsert, fails for documents without a match key
+                for doc in docs:
+                    doc.match_query()
+            for doc in docs:
+                doc.id = doc.id or PydanticObjectId()
+            return BulkUpsertResult(documents=docs, inserted=len(docs))
+
+        return bulk_upsert
+
+    for doc_cls in (Company, Person, Contact):
+        monkeypatch.setattr(doc_cls, "bulk_upsert", fake(doc_cls))
+    ## Contacts link to people and companies, which needs initialized collections
+    monkeypatch.setattr(
+        Contact, "from_data", staticmethod(lambda p, c, campaign: Campaign(name=str(p.id)))
+    )
+    return batches
+
+
+def test_iter_rows_csv_and_ndjson(tmp_path):
+    csv_path = tmp_path / "leads.csv"
+    csv_path.write_text("Name, Email \n Jane Doe , jane@acme.com\n")
+    assert list(iter_rows(csv_path)) == [{"name": "Jane Doe", "email": "jane@acme.com"}]
+    ndjson_path = tmp_path / "leads.ndjson"
+    ndjson_path.write_text(json.dumps({"Email": "jane@acme.com"}) + "\n\n")
+    assert list(iter_rows(ndjson_path)) == [{"email": "jane@acme.com"}]
+
+
+def test_normalize_rows():
+    leads, errors = normalize_rows(
+        [
+            (
+                1,
+                {
+                    "name": "John Doe",
+                    "email": "JohDoe@gmail.com",
+                    "company_name": "ExComp",
+                    "company_url": "https://www.ExComp.com/",
+                    "job_title": "CEO",
+                    "linkedin_url": "https://www.linkedin.com/in/johndoe",
+                    "timezone": "Asia/Calcutta",
+                },
+            ),
+            (2, {"name": "No Keys"}),
+            (3, {"email": "not an email"}),
+            (4, {"email": "jane@acme.com", "company_name": "Acme"}),
+            (5, {"name": "Jane", "linkedin_url": "https://www.linkedin.com/feed/"}),
+        ]
+    )
+    assert [e[0] for e in errors] == [2, 3, 5]
+    lead, no_domain = leads
+    ## A company without a domain can't be matched, it is only named in the job
+    assert no_domain.company is None
+    assert no_domain.person.work_history[0].company == "Acme"
+    assert lead.person.name.first == "John"
+    assert lead.person.email_keys == ["johdoe@gmail.com"]
+    assert lead.person.linkedin_handles == ["johndoe"]
+    assert lead.person.work_history[0].title == "CEO"
+    assert lead.person.additional_data == {"timezone": "Asia/Calcutta"}
+    assert lead.company.domain_keys == ["excomp.com"]
+
+
+def test_import_leads_in_chunks(tmp_path, fake_upserts):
+    path = tmp_path / "leads.csv"
+    with open(path, "w") as f:
+        f.write(HEADER)
+        for i in range(25):
+            f.write(f"Person {i},p{i}@acme.com,Acme,acme.com,Engineer,,UTC\n")
+        f.write("Broken,,,,,,\n")
+        f.write("No Url,nourl@acme.com,Acme,,,,\n")
+    campaign = Campaign(name="test")
+    campaign.id = PydanticObjectId()
+    seen = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        progress = asyncio.run(
+            import_leads(
+                path,
+                campaign=campaign,
+                chunk_size=10,
+                max_workers=2,
+                executor=executor,
+                on_progress=lambda p: seen.append(p.rows),
+            )
+        )
+    assert progress.rows == 27 and progress.failed == 1
+    assert progress.errors[0][0] == 26
+    assert progress.people.inserted == progress.contacts.inserted == 26
+    assert progress.companies.inserted == 25
+    assert fake_upserts["Person"] == [10, 10, 6]
+    assert fake_upserts["Contact"] == [10, 10, 6]
+    assert len(seen) == 3
+
+
+def test_unmatchable_lead_fails_alone(fake_upserts):
+    leads = [
+        Lead(row=1, person=Person(emails=[Email(address="jane@acme.com")])),
+        Lead(row=2, person=Person(name=Name(first="Nobody"))),
+    ]
+    progress = LeadImportProgress()
+    asyncio.run(write_leads(leads, None, progress))
+    assert progress.failed == 1 and progress.errors[0][0] == 2
+    assert progress.people.inserted == 1
+    assert fake_upserts["Person"] == [1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
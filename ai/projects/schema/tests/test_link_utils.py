@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, ClassVar
+
+import pytest
+from beanie import Link, PydanticObjectId
+from beanie.odm.fields import LinkInfo, LinkTypes
+from bson import DBRef
+from pydantic import BaseModel, ConfigDict
+
+from qai.schema.utils.link_utils import fetch_links_batched
+
+
+class FakeQuery:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self):
+        return self.docs
+
+
+class FakeDoc(BaseModel):
+    """Stands in for an initialized document, find serves from store and counts calls"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: PydanticObjectId
+    links: ClassVar[dict] = {}
+    store: ClassVar[dict] = {}
+    finds: ClassVar[list] = []
+
+    @classmethod
+    def get_link_fields(cls):
+        return {
+            name: LinkInfo(
+                field_name=name, lookup_field_name=name, document_class=cls, link_type=link_type
+            )
+            for name, link_type in cls.links.items()
+        }
+
+    @classmethod
+    def find(cls, query, **kwargs):
+        ids = query.query["_id"]["$in"]
+        cls.finds.append(ids)
+        return FakeQuery([cls.store[i] for i in ids if i in cls.store])
+
+
+class Person(FakeDoc):
+    store = {}
+    finds = []
+
+
+class Contact(FakeDoc):
+    person: Any
+    links = {"person": LinkTypes.DIRECT}
+    store = {}
+    finds = []
+
+
+class Campaign(FakeDoc):
+    contacts: list[Any]
+    links = {"contacts": LinkTypes.LIST}
+    store = {}
+    finds = []
+
+
+def _link(doc_cls, doc_id):
+    return Link(DBRef(doc_cls.__name__.lower(), doc_id), doc_cls)
+
+
+def test_fetch_links_batched():
+    people = [Person(id=PydanticObjectId()) for _ in range(5)]
+    Person.store.update({p.id: p for p in people})
+    contacts = [Contact(id=PydanticObjectId(), person=_link(Person, p.id)) for p in people]
+    Contact.store.update({c.id: c for c in contacts})
+    missing = _link(Contact, PydanticObjectId())
+    campaigns = [
+        Campaign(id=PydanticObjectId(), contacts=[_link(Contact, c.id) for c in contacts[:3]]),
+        Campaign(
+            id=PydanticObjectId(),
+            contacts=[_link(Contact, c.id) for c in contacts[2:]] + [missing],
+        ),
+    ]
+
+    asyncio.run(fetch_links_batched(campaigns, depth=2, chunk_size=4))
+
+    ## 6 distinct contact ids in chunks of 4, then 5 people in chunks of 4
+    assert [len(ids) for ids in Contact.finds] == [4, 2]
+    assert [len(ids) for ids in Person.finds] == [4, 1]
+    assert campaigns[0].contacts == contacts[:3]
+    assert campaigns[1].contacts[:3] == contacts[2:]
+    assert campaigns[1].contacts[3] is missing
+    assert [c.person for c in contacts] == people
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import ClassVar, Optional
+
+import pytest
+from beanie import PydanticObjectId
+from beanie.odm.settings.document import DocumentSettings
+
+from qai.schema import Email, Person, disable_lookup_cache, enable_lookup_cache
+from qai.schema.utils.lookup_cache import LookupCache
+
+
+class CountingPerson(Person):
+    """A Person whose find_one serves one stored person and counts the calls"""
+
+    calls: ClassVar[int] = 0
+    stored: ClassVar[Optional[Person]] = None
+
+    @classmethod
+    async def find_one(cls, *args, **kwargs):
+        cls.calls += 1
+        return cls.stored
+
+
+@pytest.fixture
+def cache():
+    CountingPerson.calls = 0
+    CountingPerson.stored = CountingPerson(emails=[Email(address="a@example.com")])
+    CountingPerson.stored.id = PydanticObjectId()
+    yield enable_lookup_cache(ttl=60, max_size=2)
+    disable_lookup_cache()
+
+
+def test_find_one_cached(cache):
+    query = CountingPerson(emails=[Email(address="A@Example.com")]).match_query()
+    first = asyncio.run(CountingPerson.find_one_cached(query))
+    second = asyncio.run(CountingPerson.find_one_cached(query))
+    assert CountingPerson.calls == 1
+    assert first.id == second.id == CountingPerson.stored.id
+    ## Copies, changing one does not change the cache
+    second.skills = ["x"]
+    assert asyncio.run(CountingPerson.get_cached(first.id)).skills is None
+    assert cache.hits == 1
+
+
+def test_write_invalidates(cache):
+    stored = CountingPerson.stored
+    asyncio.run(CountingPerson.get_cached(stored.id))
+    stored._invalidate_lookup_cache()
+    asyncio.run(CountingPerson.get_cached(stored.id))
+    assert CountingPerson.calls == 2
+
+
+def test_upsert_reads_database(cache, monkeypatch):
+    ## upsert validates with the settings of an initialized collection
+    monkeypatch.setattr(CountingPerson, "get_settings", classmethod(lambda cls: DocumentSettings()))
+    stored = CountingPerson.stored
+    asyncio.run(CountingPerson.get_cached(stored.id))
+    person = CountingPerson(emails=[Email(address="a@example.com")])
+    assert asyncio.run(person.upsert()).id == stored.id
+    assert asyncio.run(person.upsert()).id == stored.id
+    assert CountingPerson.calls == 3
+
+
+def test_disabled_cache_passes_through():
+    disable_lookup_cache()
+    CountingPerson.calls = 0
+    asyncio.run(CountingPerson.find_one_cached({"_id": 1}))
+    asyncio.run(CountingPerson.find_one_cached({"_id": 1}))
+    assert CountingPerson.calls == 2
+
+
+def test_ttl_and_size():
+    cache = LookupCache(ttl=0.05, max_size=2)
+    docs = [Person(name=None) for _ in range(3)]
+    for i, doc in enumerate(docs):
+        doc.id = PydanticObjectId()
+        cache.set("people", {"_id": i}, doc)
+    assert len(cache) == 2
+    assert cache.get("people", {"_id": 0}) is None
+    assert cache.get("people", {"_id": 2}).id == docs[2].id
+    time.sleep(0.06)
+    assert cache.get("people", {"_id": 2}) is None
+    assert len(cache) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,163 @@
+import asyncio
+import re
+from typing import Any, ClassVar
+
+import pytest
+from beanie import PydanticObjectId
+from beanie.odm.settings.document import DocumentSettings
+
+from qai.schema import Address, Company, Email, Name, Person, SocialMedia, SocialMediaType
+from qai.schema import extensions
+from qai.schema.utils.utils import linkedin_handle, normalize_domain
+
+
+@pytest.fixture
+def backfilled(monkeypatch):
+    monkeypatch.setattr(extensions, "backfilled_collections", {"people", "companies"})
+
+
+def test_linkedin_handle():
+    assert linkedin_handle("https://www.linkedin.com/in/Jane-Doe/?trk=x") == "jane-doe"
+    assert linkedin_handle("linkedin.com/company/acme") == "acme"
+    assert linkedin_handle("https://twitter.com/jane") is None
+
+
+def test_normalize_domain():
+    assert normalize_domain("https://www.Acme.com/") == "acme.com"
+
+
+def test_person_match_keys():
+    person = Person(
+        name=Name(first="Jane", last="Doe"),
+        emails=[Email(address="Jane.Doe@Example.com")],
+        social_media=[
+            SocialMedia(url="https://linkedin.com/in/JaneDoe/", type=SocialMediaType.LINKEDIN)
+        ],
+        addresses=[Address(city="Springfield", state="IL")],
+    )
+    assert person.email_keys == ["jane.doe@example.com"]
+    assert person.linkedin_handles == ["janedoe"]
+    assert person.name_address_keys == ["jane|doe||springfield|il||"]
+    query = person.match_query()
+    assert {"email_keys": {"$in": ["jane.doe@example.com"]}} in query["$or"]
+    assert {"linkedin_handles": {"$in": ["janedoe"]}} in query["$or"]
+
+
+def test_person_match_keys_follow_changes(backfilled):
+    person = Person(emails=[Email(address="a@example.com")])
+    person.emails.append(Email(address="B@example.com"))
+    assert person.match_query() == {
+        "$or": [{"email_keys": {"$in": ["a@example.com", "b@example.com"]}}]
+    }
+
+
+def test_person_without_keys_raises():
+    with pytest.raises(ValueError):
+        Person(name=Name(first="Jane")).match_query()
+
+
+def test_linkedin_url_without_handle_matches_by_url(backfilled):
+    url = "https://www.linkedin.com/feed/"
+    person = Person(social_media=[SocialMedia(url=url, type=SocialMediaType.LINKEDIN)])
+    assert person.linkedin_handles is None
+    assert person.match_query() == {
+        "$or": [{"$and": [{"social_media.url": url}, {"social_media.type": "linkedin"}]}]
+    }
+    company = Company(
+        name="Acme", social_media=[SocialMedia(url=url, type=SocialMediaType.LINKEDIN)]
+    )
+    assert company.match_query() == {"$or": [{"social_media.url": {"$in": [url]}}]}
+
+
+def test_company_match_keys(backfilled):
+    company = Company(
+        name="Acme",
+        domains=["https://www.Acme.com/"],
+        social_media=[
+            SocialMedia(url="linkedin.com/company/Acme", type=SocialMediaType.LINKEDIN)
+        ],
+    )
+    assert company.domain_keys == ["acme.com"]
+    assert company.linkedin_handles == ["acme"]
+    assert Company.find_by_linkedin_url("https://www.linkedin.com/company/ACME/") == {
+        "linkedin_handles": "acme"
+    }
+    assert company.match_query() == {
+        "$or": [
+            {"$and": [{"name": "Acme"}, {"domain_keys": {"$in": ["acme.com"]}}]},
+            {"linkedin_handles": {"$in": ["acme"]}},
+        ]
+    }
+
+
+def test_legacy_conditions_until_backfilled(monkeypatch):
+    monkeypatch.setattr(extensions, "backfilled_collections", set())
+    person = Person(emails=[Email(address="A@example.com")])
+    legacy = {"emails.address": re.compile("^A@example\\.com$", re.IGNORECASE)}
+    assert person.match_query()["$or"][1] == {"$or": [legacy]}
+    company = Company(name="Acme", domains=["acme.com"])
+    assert {"$and": [{"name": "Acme"}, {"domains": {"$in": ["acme.com"]}}]} in (
+        company.match_query()["$or"]
+    )
+    assert "$or" in Company.find_by_linkedin_url("https://linkedin.com/company/acme")
+
+
+class FakeCollection:
+    def __init__(self):
+        self.ops: list[Any] = []
+
+    async def bulk_write(self, ops, ordered=True, session=None):
+        self.ops.extend(ops)
+
+
+class FakeQuery:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class LegacyPerson(Person):
+    """A Person collection holding one document stored before the match keys"""
+
+    collection: ClassVar[FakeCollection] = None
+    filters: ClassVar[list] = []
+
+    @classmethod
+    def find(cls, *args, **kwargs):
+        cls.filters.append(args[0])
+        doc = cls(emails=[Email(address="A@example.com")])
+        doc.id = PydanticObjectId()
+        return FakeQuery([doc])
+
+    @classmethod
+    def get_motor_collection(cls):
+        return cls.collection
+
+    @classmethod
+    def get_settings(cls):
+        return DocumentSettings(name="people")
+
+
+def test_backfill_match_keys(monkeypatch):
+    monkeypatch.setattr(extensions, "backfilled_collections", set())
+    LegacyPerson.collection = FakeCollection()
+    assert not LegacyPerson.match_keys_backfilled()
+    assert asyncio.run(LegacyPerson.backfill_match_keys()) == 1
+    assert LegacyPerson.filters[0] == {
+        "$and": [{f: {"$exists": False}} for f in Person.Settings.match_keys]
+    }
+    update = LegacyPerson.collection.ops[0]._doc["$set"]
+    assert update["email_keys"] == ["a@example.com"]
+    assert update["linkedin_handles"] is None
+    assert LegacyPerson.match_keys_backfilled()
+    assert Person.match_keys_backfilled()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
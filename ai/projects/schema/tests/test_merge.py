@@ -206,5 +206,39 @@ def test_error_handling():
         strategy.__merge__([1, 2, 3], "not a list", NORMAL_PRIORITY, HIGH_PRIORITY)  # type: ignore
 
 
+class KeyedModel(BaseModel):
+    url: str
+    label: Optional[str] = None
+
+    class Settings:
+        equality_fields = ["url"]
+
+    def __merge__(self, other, self_priority, other_priority):
+        merge_model(
+            source=other, target=self, source_priority=other_priority, target_priority=self_priority
+        )
+        return self
+
+
+def test_list_as_set_merges_by_equality_fields():
+    strategy = SmartListAsSetMergeStrategy()
+    target = [KeyedModel(url="a"), KeyedModel(url="b", label="old")]
+    source = [KeyedModel(url="b", label="new"), KeyedModel(url="c")]
+    result = strategy.__merge__(target, source, NORMAL_PRIORITY, HIGH_PRIORITY)
+    assert [m.url for m in result] == ["a", "b", "c"]
+    assert result[1].label == "new"
+
+
+def test_list_as_set_large_lists_keep_order():
+    strategy = SmartListAsSetMergeStrategy()
+    target = [KeyedModel(url=str(i)) for i in range(5000)]
+    source = [KeyedModel(url=str(i), label="x") for i in range(2500, 7500)]
+    result = strategy.__merge__(target, source, NORMAL_PRIORITY, HIGH_PRIORITY)
+    assert [m.url for m in result] == [str(i) for i in range(7500)]
+    assert result[2499].label is None and result[2500].label == "x"
+    ints = strategy.__merge__(list(range(5000)), list(range(7500)), NORMAL_PRIORITY, HIGH_PRIORITY)
+    assert ints == list(range(7500))
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
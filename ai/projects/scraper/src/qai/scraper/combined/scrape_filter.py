@@ -42,7 +42,8 @@ def scrape_filter(
         print(f"Skipping {company} as it already exists")
         return
     # webdir = os.path.expanduser(f"~/data/websites4/{company}")
-    meta = Meta.from_dir(web_dir, create=True, set_save_location=True)
+    ## Journaled, so saving after every scraped page only appends the new files
+    meta = Meta.from_dir(web_dir, create=True, set_save_location=True, journal=True)
     dest_dir = meta.get_dir("raw", create=True)
     ## prepend http if not present
     urls = [url if url.startswith("http") else f"https://{url}" for url in urls]
@@ -51,3 +52,4 @@ def scrape_filter(
     filter = MultiFilter([filter_config], meta=meta)
     filter.process_directory(in_group="raw")
     meta.save(overwrite=True)
+    meta.close()
@@ -25,12 +25,15 @@ classes = ["home-header", "home-footer", "main-header", "main-footer"]
 name = "Simplify"
 unwrap_a = false
 sanitize = false
+in_place = true
 
 [[processors]]
 name = "HtmlWriter"
 out_folder = "simplified_html"
+fix_text = false
 
 [[processors]]
 name = "MarkdownWriter"
 out_folder = "simplified_md"
+fix_text = false
 """
@@ -1,7 +1,12 @@
 import glob
+import hashlib
+import json
+import math
 import os
 import re
+import threading
 import traceback
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, ClassVar
@@ -9,7 +14,7 @@ from typing import Any, ClassVar
 from bs4 import BeautifulSoup
 from pi_conf import Config
 from pi_log import getLogger
-from qai.core import Meta, MetaFile
+from qai.core import Meta, MetaBase, MetaDir, MetaFile
 
 from qai.scraper.processors.processor_factory import get_processor
 from qai.scraper.processors.processors import Processor
@@ -18,17 +23,34 @@ from qai.scraper.utils.bs_utils import make_soup as bs_util_make_soup
 from qai.scraper.utils.bs_utils import make_soup_from_file
 
 from .meta import DirectoryInfo, InstanceInfo
+from .pipeline import CompiledPipeline, FileMatcher
 
 log = getLogger(__name__)
 
 DEFAULT_PARSER = "lxml"
 
+## Compiled pipelines by filter config, so a Filter per company doesn't compile them again
+MAX_CACHED_CONFIGS = 32
+_pipeline_cache: dict[str, list[CompiledPipeline]] = {}
+_pipeline_cache_lock = threading.Lock()
+
+
+def config_key(config: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def clear_pipeline_cache() -> None:
+    with _pipeline_cache_lock:
+        _pipeline_cache.clear()
+
 
 class MultiFilter:
     def __init__(
         self,
         configs: list[str] | list[dict[str, Any]],
         meta: Meta = None,
+        num_workers: int = 1,
+        chunk_size: int = None,
     ):
         # for config in configs:
         #     if "subfolder" not in config.get("default_options", {}):
@@ -41,10 +63,16 @@ class MultiFilter:
                 config = Config.from_dict(config)
             self.configs.append(config)
         self.meta = meta
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        ## Kept across runs, and filters of the same config share compiled pipelines
+        self.filters = [
+            Filter(config, meta=meta, num_workers=num_workers, chunk_size=chunk_size)
+            for config in self.configs
+        ]
 
     def process_directory(self, in_folder: str = None, in_group: str = None):
-        for config in self.configs:
-            f = Filter(config, meta=self.meta)
+        for f in self.filters:
             f.process_directory(in_folder=in_folder, in_group=in_group)
 
 
@@ -55,8 +83,18 @@ class Filter:
         self,
         config: str | dict[str, Any],
         meta: Meta = None,
+        num_workers: int = 1,
+        chunk_size: int = None,
         # subfolder: str = "",
     ):
+        """
+        Args:
+            config (str | dict): The filter config
+            meta (Meta): Metadata that writers add their output files to
+            num_workers (int): Processes used by process_directory, 1 processes in this process
+            chunk_size (int): Files sent to a worker at a time, defaults to spreading
+                the files over 4 chunks per worker
+        """
         if isinstance(config, str):
             self.config = Config.from_str(config)
         else:
@@ -71,6 +109,51 @@ class Filter:
             proc_name = proc_config.get("name")
             self._proc_name2config_map[proc_name] = proc_config
         self.default_parser = config.get("default_parser", DEFAULT_PARSER)
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self._pipelines: list[CompiledPipeline] = None
+        self._config_pipeline: CompiledPipeline = None
+
+    @property
+    def pipelines(self) -> list[CompiledPipeline]:
+        """
+        The compiled pipelines of the config, built on first use. Filters with the same
+        config share them, each with processors bound to its own meta
+        """
+        if self._pipelines is None:
+            key = config_key(self.config)
+            with _pipeline_cache_lock:
+                compiled = _pipeline_cache.get(key)
+            if compiled is None:
+                ## Cached without this filter and its meta, so they are not kept alive
+                compiled = [p.bind(None, None, None) for p in self._compile_pipelines()]
+                with _pipeline_cache_lock:
+                    if len(_pipeline_cache) >= MAX_CACHED_CONFIGS:
+                        _pipeline_cache.pop(next(iter(_pipeline_cache)))
+                    _pipeline_cache[key] = compiled
+            self._pipelines = [
+                p.bind(self._make_processors, self._subsitute_values, self.meta) for p in compiled
+            ]
+        return self._pipelines
+
+    def _compile_pipelines(self) -> list[CompiledPipeline]:
+        if "pipeline" in self.config:
+            url_configs = self.config.get("pipeline", [])
+        else:
+            ## If no configs are specified, then we just use the default config for all files
+            url_configs = [{}]
+        pipelines = []
+        for url_config in url_configs:
+            base_config = self.default_ops.copy()
+            base_config.update(url_config)
+            pipeline = CompiledPipeline.compile(
+                base_config,
+                self._make_processors,
+                match_config=url_config,
+                substitute=self._subsitute_values,
+            )
+            pipelines.append(pipeline)
+        return pipelines
 
     # def _attach_instance_info(self, config: dict[str, Any], key: str, value) -> dict[str, Any]:
     #     if not "_instance_info_" in config:
@@ -82,8 +165,12 @@ class Filter:
         filename_or_webfile_name: MetaFile | str | Path,
         directory_info: DirectoryInfo = None,
     ) -> list[BeautifulSoup]:
-        list_cfgs = self._get_matching_configs(filename_or_webfile_name)
-        if not list_cfgs:
+        matched = [
+            (p, p.config_for(filename_or_webfile_name))
+            for p in self.pipelines
+            if p.matcher.matches(filename_or_webfile_name)
+        ]
+        if not matched:
             return []
 
         log.debug(f"filter:process_file: {filename_or_webfile_name}")
@@ -111,11 +198,12 @@ class Filter:
         )
         instance_info._meta = self.meta
 
-        for i, cfg in enumerate(list_cfgs):
+        for i, (pipeline, cfg) in enumerate(matched):
             instance_info.config = cfg
             instance_info.config_index = i
-            # soup = self.filter_html_file(webfile.full_path(), cfg, instance_info=instance_info)
-            soup = self.filter_html_file(webfile.path, cfg, instance_info=instance_info)
+            soup = make_soup_from_file(webfile.path)
+            procs = pipeline.processors_for(cfg)
+            soup = self._filter_soup(soup, procs, config=cfg, instance_info=instance_info)
             soups.append(soup)
         return soups
 
@@ -179,17 +267,65 @@ class Filter:
             directory_info = DirectoryInfo(_meta=self.meta, in_folder=str(in_folder))
 
         if in_group is None and in_folder:
-            for f in glob.glob(f"{in_folder}/**"):
-                log.debug(f"Filter:Processing {str(f)}")
-                self.process_file(f, directory_info=directory_info)
+            files = glob.glob(f"{in_folder}/**")
         else:
             directory_info.in_folder = in_folder
             g = self.meta.get_dir(in_group)
-            files = list(self.meta.get_files(in_group))
-            for f in files:
-                print(f"Filter:Processing {str(f)}, len={len(files)}")
-                log.debug(f"Filter:Processing {str(f)}, len={len(files)}")
-                self.process_file(f, directory_info=directory_info)
+            files = list(g.get_files())
+        if self.num_workers > 1 and len(files) > 1:
+            self._process_files_parallel(files, directory_info=directory_info)
+            return
+        for f in files:
+            log.debug(f"Filter:Processing {str(f)}, len={len(files)}")
+            self.process_file(f, directory_info=directory_info)
+
+    def _process_files_parallel(self, files: list[str | MetaFile], directory_info: DirectoryInfo):
+        """
+        Process the files in a pool of processes. Every worker gets its own copy of the
+        meta, the nodes the processors add to it are sent back and merged into self.meta
+        """
+        chunk_size = self.chunk_size or math.ceil(len(files) / (self.num_workers * 4))
+        ## Workers look up MetaFiles in their copy of the meta by id
+        by_id = isinstance(files[0], MetaFile)
+        items = [str(f.id) if by_id else str(f) for f in files]
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+        meta_data = self.meta.model_dump(exclude_none=True, mode="json") if self.meta else None
+        log.debug(f"Filter:Processing {len(files)} files in {len(chunks)} chunks")
+
+        ## Maps the ids of nodes created in the workers to the merged nodes
+        merged: dict[str, MetaBase] = {}
+        with ProcessPoolExecutor(
+            max_workers=min(self.num_workers, len(chunks)),
+            initializer=_init_worker,
+            initargs=(self.config, meta_data, directory_info.in_folder, by_id),
+        ) as executor:
+            ## map keeps the order of the chunks, so the merged meta matches a serial run
+            for new_nodes in executor.map(_process_chunk, chunks):
+                self._merge_nodes(new_nodes, merged)
+
+    def _merge_nodes(self, new_nodes: list[dict[str, Any]], merged: dict[str, MetaBase]):
+        """Add the nodes created by a worker to self.meta"""
+        for entry in new_nodes:
+            data = dict(entry["node"])
+            worker_id = data["id"]
+            parent_id = entry["parent_id"]
+            if parent_id is None:
+                node = MetaBase.deserialize(data)
+                self.meta.add_meta(node)
+                merged[worker_id] = node
+                continue
+            parent = merged.get(parent_id) or self.meta.get_by_id(parent_id)
+            node = MetaBase.deserialize(data)
+            if isinstance(node, MetaDir):
+                ## Every worker creates its own out_folder, merge them by path
+                existing = next((d for d in parent.directories if d.path == node.path), None)
+                if existing is not None:
+                    merged[worker_id] = existing
+                    continue
+                parent.add_dir(node)
+            else:
+                parent.add_file(node)
+            merged[worker_id] = node
 
     def _subsitute_values(self, config: dict, filename: MetaFile) -> dict:
         for k, v in config.items():
@@ -203,23 +339,6 @@ class Filter:
                 config[k] = v
         return config
 
-    def _get_matching_configs(self, file_name: MetaFile) -> list[dict[str, Any]]:
-        ## If we have a list of configs, then we need to match the file_name to the regex
-        if "pipeline" in self.config:
-            configs = []
-            for url_config in self.config.get("pipeline", []):
-                if not self._should_include(file_name, url_config):
-                    continue
-
-                ### Not specifying anything matches all files
-                base_config = self.default_ops.copy()
-                base_config.update(url_config)
-                configs.append(self._subsitute_values(base_config, filename=file_name))
-            return configs
-        ## If no configs are specified, then we just use the default config for all files
-        base_config = self.default_ops.copy()
-        return [self._subsitute_values(base_config, filename=file_name)]
-
     def _get_pipeline(self, processor_names: list[str], config: dict[str, Any]) -> list[Processor]:
 
         pipeline = []
@@ -256,8 +375,12 @@ class Filter:
         self, soup: BeautifulSoup, config: dict[str, Any] = None, instance_info=None
     ) -> BeautifulSoup:
         if config is None:
+            if self._config_pipeline is None:
+                self._config_pipeline = CompiledPipeline.compile(self.config, self._make_processors)
             config = self.config
-        procs = self._make_processors(config)
+            procs = self._config_pipeline.processors_for(config)
+        else:
+            procs = self._make_processors(config)
 
         return self._filter_soup(soup, procs, config=config, instance_info=instance_info)
 
@@ -293,6 +416,50 @@ class Filter:
         return bs_util_make_soup(html_str_or_path_or_fp, default_parser=default_parser)
 
 
+## State of a filter worker process, set once per process by _init_worker
+_worker_filter: Filter = None
+_worker_directory_info: DirectoryInfo = None
+_worker_by_id: bool = False
+
+
+def _init_worker(config: dict[str, Any], meta_data: dict[str, Any], in_folder: str, by_id: bool):
+    global _worker_filter, _worker_directory_info, _worker_by_id
+    meta = Meta.from_dict(meta_data) if meta_data is not None else None
+    _worker_filter = Filter(config, meta=meta)
+    _worker_directory_info = DirectoryInfo(_meta=meta, in_folder=in_folder)
+    _worker_by_id = by_id
+
+
+def _process_chunk(items: list[str]) -> list[dict[str, Any]]:
+    """
+    Process a chunk of files in a worker
+    Returns:
+        list[dict]: The nodes added to the meta while processing, parents first
+    """
+    meta = _worker_filter.meta
+    known = set()
+    if meta is not None:
+        known = {meta.id, *(m.id for m in meta.metas or []), *(n.id for n in meta.get_all())}
+    for item in items:
+        f = meta.get_by_id(item) if _worker_by_id else item
+        _worker_filter.process_file(f, directory_info=_worker_directory_info)
+    if meta is None:
+        return []
+
+    new_nodes = []
+    for node in [*(meta.metas or []), *meta.get_all()]:
+        if node.id in known:
+            continue
+        exclude = {"files", "directories"} if isinstance(node, MetaDir) else None
+        data = node.model_dump(exclude_none=True, mode="json", exclude=exclude)
+        if getattr(node, "path", None):
+            ## Absolute, the parent of the node may be a different object when merged
+            data["path"] = str(node.path)
+        parent_id = str(node.parent_id) if node.parent_id else None
+        new_nodes.append({"parent_id": parent_id, "node": data})
+    return new_nodes
+
+
 def get_processor_config_map(config: dict[str, Any]) -> dict[str, Any]:
     cfg = config.copy()
     d = {}
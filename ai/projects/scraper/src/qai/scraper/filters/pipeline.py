@@ -0,0 +1,153 @@
+import copy
+import os
+import re
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from pi_log import getLogger
+from qai.core import MetaFile
+
+from qai.scraper.processors.processors import Processor
+
+log = getLogger(__name__)
+
+## Values in a pipeline config that are substituted per file, see Filter._subsitute_values
+PLACEHOLDERS = ("<filename>", "<basename>")
+
+
+@dataclass
+class FileMatcher:
+    """
+    Precompiled url_regex, file_regex, exclude_url_regex and exclude_file_regex of a pipeline
+    """
+
+    url_regex: Optional[re.Pattern] = None
+    file_regex: Optional[re.Pattern] = None
+    exclude_url_regex: Optional[re.Pattern] = None
+    exclude_file_regex: Optional[re.Pattern] = None
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "FileMatcher":
+        keys = ("url_regex", "file_regex", "exclude_url_regex", "exclude_file_regex")
+        return cls(**{k: re.compile(config[k]) for k in keys if k in config})
+
+    @property
+    def matches_all(self) -> bool:
+        return (
+            self.url_regex is None
+            and self.file_regex is None
+            and self.exclude_url_regex is None
+            and self.exclude_file_regex is None
+        )
+
+    def matches(self, file_info: str | Path | MetaFile) -> bool:
+        """
+        Returns True if the file should be included,
+        False if it should be excluded.
+        """
+        if self.matches_all:
+            ### Not specifying anything matches all files
+            return True
+        if isinstance(file_info, (str, Path)):
+            names = {"url": str(file_info), "file": os.path.basename(file_info)}
+        else:
+            names = {"url": "", "file": file_info.path.name}
+
+        for typ in ["url", "file"]:
+            to_match = names[typ]
+            exclude = getattr(self, f"exclude_{typ}_regex")
+            if exclude is not None:
+                if exclude.match(to_match):
+                    log.debug(f"Excluded {to_match} to {exclude.pattern}")
+                    return False
+                log.debug(f"Did not exclude {to_match} to {exclude.pattern}")
+            include = getattr(self, f"{typ}_regex")
+            if include is not None:
+                if include.match(to_match):
+                    log.debug(f"Matched {to_match} to {include.pattern}")
+                    return True
+                log.debug(f"Did not match {to_match} to {include.pattern}")
+        return False
+
+
+def has_placeholders(config: dict[str, Any]) -> bool:
+    return any(
+        isinstance(v, str) and any(p in v for p in PLACEHOLDERS) for v in config.values()
+    )
+
+
+@dataclass
+class CompiledPipeline:
+    """
+    A pipeline of a filter config with its patterns compiled and processors constructed once.
+    Processors are reused across files, those that keep per file state
+    (Processor.reusable = False) are copied for every file
+    """
+
+    config: dict[str, Any]
+    matcher: FileMatcher = field(default_factory=FileMatcher)
+    processors: list[Processor] = field(default_factory=list)
+    ## Builds the processors from a config, used when the config has per file placeholders
+    make_processors: Callable[[dict[str, Any]], list[Processor]] = None
+    substitute: Callable[[dict[str, Any], Any], dict[str, Any]] = None
+    ## Whether the config has per file placeholders
+    per_file: bool = False
+
+    @classmethod
+    def compile(
+        cls,
+        config: dict[str, Any],
+        make_processors: Callable[[dict[str, Any]], list[Processor]],
+        match_config: dict[str, Any] = None,
+        substitute: Callable[[dict[str, Any], Any], dict[str, Any]] = None,
+    ) -> "CompiledPipeline":
+        """
+        Args:
+            config (dict): The config the processors are built from
+            make_processors (Callable): Builds the processors of a config
+            match_config (dict): The config holding the regexes, defaults to config
+            substitute (Callable): Substitutes the per file placeholders of a config
+        """
+        per_file = substitute is not None and has_placeholders(config)
+        return cls(
+            config=config,
+            matcher=FileMatcher.from_config(config if match_config is None else match_config),
+            processors=[] if per_file else make_processors(config),
+            make_processors=make_processors,
+            substitute=substitute if per_file else None,
+            per_file=per_file,
+        )
+
+    def config_for(self, file_info: Any) -> dict[str, Any]:
+        if self.substitute is None:
+            return self.config
+        return self.substitute(self.config.copy(), file_info)
+
+    def bind(
+        self,
+        make_processors: Callable[[dict[str, Any]], list[Processor]],
+        substitute: Callable[[dict[str, Any], Any], dict[str, Any]],
+        meta: Any,
+    ) -> "CompiledPipeline":
+        """
+        This pipeline for another filter with the same config, sharing the compiled
+        patterns. The processors are shallow copies writing to meta
+        """
+        processors = []
+        for p in self.processors:
+            p = copy.copy(p)
+            p.meta = meta
+            processors.append(p)
+        return replace(
+            self,
+            processors=processors,
+            make_processors=make_processors,
+            substitute=substitute if self.per_file else None,
+        )
+
+    def processors_for(self, config: dict[str, Any]) -> list[Processor]:
+        """The processors to run on one file, config is the result of config_for"""
+        if self.substitute is not None:
+            return self.make_processors(config)
+        return [p if p.reusable else copy.copy(p) for p in self.processors]
@@ -3,12 +3,20 @@ from dataclasses import dataclass
 from typing import List
 
 import ftfy
-from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4 import BeautifulSoup, Comment, NavigableString, ProcessingInstruction, Tag
 
 from qai.scraper.processors.tag_denester import TagDenester
+from qai.scraper.utils.bs_utils import (
+    SANITIZE_KILL_TAGS,
+    SANITIZE_KNOWN_TAGS,
+    SANITIZE_UNWRAP_TAGS,
+    normalize_text,
+    strip_unsafe_attributes,
+)
 from qai.scraper.utils.bs_utils import sanitize as sanitize_html_str
 
 from .processors import Processor
+from .tree_pruner import PruneRules, prune
 
 
 @dataclass
@@ -26,38 +34,24 @@ class HTMLSimplifier(Processor):
     unwrap_it: bool = True
     unwrap_img: bool = False
     value_from_attributes: list[str] = None
+    ## Simplify the parsed soup in one pass instead of serializing and re-parsing it
+    in_place: bool = False
 
     def process(self, soup: BeautifulSoup, file_name: str = None, **kwargs) -> BeautifulSoup:
         if file_name is None:
             file_name = self.file_name
+        if self.in_place:
+            return self._process_in_place(soup, file_name=file_name)
         html_str = ftfy.fix_text(str(soup))
         soup = self.make_soup(html_str)
 
         if self.sanitize:
             html_str = sanitize_html_str(str(soup))
             soup = self.make_soup(html_str)
-        ## change values if they are dynamically set in attributes
         if self.value_from_attributes:
-            attrs = set(self.value_from_attributes)
-            for tag in soup.find_all(lambda t: len(t.attrs) and attrs.intersection(t.attrs.keys())):
-                for a in attrs.intersection(tag.attrs.keys()):
-                    tag.string = tag.attrs[a]
+            self._set_values_from_attributes(soup)
         ## Unwrap tags
-        unwrap_tags = set()
-        if self.unwrap_img:
-            unwrap_tags.add("img")
-        if self.unwrap_a:
-            unwrap_tags.add("a")
-        if self.unwrap_b:
-            unwrap_tags.add("b")
-        if self.unwrap_i:
-            unwrap_tags.add("i")
-        if self.unwrap_em:
-            unwrap_tags.add("em")
-        if self.unwrap_strong:
-            unwrap_tags.add("strong")
-        if self.unwrap_it:
-            unwrap_tags.add("it")
+        unwrap_tags = self._unwrap_tags()
         if self.denest:
             soup = TagDenester().process(soup)
 
@@ -108,3 +102,58 @@ class HTMLSimplifier(Processor):
                 html_s = str(soup.prettify())
                 fp.write(html_s)
         return soup
+
+    def _unwrap_tags(self) -> set[str]:
+        unwrap_tags = set()
+        if self.unwrap_img:
+            unwrap_tags.add("img")
+        if self.unwrap_a:
+            unwrap_tags.add("a")
+        if self.unwrap_b:
+            unwrap_tags.add("b")
+        if self.unwrap_i:
+            unwrap_tags.add("i")
+        if self.unwrap_em:
+            unwrap_tags.add("em")
+        if self.unwrap_strong:
+            unwrap_tags.add("strong")
+        if self.unwrap_it:
+            unwrap_tags.add("it")
+        return unwrap_tags
+
+    def _set_values_from_attributes(self, soup: BeautifulSoup):
+        ## change values if they are dynamically set in attributes
+        attrs = set(self.value_from_attributes)
+        for tag in soup.find_all(lambda t: len(t.attrs) and attrs.intersection(t.attrs.keys())):
+            for a in attrs.intersection(tag.attrs.keys()):
+                tag.string = tag.attrs[a]
+
+    def _process_in_place(self, soup: BeautifulSoup, file_name: str = None) -> BeautifulSoup:
+        """
+        Sanitize, denest, unwrap, remove empty tags and simplify the text of the soup
+        in a single traversal. Text is fixed with ftfy per string, so the soup is never
+        serialized and re-parsed
+        """
+        if self.value_from_attributes:
+            self._set_values_from_attributes(soup)
+        rules = PruneRules(
+            unwrap_tags=self._unwrap_tags(),
+            denest_div=self.denest,
+            denest_span=self.denest,
+            denest_same=self.denest,
+            empty=self.empty,
+            locked=set(["html", "body", "br"]),
+            normalize_text=normalize_text,
+        )
+        if self.sanitize:
+            rules.remove_tags = set(SANITIZE_KILL_TAGS)
+            rules.unwrap_tags |= SANITIZE_UNWRAP_TAGS
+            rules.known_tags = SANITIZE_KNOWN_TAGS
+            rules.remove_strings = (Comment, ProcessingInstruction)
+            rules.attribute_filter = strip_unsafe_attributes
+        soup = prune(soup, rules)
+
+        if file_name:
+            with open(file_name, "w") as fp:
+                fp.write(soup.prettify())
+        return soup
@@ -13,6 +13,8 @@ from qai.core import MetaFile, MetaDir
 class HTMLWriter(Writer):
     file_name: str = None
     prettify: bool = True
+    ## Fix the text with ftfy and re-parse, not needed after an in place HTMLSimplifier
+    fix_text: bool = True
 
     def process(
         self, soup: BeautifulSoup, instance_info: InstanceInfo = None, **kwargs
@@ -20,9 +22,11 @@ class HTMLWriter(Writer):
         group = self._append_and_modify_filename("html", instance_info=instance_info)
         if self.file_name is not None:
             with open(self.file_name, "w") as fp:
-                html_s = ftfy.fix_text(str(soup.prettify()))
-                soup = self.make_soup(html_s)
                 html_s = str(soup.prettify())
+                if self.fix_text:
+                    html_s = ftfy.fix_text(html_s)
+                    soup = self.make_soup(html_s)
+                    html_s = str(soup.prettify())
                 fp.write(html_s)
                 if self.meta:
                     mf = MetaFile(path=self.file_name, metadata={"instance_info": instance_info})
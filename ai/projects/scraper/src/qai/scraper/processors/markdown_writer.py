@@ -16,6 +16,8 @@ from qai.core import MetaFile, MetaDir
 class MarkdownWriter(Writer):
     file_name: str = None
     body_width: int = None
+    ## Fix the text with ftfy, not needed after an in place HTMLSimplifier
+    fix_text: bool = True
 
     def process(
         self, soup: BeautifulSoup, instance_info: dict[str, Any] = None, typ=1
@@ -35,7 +37,9 @@ class MarkdownWriter(Writer):
             self.file_name = f + ".md"
         with open(self.file_name, "w") as fp:
             print(f"Writing markdown to {self.file_name}")
-            html = ftfy.fix_text(str(soup.prettify()))
+            html = str(soup.prettify())
+            if self.fix_text:
+                html = ftfy.fix_text(html)
             if typ == 0:
                 new_str = md(html)
             elif typ == 1:
@@ -20,6 +20,8 @@ class Processor:
     name: str = None
     meta: Meta = None
     default_parser: str = "lxml"
+    ## Whether one instance can process many files, see filters.pipeline.CompiledPipeline
+    reusable: ClassVar[bool] = True
 
     def __post_init__(self):
         if self.name is None:
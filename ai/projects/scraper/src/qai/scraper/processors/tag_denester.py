@@ -4,6 +4,7 @@ from typing import List, Set
 from bs4 import BeautifulSoup
 
 from .processors import Processor
+from .tree_pruner import PruneRules, prune
 import re
 
 def prettify_tag(html, tag):
@@ -23,21 +24,5 @@ class TagDenester(Processor):
         self,
         soup: BeautifulSoup,
     ) -> BeautifulSoup:
-        for e in soup.find_all():
-            if self.div:
-                if e.name == "div":
-                    if e.parent.name == "div":
-                        e.unwrap()
-            if self.span:
-                if e.name == "span":
-                    e.unwrap()
-            if self.all_others:
-                if e.name not in ["div", "span"]:
-                    if e.parent.name == e.name:
-                        e.unwrap()
-            # if self.span and e.name == "span":
-            #     pe = e.parent
-            #     # if self.spans_become_spaces:
-            #         # pe.string += " " + e.get_text().strip()
-            #     e.unwrap()
-        return soup
+        rules = PruneRules(denest_div=self.div, denest_span=self.span, denest_same=self.all_others)
+        return prune(soup, rules)
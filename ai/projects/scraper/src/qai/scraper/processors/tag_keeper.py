@@ -1,10 +1,10 @@
-from collections import defaultdict
 from dataclasses import dataclass
 from typing import Any
 
 from bs4 import BeautifulSoup, Tag
 
 from .processors import Processor
+from .tree_pruner import PruneRules, prune
 
 
 @dataclass
@@ -39,10 +39,8 @@ class TagKeeper(Processor):
         soup: BeautifulSoup,
         instance_info: dict[str, Any] = None,
     ) -> BeautifulSoup:
-        if not self.classes:
-            self.classes = []
+        classes = [] if not self.classes else list(self.classes)
         locked = set()
-        parent_map = defaultdict(set)
         to_keep = []
         if self.html:
             locked.add("html")
@@ -58,7 +56,7 @@ class TagKeeper(Processor):
             to_keep += ["h3"]
         if self.header:
             to_keep += ["header", "head", "page-header"]
-            self.classes += ["header", "head", "page-header"]
+            classes += ["header", "head", "page-header"]
         if self.footer:
             to_keep += ["footer", "foot", "page-footer"]
         if self.javascript:
@@ -84,50 +82,13 @@ class TagKeeper(Processor):
         if self.div:
             to_keep += ["div"]
 
-        to_keep = set(to_keep)
-        to_keep_classes = set(self.classes)
-
-        # Find all tags, then filter out the irrelevant ones
-        remove = set()
-        keep = set()
-
-        def is_a_parent(e: Tag, tocheck: Tag) -> bool:
-            parents = parent_map.get(e, set())
-            if tocheck in parents:
-                return True
-            for p in parents:
-                parents.update(is_a_parent(p))
-            return tocheck in parents
-
-        for e in soup.find_all():
-            if e in keep:
-                continue
-
-            should_keep = False
-            if e.name in to_keep:
-                should_keep = True
-            else:
-                classes = e.get("class")
-                if classes:
-                    classes = set(classes)
-                    if classes.intersection(to_keep_classes):
-                        should_keep = True
-
-            ## keep all tags that are children of the kept tag
-            if should_keep and self.keep_children:
-                keep.update(e.find_all())
-            if should_keep and self.keep_parents:
-                keep.update(e.find_parents())
-
-            if e.name in locked:
-                should_keep = True
-            if should_keep:
-                keep.add(e)
-            else:
-                remove.add(e)
-        remove = remove - keep
-        for e in remove:
-            if e and not e.decomposed:
-                e.decompose()
-
-        return soup
+        ## Everything that is not a kept tag, or one of its parents or children, is removed.
+        ## empty is not applied here, TagKeeper has never removed empty kept tags
+        rules = PruneRules(
+            keep_tags=set(to_keep),
+            keep_classes=set(classes),
+            keep_parents=self.keep_parents,
+            keep_children=self.keep_children,
+            locked=locked,
+        )
+        return prune(soup, rules)
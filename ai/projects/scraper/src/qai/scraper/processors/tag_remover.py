@@ -4,6 +4,7 @@ from typing import Any
 from bs4 import BeautifulSoup
 
 from .processors import Processor
+from .tree_pruner import PruneRules, prune
 
 
 @dataclass
@@ -31,7 +32,7 @@ class TagRemover(Processor):
     def process(
         self, soup: BeautifulSoup, instance_info: dict[str, Any] = None, **kwargs
     ) -> BeautifulSoup:
-        to_remove_classes = [] if not self.classes else self.classes
+        to_remove_classes = [] if not self.classes else list(self.classes)
         to_remove = []
         if self.header:
             to_remove += ["header", "head", "page-header"]
@@ -66,26 +67,15 @@ class TagRemover(Processor):
             to_remove += ["ul"]
         if self.tags:
             to_remove += self.tags
-        if to_remove:
-            for e in soup.find_all(to_remove):
-                e.decompose()
-        ## remove p tags inside a tags
-        if self.p_in_a:
-            for e in soup.find_all("a"):
-                for p in e.find_all("p"):
-                    p.unwrap()
-        to_remove_classes = set(to_remove_classes)
-        # print(soup.prettify())
-        for c in to_remove_classes:
-            for e in soup.find_all(class_=c):
-                e.decompose()
-        if self.empty:
-            locked = set(["html", "body", "br"])
-            for e in soup.find_all():
-                if not e.get_text(strip=True).strip() and e.name not in locked:
-                    e.decompose()
-
-        return soup
+        rules = PruneRules(
+            remove_tags=set(to_remove),
+            remove_classes=set(to_remove_classes),
+            ## remove p tags inside a tags
+            unwrap_inside={"a": {"p"}} if self.p_in_a else {},
+            empty=self.empty,
+            locked=set(["html", "body", "br"]),
+        )
+        return prune(soup, rules)
 
 
 @dataclass
@@ -0,0 +1,248 @@
+import inspect
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+
+@dataclass
+class PruneRules:
+    """
+    Rules evaluated by prune in a single pass over the tree.
+    Removal by name or class takes the whole subtree. When keep_tags or keep_classes
+    is given, everything that is not kept (or locked) is removed
+    """
+
+    remove_tags: set[str] = field(default_factory=set)
+    remove_classes: set[str] = field(default_factory=set)
+    keep_tags: Optional[set[str]] = None
+    keep_classes: set[str] = field(default_factory=set)
+    keep_parents: bool = True
+    keep_children: bool = True
+    ## Never removed by the keep or empty rules
+    locked: set[str] = field(default_factory=set)
+    ## Remove tags without any (non whitespace) text
+    empty: bool = False
+    ## Unwrap tags below an ancestor, e.g. {"a": {"p"}} unwraps p tags inside a tags
+    unwrap_inside: dict[str, set[str]] = field(default_factory=dict)
+    ## Unwrap divs directly inside divs, all spans, and other tags inside a tag of the same name
+    denest_div: bool = False
+    denest_span: bool = False
+    denest_same: bool = False
+    ## Tags replaced by their contents, and when known_tags is given, tags not in it
+    unwrap_tags: set[str] = field(default_factory=set)
+    known_tags: Optional[set[str]] = None
+    ## Types of strings to remove, e.g. Comment
+    remove_strings: tuple = ()
+    ## Called on every visited tag, e.g. to remove attributes
+    attribute_filter: Optional[Callable[[Tag], None]] = None
+    ## When given, adjacent strings of a tag are joined with a space and normalized with it
+    normalize_text: Optional[Callable[[str], str]] = None
+
+    @property
+    def keep_mode(self) -> bool:
+        return self.keep_tags is not None or bool(self.keep_classes)
+
+
+@dataclass
+class _Context:
+    ## Keys of unwrap_inside among the ancestors
+    inside: frozenset = frozenset()
+    ## Name of the nearest ancestor that is not unwrapped
+    parent_name: str = None
+    ancestor_kept: bool = False
+
+
+@dataclass
+class _Frame:
+    node: Tag
+    ## Context of the children of the node
+    context: _Context
+    ## Position of the node in its parent
+    index: int = 0
+    matched: bool = False
+    unwrap: bool = False
+    children: list = None
+    position: int = 0
+    ## Types of the non whitespace strings below the node
+    text_types: set = field(default_factory=set)
+    matched_below: bool = False
+    ## (index, child) of the children to decompose or unwrap
+    to_remove: list = field(default_factory=list)
+    to_unwrap: list = field(default_factory=list)
+
+
+def _classes(tag: Tag) -> list[str]:
+    classes = tag.get("class")
+    if not classes:
+        return []
+    if isinstance(classes, str):
+        return classes.split()
+    return classes
+
+
+def _has_text(tag: Tag, text_types: set) -> bool:
+    """Whether tag.get_text(strip=True) would be non empty"""
+    if not text_types:
+        return False
+    types = tag.interesting_string_types
+    if types is None:
+        types = tag.MAIN_CONTENT_STRING_TYPES
+    if isinstance(types, type):
+        return types in text_types
+    return not text_types.isdisjoint(types)
+
+
+## extract looks the element up in its parent, which is linear in the number of siblings.
+## bs4 >= 4.10 accepts the known position as the private _self_index argument
+_EXTRACT_TAKES_INDEX = "_self_index" in inspect.signature(Tag.extract).parameters
+
+
+def _extract(element, index: int):
+    """element.extract() for the element at position index of its parent"""
+    if _EXTRACT_TAKES_INDEX and element.parent is not None and (
+        index < len(element.parent.contents) and element.parent.contents[index] is element
+    ):
+        return element.extract(_self_index=index)
+    return element.extract()
+
+
+def _normalize_strings(tag: Tag, normalize: Callable[[str], str]):
+    run = []
+    for child in [*tag.contents, None]:
+        ## Only text, not comments, scripts or styles
+        if type(child) is NavigableString:
+            run.append(child)
+            continue
+        if not run:
+            continue
+        text = " ".join(run)
+        new_text = normalize(text)
+        if new_text != text or len(run) > 1:
+            run[0].replace_with(NavigableString(new_text))
+        for extra in run[1:]:
+            extra.extract()
+        run = []
+
+
+def prune(soup: BeautifulSoup, rules: PruneRules) -> BeautifulSoup:
+    """
+    Apply the rules with one post order traversal. Whether a tag is empty or has a
+    kept descendant is computed from the results of its children, so no subtree is
+    searched more than once. The changes to the children of a tag are applied when the
+    tag is finished, in reverse order so the recorded child positions stay valid
+    """
+    keep_mode = rules.keep_mode
+    keep_tags = rules.keep_tags or set()
+    unwrap_names = set().union(*rules.unwrap_inside.values()) if rules.unwrap_inside else set()
+
+    def enter(tag: Tag, context: _Context) -> Optional[_Frame]:
+        """Returns the frame of the tag, or None if its subtree is removed without visiting it"""
+        name = tag.name
+        if name in rules.remove_tags:
+            return None
+        ## Unwrapping inside an ancestor takes precedence over removal by class
+        unwrap_inside = name in unwrap_names and any(
+            name in rules.unwrap_inside[a] for a in context.inside
+        )
+        classes = _classes(tag)
+        if not unwrap_inside and not rules.remove_classes.isdisjoint(classes):
+            return None
+        matched = keep_mode and (
+            name in keep_tags or not rules.keep_classes.isdisjoint(classes)
+        )
+        if rules.attribute_filter is not None:
+            rules.attribute_filter(tag)
+        parent_name = context.parent_name
+        unwrap = (
+            unwrap_inside
+            or name in rules.unwrap_tags
+            or (rules.known_tags is not None and name not in rules.known_tags)
+            or (rules.denest_span and name == "span")
+            or (rules.denest_div and name == "div" and parent_name == "div")
+            or (rules.denest_same and name not in ("div", "span") and parent_name == name)
+        )
+        inside = context.inside
+        if name in rules.unwrap_inside and name not in inside:
+            inside = inside | {name}
+        child_context = _Context(
+            inside=inside,
+            parent_name=parent_name if unwrap else name,
+            ancestor_kept=context.ancestor_kept or (matched and rules.keep_children),
+        )
+        return _Frame(
+            node=tag,
+            context=child_context,
+            matched=matched,
+            unwrap=unwrap,
+            children=list(tag.contents),
+        )
+
+    def apply(frame: _Frame):
+        actions = [(i, c, False) for i, c in frame.to_remove]
+        actions += [(i, c, True) for i, c in frame.to_unwrap]
+        for i, child, unwrap in sorted(actions, key=lambda a: a[0], reverse=True):
+            if unwrap:
+                child.unwrap()
+            else:
+                _extract(child, i)
+                child.decompose()
+        ## The strings of an unwrapped tag are normalized with those of its parent
+        if rules.normalize_text is not None and not frame.unwrap:
+            _normalize_strings(frame.node, rules.normalize_text)
+
+    root = _Frame(
+        node=soup,
+        context=_Context(parent_name=soup.name),
+        children=list(soup.contents),
+    )
+    stack = [root]
+    while stack:
+        frame = stack[-1]
+        if frame.position < len(frame.children):
+            index = frame.position
+            child = frame.children[index]
+            frame.position += 1
+            if isinstance(child, Tag):
+                child_frame = enter(child, frame.context)
+                if child_frame is None:
+                    frame.to_remove.append((index, child))
+                else:
+                    child_frame.index = index
+                    stack.append(child_frame)
+            elif isinstance(child, rules.remove_strings):
+                frame.to_remove.append((index, child))
+            elif isinstance(child, NavigableString) and child.strip():
+                frame.text_types.add(type(child))
+            continue
+
+        ## All children are done, finish the tag
+        stack.pop()
+        if not stack:
+            apply(frame)
+            break
+        parent = stack[-1]
+        tag = frame.node
+        ## The context of the children also says whether an ancestor of the tag was kept
+        kept = (
+            not keep_mode
+            or frame.matched
+            or tag.name in rules.locked
+            or frame.context.ancestor_kept
+            or (rules.keep_parents and frame.matched_below)
+        )
+        empty = (
+            rules.empty
+            and not frame.unwrap
+            and tag.name not in rules.locked
+            and not _has_text(tag, frame.text_types)
+        )
+        if not kept or empty:
+            parent.to_remove.append((frame.index, tag))
+            continue
+        apply(frame)
+        parent.text_types |= frame.text_types
+        parent.matched_below = parent.matched_below or frame.matched or frame.matched_below
+        if frame.unwrap:
+            parent.to_unwrap.append((frame.index, tag))
+    return soup
@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, ClassVar
 from qai.core import MetaFile, MetaDir
 
 from qai.scraper.filters.meta import InstanceInfo
@@ -14,6 +14,8 @@ from .processors import Processor
 class Writer(Processor):
     file_name: str = None
     out_folder: str = None
+    ## file_name is set from the file being processed
+    reusable: ClassVar[bool] = False
 
     def __post_init__(self):
         if self.meta is None:
@@ -0,0 +1,179 @@
+import logging
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Callable, Optional
+
+from qai.core import Meta, MetaDir, MetaFile
+
+from qai.scraper.scrapers.frontier import FrontierItem, UrlFrontier, depth_priority
+from qai.scraper.scrapers.scraper import Scraper, ScrapeSession
+from qai.scraper.utils.bs_utils import get_links
+
+log = getLogger(__name__)
+
+
+class ConcurrentScraper(Scraper):
+    """
+    Scraper that crawls a site with a pool of drivers.
+    All workers share a single UrlFrontier, so every url is fetched once, and
+    pages are saved with the same layout as Scraper.url_to_local_name.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 4,
+        options=None,
+        offline: bool = False,
+        workers: Optional[list[Scraper]] = None,
+        worker_factory: Optional[Callable[[], Scraper]] = None,
+        priority_fn: Callable[[str, int], float] = depth_priority,
+    ):
+        """
+        Args:
+            num_workers (int): Number of drivers to crawl with
+            workers (list[Scraper]): Pre built workers, overrides num_workers
+            worker_factory (Callable): Creates a worker, defaults to Scraper(options)
+            priority_fn (Callable): Priority of a (url, depth), lower is crawled first
+        """
+        if not workers:
+            if num_workers < 1:
+                raise ValueError(f"num_workers must be at least 1, got {num_workers}")
+            if worker_factory is None:
+                worker_factory = lambda: Scraper(options=options, offline=offline)
+            workers = [worker_factory() for _ in range(num_workers)]
+        self.workers = workers
+        self.priority_fn = priority_fn
+        self._meta_lock = threading.Lock()
+        super().__init__(options=options, offline=offline)
+
+    @property
+    def driver(self):
+        """The first worker's driver, so no browser of its own is started"""
+        return self.workers[0].driver
+
+    def _scrape_urls(
+        self,
+        urls: list[str],
+        dest_dir: str,
+        current_depth: int,
+        max_depth: int,
+        overwrite: bool,
+        exclude_urls: set[str],
+        exclude_regexs: set[str],
+        scrape_session: ScrapeSession,
+        exclude_parameters: bool,
+        submeta: MetaDir,
+        meta: Meta,
+    ):
+        frontier = UrlFrontier(
+            max_depth=max_depth,
+            exclude_urls=exclude_urls,
+            exclude_regexs=exclude_regexs,
+            exclude_parameters=exclude_parameters,
+            priority_fn=self.priority_fn,
+        )
+        frontier.put_many(urls, depth=current_depth)
+
+        with ThreadPoolExecutor(
+            max_workers=len(self.workers), thread_name_prefix="scrape-worker"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._worker_loop,
+                    worker,
+                    frontier,
+                    dest_dir=dest_dir,
+                    overwrite=overwrite,
+                    exclude_parameters=exclude_parameters,
+                    scrape_session=scrape_session,
+                    submeta=submeta,
+                    meta=meta,
+                )
+                for worker in self.workers
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                frontier.close()
+                raise
+
+    def _worker_loop(
+        self,
+        worker: Scraper,
+        frontier: UrlFrontier,
+        dest_dir: str,
+        overwrite: bool,
+        exclude_parameters: bool,
+        scrape_session: ScrapeSession,
+        submeta: MetaDir,
+        meta: Meta,
+    ):
+        while (item := frontier.get()) is not None:
+            try:
+                self._scrape_item(
+                    worker,
+                    item,
+                    frontier,
+                    dest_dir=dest_dir,
+                    overwrite=overwrite,
+                    exclude_parameters=exclude_parameters,
+                    scrape_session=scrape_session,
+                    submeta=submeta,
+                    meta=meta,
+                )
+            finally:
+                frontier.task_done()
+
+    def _scrape_item(
+        self,
+        worker: Scraper,
+        item: FrontierItem,
+        frontier: UrlFrontier,
+        dest_dir: str,
+        overwrite: bool,
+        exclude_parameters: bool,
+        scrape_session: ScrapeSession,
+        submeta: MetaDir,
+        meta: Meta,
+    ):
+        url, depth = item.url, item.depth
+        log.info(f"{depth}:{frontier.max_depth} Scraping: '{url}'")
+        hashed_name = self.url_to_local_name(url)
+        local_file = f"{dest_dir}/{hashed_name}"
+        os.makedirs(os.path.dirname(local_file), exist_ok=True)
+        try:
+            save_path = worker.get_and_save(url, local_file, overwrite=overwrite)
+        except Exception:
+            with self._meta_lock:
+                with open(f"errors.txt", "a") as fp:
+                    fp.write(url + "\n")
+            traceback.print_exc(file=sys.stdout)
+            logging.error(f"Failed to scrape {url}")
+            return
+
+        if save_path:
+            fmeta = {
+                "hashed_name": hashed_name,
+                "source_uri": url,
+                "is_start_url": url in scrape_session.start_urls,
+                "depth": depth,
+                "type": "html_scrape",
+                "category": "Unknown",
+            }
+            with self._meta_lock:
+                submeta.add_file(MetaFile(path=local_file, metadata=fmeta))
+                meta.save(overwrite=True)
+
+        if not frontier.should_expand(depth):
+            return
+        links = get_links(url, local_file, exclude_parameters=exclude_parameters, depth=depth)
+        frontier.put_many(links, depth=depth + 1)
+
+    def quit(self):
+        for worker in self.workers:
+            worker.quit()
@@ -0,0 +1,231 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Callable, Iterator, Optional
+
+from selenium.webdriver.chrome.webdriver import WebDriver
+
+log = getLogger(__name__)
+
+CLEAR_STORAGE_JS = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+
+@dataclass
+class DriverLease:
+    driver: WebDriver
+    id: int
+    created_at: float = field(default_factory=time.monotonic)
+    pages: int = 0
+    blocked: bool = False
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+def reset_driver_state(driver: WebDriver):
+    """Clear cookies and web storage so the next lease starts with a clean session"""
+    driver.delete_all_cookies()
+    driver.execute_script(CLEAR_STORAGE_JS)
+    driver.get("about:blank")
+
+
+def process_tree_rss_mb(pid: int) -> Optional[float]:
+    """
+    Resident memory of a process and all of its children in MB, read from /proc.
+    Returns None where /proc is not available
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fp:
+                ## The command name can contain spaces, the ppid is the 2nd field after it
+                ppid = int(fp.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        p = stack.pop()
+        stack.extend(children.get(p, []))
+        try:
+            with open(f"/proc/{p}/status") as fp:
+                for line in fp:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def driver_memory_mb(driver: WebDriver) -> Optional[float]:
+    pid = getattr(driver, "browser_pid", None)
+    if pid is None:
+        service = getattr(driver, "service", None)
+        process = getattr(service, "process", None)
+        pid = getattr(process, "pid", None)
+    if pid is None:
+        return None
+    return process_tree_rss_mb(pid)
+
+
+class DriverPool:
+    """
+    Pool of long lived browser drivers.
+    Drivers are leased out one at a time, reset between leases, and replaced
+    once they hit the page, age or memory limits or were served a block page.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], WebDriver],
+        size: int = 1,
+        max_pages: Optional[int] = 50,
+        max_age: Optional[float] = 30 * 60,
+        max_memory_mb: Optional[float] = None,
+        reset_fn: Callable[[WebDriver], None] = reset_driver_state,
+        memory_fn: Callable[[WebDriver], Optional[float]] = driver_memory_mb,
+        drivers: Optional[list[WebDriver]] = None,
+    ):
+        """
+        Args:
+            factory (Callable): Creates a new driver
+            size (int): Maximum number of drivers alive at once
+            max_pages (int): Recycle a driver after this many pages, None for no limit
+            max_age (float): Recycle a driver after this many seconds, None for no limit
+            max_memory_mb (float): Recycle a driver using more memory, None to skip the check
+            reset_fn (Callable): Clears the driver state between leases
+            drivers (list[WebDriver]): Already created drivers to seed the pool with
+        """
+        if size < 1:
+            raise ValueError(f"DriverPool size must be at least 1, got {size}")
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.max_memory_mb = max_memory_mb
+        self.reset_fn = reset_fn
+        self.memory_fn = memory_fn
+
+        self._ids = itertools.count()
+        self._idle: list[DriverLease] = [
+            DriverLease(driver=d, id=next(self._ids)) for d in (drivers or [])
+        ]
+        self._num_alive = len(self._idle)
+        self._closed = False
+        self._cond = threading.Condition()
+        self.num_created = 0
+        self.num_recycled = 0
+
+    def _recycle_reason(self, lease: DriverLease) -> Optional[str]:
+        if lease.blocked:
+            return "blocked"
+        if self.max_pages is not None and lease.pages >= self.max_pages:
+            return f"pages={lease.pages}"
+        if self.max_age is not None and lease.age >= self.max_age:
+            return f"age={lease.age:.0f}s"
+        if self.max_memory_mb is not None:
+            mem = self.memory_fn(lease.driver)
+            if mem is not None and mem >= self.max_memory_mb:
+                return f"memory={mem:.0f}MB"
+        return None
+
+    def _quit(self, lease: DriverLease):
+        try:
+            lease.driver.quit()
+        except Exception as e:
+            log.warning(f"DriverPool: failed to quit driver {lease.id}: {e}")
+
+    def acquire(self, timeout: Optional[float] = None) -> DriverLease:
+        """
+        Lease a driver, creating one if the pool is not full.
+        Blocks until a driver is released when all drivers are in use
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("DriverPool is closed")
+                while self._idle:
+                    lease = self._idle.pop()
+                    if self.max_age is not None and lease.age >= self.max_age:
+                        self._num_alive -= 1
+                        self.num_recycled += 1
+                        self._quit(lease)
+                        continue
+                    return lease
+                if self._num_alive < self.size:
+                    self._num_alive += 1
+                    break
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("Timed out waiting for a driver")
+        ## Create outside the lock, starting chrome is slow
+        try:
+            driver = self.factory()
+        except BaseException:
+            with self._cond:
+                self._num_alive -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.num_created += 1
+            return DriverLease(driver=driver, id=next(self._ids))
+
+    def release(self, lease: DriverLease):
+        """Return a driver to the pool, it is reset or recycled"""
+        reason = self._recycle_reason(lease)
+        if not reason and not self._closed:
+            try:
+                self.reset_fn(lease.driver)
+            except Exception as e:
+                reason = f"reset failed: {e}"
+        if reason or self._closed:
+            if reason:
+                log.debug(f"DriverPool: recycling driver {lease.id}, {reason}")
+            self._quit(lease)
+            with self._cond:
+                self._num_alive -= 1
+                if reason:
+                    self.num_recycled += 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(lease)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[DriverLease]:
+        lease = self.acquire(timeout=timeout)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def close(self):
+        """Quit all idle drivers, leased drivers are quit when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._num_alive -= len(idle)
+            self._cond.notify_all()
+        for lease in idle:
+            self._quit(lease)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,188 @@
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from logging import getLogger
+from typing import TYPE_CHECKING, Optional
+
+import requests
+from bs4 import BeautifulSoup, UnicodeDammit
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    from qai.scraper.scrapers.scraper import Scraper
+
+log = getLogger(__name__)
+
+INVISIBLE_TAGS = {"script", "style", "noscript", "template", "head", "title", "meta"}
+JS_REQUIRED_REGEX = re.compile(
+    r"(enable|requires?|turn on)\s+javascript|javascript\s+(is\s+)?(required|disabled)", re.I
+)
+
+
+@dataclass
+class FetchResult:
+    url: str
+    html: str
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    fetcher: str = ""
+
+
+def blocked_reason(text: str) -> Optional[str]:
+    """Returns the reason if the page is a security check/block page, otherwise None"""
+    if "Security check" in text and "RayID" in text:
+        return "Security Check Failed"
+    if "Request unsuccessful. Incapsula incident ID" in text:
+        return "Incapsula incident ID"
+    return None
+
+
+def visible_text(soup: BeautifulSoup) -> str:
+    body = soup.body or soup
+    return " ".join(
+        s.strip()
+        for s in body.find_all(string=True)
+        if s.parent is not None and s.parent.name not in INVISIBLE_TAGS and s.strip()
+    )
+
+
+def response_text(resp: requests.Response) -> str:
+    """
+    The body of resp as text. requests decodes text/html without a charset header as
+    ISO-8859-1, those pages are decoded by their meta charset or a detected encoding instead
+    """
+    content_type = resp.headers.get("Content-Type") or ""
+    if "charset" in content_type.lower():
+        return resp.text
+    return UnicodeDammit(resp.content, is_html=True).unicode_markup or resp.text
+
+
+class Fetcher(ABC):
+    name: str = "fetcher"
+
+    @abstractmethod
+    def fetch(self, url: str) -> FetchResult:
+        pass
+
+    def close(self):
+        pass
+
+
+class HttpFetcher(Fetcher):
+    """
+    Fetches pages with a pooled keep-alive http session, no javascript is run
+    """
+
+    name = "http"
+
+    def __init__(
+        self,
+        user_agent: Optional[str] = None,
+        timeout: float = 15,
+        pool_maxsize: int = 10,
+        session: Optional[requests.Session] = None,
+    ):
+        if user_agent is None:
+            from qai.scraper.scrapers.scraper import user_agents
+
+            user_agent = user_agents[0]
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        session.headers.update(
+            {
+                "User-Agent": user_agent,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+            }
+        )
+        self.session = session
+
+    def fetch(self, url: str) -> FetchResult:
+        resp = self.session.get(url, timeout=self.timeout, allow_redirects=True)
+        return FetchResult(
+            url=url,
+            html=response_text(resp),
+            status_code=resp.status_code,
+            content_type=resp.headers.get("Content-Type"),
+            fetcher=self.name,
+        )
+
+    def close(self):
+        self.session.close()
+
+
+class DriverFetcher(Fetcher):
+    """
+    Fetches pages with the scraper's browser driver
+    """
+
+    name = "driver"
+
+    def __init__(self, scraper: "Scraper"):
+        self.scraper = scraper
+
+    def fetch(self, url: str) -> FetchResult:
+        self.scraper.get(url)
+        return FetchResult(url=url, html=self.scraper.driver.page_source, fetcher=self.name)
+
+
+class FallbackFetcher(Fetcher):
+    """
+    Tries each fetcher in order, escalating to the next one when the page
+    looks like it needs a browser (javascript shell, block page, empty body)
+    """
+
+    name = "fallback"
+
+    def __init__(self, fetchers: list[Fetcher], min_text_length: int = 200):
+        if not fetchers:
+            raise ValueError("FallbackFetcher needs at least one fetcher")
+        self.fetchers = fetchers
+        self.min_text_length = min_text_length
+
+    def needs_fallback(self, result: FetchResult) -> Optional[str]:
+        """Returns the reason the result should be refetched, otherwise None"""
+        if result.status_code is not None and not 200 <= result.status_code < 300:
+            return f"status {result.status_code}"
+        if result.content_type and "html" not in result.content_type.lower():
+            return f"content type {result.content_type}"
+        if not result.html or not result.html.strip():
+            return "empty response"
+        reason = blocked_reason(result.html)
+        if reason:
+            return reason
+        soup = BeautifulSoup(result.html, "lxml")
+        if soup.body is None:
+            return "empty body"
+        text = visible_text(soup)
+        if not text:
+            return "empty body"
+        if len(text) < self.min_text_length:
+            if soup.body.find("script"):
+                return "javascript shell"
+            noscript = " ".join(t.get_text(" ") for t in soup.find_all("noscript"))
+            if JS_REQUIRED_REGEX.search(noscript):
+                return "javascript required"
+        return None
+
+    def fetch(self, url: str) -> FetchResult:
+        *fallible, last = self.fetchers
+        for fetcher in fallible:
+            try:
+                result = fetcher.fetch(url)
+            except Exception as e:
+                log.debug(f"{fetcher.name} failed for {url}, escalating: {e}")
+                continue
+            reason = self.needs_fallback(result)
+            if not reason:
+                return result
+            log.debug(f"{fetcher.name} result for {url} needs fallback: {reason}")
+        return last.fetch(url)
+
+    def close(self):
+        for f in self.fetchers:
+            f.close()
@@ -0,0 +1,115 @@
+import heapq
+import itertools
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from qai.scraper.utils.bs_utils import url_with_path
+
+
+@dataclass(order=True)
+class FrontierItem:
+    priority: float
+    order: int
+    url: str = field(compare=False)
+    depth: int = field(compare=False, default=0)
+
+
+def depth_priority(url: str, depth: int) -> float:
+    """Default priority, shallower pages are crawled first (breadth first)"""
+    return depth
+
+
+class UrlFrontier:
+    """
+    Thread safe url frontier shared by crawl workers.
+    Keeps track of the visited urls, the depth of each url, and hands out
+    the url with the lowest priority first.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = -1,
+        exclude_urls: Optional[set[str]] = None,
+        exclude_regexs: Optional[Iterable[str]] = None,
+        exclude_parameters: bool = True,
+        priority_fn: Callable[[str, int], float] = depth_priority,
+    ):
+        self.max_depth = max_depth
+        ## Same semantics as Scraper._scrape, the passed in set is updated with visited urls
+        self.visited = exclude_urls if exclude_urls is not None else set()
+        self.exclude_regexs = [re.compile(r) for r in (exclude_regexs or [])]
+        self.exclude_parameters = exclude_parameters
+        self.priority_fn = priority_fn
+
+        self._heap: list[FrontierItem] = []
+        self._counter = itertools.count()
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _normalize(self, url: str) -> str:
+        return url_with_path(url) if self.exclude_parameters else url
+
+    def _is_excluded(self, url: str) -> bool:
+        for rgx in self.exclude_regexs:
+            if rgx.search(url):
+                return True
+        return False
+
+    def should_expand(self, depth: int) -> bool:
+        """Whether links found at the given depth should be added to the frontier"""
+        return not (self.max_depth and self.max_depth != -1 and depth + 1 >= self.max_depth)
+
+    def put(self, url: str, depth: int = 0) -> bool:
+        """
+        Add a url to the frontier
+        Returns:
+            bool: True if the url was added, False if it was already seen or excluded
+        """
+        url = self._normalize(url)
+        with self._cond:
+            if self._closed or url in self.visited or self._is_excluded(url):
+                return False
+            self.visited.add(url)
+            item = FrontierItem(self.priority_fn(url, depth), next(self._counter), url, depth)
+            heapq.heappush(self._heap, item)
+            self._cond.notify()
+            return True
+
+    def put_many(self, urls: Iterable[str], depth: int = 0) -> int:
+        return sum(self.put(url, depth) for url in urls)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[FrontierItem]:
+        """
+        Get the next url to crawl. Blocks while other workers may still add urls.
+        Returns:
+            FrontierItem | None: None once the frontier is exhausted or closed
+        """
+        with self._cond:
+            while not self._heap:
+                if self._closed or self._in_flight == 0:
+                    return None
+                if not self._cond.wait(timeout):
+                    return None
+            self._in_flight += 1
+            return heapq.heappop(self._heap)
+
+    def task_done(self):
+        """Mark an item returned from get as finished"""
+        with self._cond:
+            self._in_flight -= 1
+            if self._in_flight == 0 and not self._heap:
+                self._cond.notify_all()
+
+    def close(self):
+        """Stop handing out urls, waiting workers are released"""
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._heap)
@@ -16,6 +16,13 @@ from bs4 import BeautifulSoup
 from qai.core import Meta, MetaBase, MetaDir, MetaFile, MetaPath
 from selenium.webdriver.chrome.webdriver import WebDriver
 
+from qai.scraper.scrapers.fetcher import (
+    DriverFetcher,
+    Fetcher,
+    FallbackFetcher,
+    HttpFetcher,
+    blocked_reason,
+)
 from qai.scraper.scrapers.meta import ScrapeMeta
 from qai.scraper.utils.bs_utils import get_links, url_with_path
 
@@ -48,16 +55,48 @@ class ScrapeSession(MetaBase):
 class Scraper:
     count = 0
 
-    def __init__(self, options=None, driver=None, offline=False):
-        self.driver = self._new_driver(quit=False, options=options, driver=driver)
+    def __init__(
+        self,
+        options=None,
+        driver=None,
+        offline=False,
+        http_first: bool = False,
+        fetcher: Optional[Fetcher] = None,
+    ):
+        """
+        Args:
+            http_first (bool): Try a plain http fetch before the browser, falling back
+                to the driver for javascript shells, block pages and empty bodies.
+                The browser is only started by the first fallback
+            fetcher (Fetcher): Custom fetcher, overrides http_first
+        """
+        self._options = options
+        self._driver = driver
         self.scrape_sessions = []
         self.offline = offline
         self.time_between_requests = 1
         self.time_jitter_between_requests = 1
         self.last_request_time = time.time()
 
-        if self.driver is None:
-            raise ValueError("Failed to create driver")
+        if fetcher is None:
+            fetcher = DriverFetcher(self)
+            if http_first:
+                fetcher = FallbackFetcher([HttpFetcher(), fetcher])
+        self.fetcher = fetcher
+
+    @property
+    def driver(self) -> WebDriver:
+        """The browser, started on first use"""
+        if self._driver is None:
+            driver = self._new_driver(quit=False, options=self._options)
+            if driver is None:
+                raise ValueError("Failed to create driver")
+            self._driver = driver
+        return self._driver
+
+    @driver.setter
+    def driver(self, driver: WebDriver):
+        self._driver = driver
 
     def _new_driver(
         self,
@@ -267,6 +306,37 @@ class Scraper:
         # scrape_session.submeta = submeta
         submeta.add_metadata("scrape_session", scrape_meta)
 
+        self._scrape_urls(
+            urls,
+            dest_dir=dest_dir,
+            current_depth=current_depth,
+            max_depth=max_depth,
+            overwrite=overwrite,
+            exclude_urls=exclude_urls,
+            exclude_regexs=exclude_regexs,
+            scrape_session=scrape_session,
+            exclude_parameters=exclude_parameters,
+            submeta=submeta,
+            meta=meta,
+        )
+        meta.save(overwrite=True)
+        return scrape_session
+
+    def _scrape_urls(
+        self,
+        urls: list[str],
+        dest_dir: str,
+        current_depth: int,
+        max_depth: int,
+        overwrite: bool,
+        exclude_urls: set[str],
+        exclude_regexs: set[str],
+        scrape_session: ScrapeSession,
+        exclude_parameters: bool,
+        submeta: MetaDir,
+        meta: Meta,
+    ):
+        """Crawl from the start urls. Subclasses can override the crawl strategy"""
         for url in urls:
             self._scrape(
                 url,
@@ -277,11 +347,10 @@ class Scraper:
                 exclude_urls=exclude_urls,
                 exclude_regexs=exclude_regexs,
                 scrape_session=scrape_session,
+                exclude_parameters=exclude_parameters,
                 submeta=submeta,
                 meta=meta
             )
-        meta.save(overwrite=True)
-        return scrape_session
 
     @staticmethod
     def base_url(url):
@@ -319,17 +388,17 @@ class Scraper:
         if not overwrite and os.path.exists(dest_path):
             logging.debug(f"Scraper.get_and_save: skipping {url}, {save_name}")
             return None
-        self.get(url)
-        text = str(BeautifulSoup(self.driver.page_source, "lxml"))
-        if "Security check" in text and "RayID" in text:
-            logging.error(f"Security Check Failed:{url}")
-            return None
-        if "Request unsuccessful. Incapsula incident ID" in text:
-            logging.error(f"Incapsula incident ID:{url}")
+        result = self.fetcher.fetch(url)
+        text = str(BeautifulSoup(result.html, "lxml"))
+        reason = blocked_reason(text)
+        if reason:
+            logging.error(f"{reason}:{url}")
             return None
         with open(dest_path, "w") as fp:
-            fp.write(self.driver.page_source)
+            fp.write(result.html)
         return dest_path
 
     def quit(self):
-        self.driver.quit()
+        self.fetcher.close()
+        if self._driver is not None:
+            self._driver.quit()
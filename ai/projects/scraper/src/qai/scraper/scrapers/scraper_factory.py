@@ -8,12 +8,24 @@ except ImportError:
 
     sys.path.append(os.getcwd())
 
+from qai.scraper.scrapers.concurrent_scraper import ConcurrentScraper
 from qai.scraper.scrapers.scraper import Scraper
 from qai.scraper.scrapers.stealthscraper import StealthScraper
 
 
 def get_scraper(
     stealth: bool = False,
+    num_workers: int = 1,
+    http_first: bool = False,
 ) -> Scraper:
-    s = StealthScraper() if stealth else Scraper()
+    """
+    Args:
+        http_first (bool): Fetch pages with plain http, starting a browser only for the
+            pages that need one, see Scraper
+    """
+    scraper_cls = StealthScraper if stealth else Scraper
+    make_scraper = lambda: scraper_cls(http_first=http_first)
+    if num_workers > 1:
+        return ConcurrentScraper(num_workers=num_workers, worker_factory=make_scraper)
+    s = make_scraper()
     return s
@@ -3,11 +3,14 @@ import os
 import random
 import time
 from hashlib import sha256
+from typing import Optional
 from urllib.parse import urlsplit
 
 import undetected_chromedriver as uc
 from bs4 import BeautifulSoup
 
+from .driver_pool import DriverLease, DriverPool, reset_driver_state
+from .fetcher import blocked_reason
 from .scraper import Scraper
 
 ## Can check at https://useragentstring.com/, https://useragentstring.com/pages/Chrome/
@@ -21,7 +24,26 @@ user_agents = [
 
 
 class StealthScraper(Scraper):
-    def __init__(self, options=None, driver=None):
+    def __init__(
+        self,
+        options=None,
+        driver=None,
+        http_first=False,
+        fetcher=None,
+        driver_pool: Optional[DriverPool] = None,
+        pool_size: int = 1,
+        max_pages_per_driver: Optional[int] = 50,
+        max_driver_age: Optional[float] = 30 * 60,
+        max_driver_memory_mb: Optional[float] = None,
+    ):
+        """
+        Args:
+            driver_pool (DriverPool): Pool to lease drivers from, can be shared between scrapers
+            pool_size (int): Number of drivers in the pool when one is created
+            max_pages_per_driver (int): Pages a driver serves before it is replaced
+            max_driver_age (float): Seconds a driver lives before it is replaced
+            max_driver_memory_mb (float): Replace a driver once it uses more memory than this
+        """
         self.time_between_requests = 4
         self.time_jitter_between_requests = 6
         self.last_request_time = 0
@@ -29,7 +51,63 @@ class StealthScraper(Scraper):
         self.window_size_range = (600, 600)
         self.window_pos = (400, 400)
         self.window_pos_range = (300, 300)
-        super().__init__(options, driver)
+        self._lease: Optional[DriverLease] = None
+        self._owns_pool = driver_pool is None
+        if driver_pool is None:
+            driver_pool = DriverPool(
+                factory=lambda: self._create_driver(options),
+                size=pool_size,
+                max_pages=max_pages_per_driver,
+                max_age=max_driver_age,
+                max_memory_mb=max_driver_memory_mb,
+                reset_fn=self._reset_driver,
+                drivers=[driver] if driver is not None else None,
+            )
+        self.driver_pool = driver_pool
+        super().__init__(options, None, http_first=http_first, fetcher=fetcher)
+
+    def _create_driver(self, options=None, version_main=None):
+        if options is None:
+            options = uc.ChromeOptions()
+            options.add_argument("--disable-blink-features=AutomationControlled")
+            options.add_argument("--headless=True")
+        driver = uc.Chrome(use_subprocess=True, options=options, version_main=version_main)
+        driver.execute_cdp_cmd(
+            "Network.setUserAgentOverride",
+            {"userAgent": random.choice(user_agents)},
+        )
+        driver.execute_script(
+            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+        )
+        driver.set_window_position(
+            random.randint(
+                self.window_pos[0] - self.window_pos_range[0],
+                self.window_pos[0] + self.window_pos_range[0],
+            ),
+            random.randint(
+                self.window_pos[1] - self.window_pos_range[1],
+                self.window_pos[1] + self.window_pos_range[1],
+            ),
+        )
+        driver.set_window_size(
+            random.randint(
+                self.window_size[0] - self.window_size_range[0],
+                self.window_size[0] + self.window_size_range[0],
+            ),
+            random.randint(
+                self.window_size[1] - self.window_size_range[1],
+                self.window_size[1] + self.window_size_range[1],
+            ),
+        )
+        return driver
+
+    def _reset_driver(self, driver):
+        """Isolate leases, clear the session and rotate the user agent"""
+        reset_driver_state(driver)
+        driver.execute_cdp_cmd(
+            "Network.setUserAgentOverride",
+            {"userAgent": random.choice(user_agents)},
+        )
 
     def _new_driver(
         self,
@@ -39,42 +117,19 @@ class StealthScraper(Scraper):
         random_user_agent=False,
         version_main=None,  ## Specific version of chrome to use
     ):
-        if quit:
-            self.quit()
-        if options is None:
-            options = uc.ChromeOptions()
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_argument("--headless=True")
-        if driver is None:
-            driver = uc.Chrome(use_subprocess=True, options=options, version_main=version_main)
-            driver.execute_cdp_cmd(
-                "Network.setUserAgentOverride",
-                {"userAgent": random.choice(user_agents)},
-            )
-            driver.execute_script(
-                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            )
-            driver.set_window_position(
-                random.randint(
-                    self.window_pos[0] - self.window_pos_range[0],
-                    self.window_pos[0] + self.window_pos_range[0],
-                ),
-                random.randint(
-                    self.window_pos[1] - self.window_pos_range[1],
-                    self.window_pos[1] + self.window_pos_range[1],
-                ),
-            )
-            driver.set_window_size(
-                random.randint(
-                    self.window_size[0] - self.window_size_range[0],
-                    self.window_size[0] + self.window_size_range[0],
-                ),
-                random.randint(
-                    self.window_size[1] - self.window_size_range[1],
-                    self.window_size[1] + self.window_size_range[1],
-                ),
-            )
-        self.driver = driver
+        """Lease a driver from the pool, returning the current one"""
+        if quit and self._lease is not None:
+            ## Force the current driver to be replaced instead of reused
+            self._lease.blocked = True
+        self._renew_lease()
+        return self.driver
+
+    def _renew_lease(self):
+        if self._lease is not None:
+            self.driver_pool.release(self._lease)
+            self._lease = None
+        self._lease = self.driver_pool.acquire()
+        self.driver = self._lease.driver
 
     @staticmethod
     def base_url(url):
@@ -83,8 +138,12 @@ class StealthScraper(Scraper):
 
     def get(self, url):
         self._wait_if_needed()
-        self._new_driver()
+        ## Each page gets a clean lease, the driver stays valid until the next get
+        self._renew_lease()
         d = self.driver.get(url)
+        self._lease.pages += 1
+        if blocked_reason(self.driver.page_source):
+            self._lease.blocked = True
         self.last_request_time = time.time()
         return d
 
@@ -98,4 +157,9 @@ class StealthScraper(Scraper):
             time.sleep(dif)
 
     def quit(self):
-        self.driver.quit()
+        self.fetcher.close()
+        if self._lease is not None:
+            self.driver_pool.release(self._lease)
+            self._lease = None
+        if self._owns_pool:
+            self.driver_pool.close()
@@ -5,10 +5,47 @@ from pathlib import Path
 from typing import Any, Set, Union
 from urllib.parse import urljoin, urlsplit
 
+import ftfy
 import validators
 from bs4 import BeautifulSoup, element
+from lxml.html import defs
 from lxml.html.clean import Cleaner
 
+## What the Cleaner in sanitize drops with their contents, and replaces by their contents
+SANITIZE_KILL_TAGS = {
+    "script",
+    "style",
+    "link",
+    "meta",
+    "base",
+    "applet",
+    *defs.frame_tags,
+    "button",
+    "input",
+    "select",
+    "textarea",
+}
+SANITIZE_UNWRAP_TAGS = {
+    "head",
+    "title",
+    "iframe",
+    "embed",
+    "layer",
+    "object",
+    "param",
+    "form",
+    "blink",
+    "marquee",
+    "span",
+    "font",
+    "div",
+}
+SANITIZE_KNOWN_TAGS = set(defs.tags)
+
+_WHITESPACE = re.compile(r"\s+")
+## Spaces before punctuation, in percentages (50 %) and around the times symbol (3 x speed, 4 x 4)
+_TIGHTEN = re.compile(r"(?<=\d) ?x (?=\d)|(?<=\d) x(?= )|(?<=\d) %| (?=[.?!;,])")
+
 
 def base_url(url):
     split_url = urlsplit(url)
@@ -86,6 +123,30 @@ def html_strip(html_str: str) -> str:
     s = re.sub(r"(\d+)x\s+(\d+)", r"\1x\2", s)
     return s.strip()
 
+def normalize_text(text: str, fix_text: bool = True) -> str:
+    """
+    Single pass version of the text simplification of HTMLSimplifier: collapse whitespace and
+    remove the spaces before punctuation, in percentages and around the times symbol
+    Args:
+        text (str): The text to normalize
+        fix_text (bool): Whether to fix the text with ftfy, only done for non ascii text
+    """
+    if fix_text and not text.isascii():
+        text = ftfy.fix_text(text)
+    text = _WHITESPACE.sub(" ", text)
+    return _TIGHTEN.sub(lambda m: m.group(0).replace(" ", ""), text)
+
+
+def strip_unsafe_attributes(tag: element.Tag):
+    """Remove the attributes sanitize removes: event handlers, inline styles and javascript links"""
+    for name in list(tag.attrs):
+        value = tag.attrs[name]
+        if name.startswith("on") or name == "style":
+            del tag.attrs[name]
+        elif isinstance(value, str) and value.strip().lower().startswith("javascript:"):
+            del tag.attrs[name]
+
+
 def sanitize(dirty_html: str):
     cleaner = Cleaner(
         page_structure=True,
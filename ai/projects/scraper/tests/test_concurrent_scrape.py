@@ -0,0 +1,149 @@
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import urllib.request
+from pathlib import Path
+from threading import Thread
+
+import pytest
+from qai.core import Meta
+
+from qai.scraper.scrapers.concurrent_scraper import ConcurrentScraper
+from qai.scraper.scrapers.frontier import UrlFrontier
+from qai.scraper.scrapers.scraper import Scraper
+
+PORT = 8004
+
+
+class TempDirHandler(http.server.SimpleHTTPRequestHandler):
+    def __init__(self, temp_dir, *args, **kwargs):
+        self.temp_dir = temp_dir
+        super().__init__(*args, directory=self.temp_dir, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UrllibDriver:
+    """Minimal stand in for a webdriver, fetches pages without a browser"""
+
+    def __init__(self):
+        self.page_source = ""
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+        with urllib.request.urlopen(url) as resp:
+            self.page_source = resp.read().decode()
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture(scope="module")
+def setup_server():
+    temp_dir = tempfile.TemporaryDirectory()
+    pages = {
+        "index.html": '<html><a href="a.html">a</a><a href="b.html">b</a></html>',
+        "a.html": '<html><a href="c.html">c</a><a href="index.html">home</a></html>',
+        "b.html": '<html><a href="c.html">c</a></html>',
+        "c.html": '<html><a href="d.html">d</a></html>',
+        "d.html": "<html><p>deepest</p></html>",
+    }
+    for name, html in pages.items():
+        with open(f"{temp_dir.name}/{name}", "w") as f:
+            f.write(html)
+
+    handler = lambda *args, **kwargs: TempDirHandler(temp_dir.name, *args, **kwargs)
+    server = http.server.ThreadingHTTPServer(("localhost", PORT), handler)
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+
+    yield temp_dir
+
+    server.shutdown()
+    thread = Thread(target=server.server_close)
+    thread.start()
+    temp_dir.cleanup()
+
+
+def test_frontier_priority_and_dedupe():
+    frontier = UrlFrontier()
+    assert frontier.put("http://example.com/b", depth=1)
+    assert frontier.put("http://example.com/a", depth=0)
+    assert not frontier.put("http://example.com/a/", depth=2)
+    assert not frontier.put("http://example.com/a?q=1", depth=2)
+
+    item = frontier.get()
+    assert (item.url, item.depth) == ("http://example.com/a", 0)
+    frontier.task_done()
+    item = frontier.get()
+    assert (item.url, item.depth) == ("http://example.com/b", 1)
+    frontier.task_done()
+    assert frontier.get() is None
+
+
+def test_frontier_excludes():
+    frontier = UrlFrontier(exclude_urls={"http://example.com/a"}, exclude_regexs={"/ja-jp/"})
+    assert not frontier.put("http://example.com/a")
+    assert not frontier.put("http://example.com/ja-jp/about")
+    assert frontier.put("http://example.com/about")
+
+
+def test_frontier_max_depth():
+    frontier = UrlFrontier(max_depth=2)
+    assert frontier.should_expand(0)
+    assert not frontier.should_expand(1)
+    assert UrlFrontier(max_depth=-1).should_expand(100)
+
+
+def test_concurrent_scrape(setup_server):
+    drivers = [UrllibDriver() for _ in range(3)]
+    s = ConcurrentScraper(workers=[Scraper(driver=d) for d in drivers])
+    group = "testgroup"
+    url = f"http://localhost:{PORT}/index.html"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dest_dir = os.path.join(str(Path(temp_dir).absolute()), group)
+        meta = Meta.from_dir(temp_dir, create=True, set_save_location=True)
+
+        s.scrape(url, dest_dir=dest_dir, max_depth=-1, group=group, meta=meta)
+
+        ## Every page is fetched exactly once across all workers
+        fetched = [u for d in drivers for u in d.urls]
+        assert len(fetched) == 5
+        assert len(set(fetched)) == 5
+
+        g = meta.get_dir(group)
+        for page in ["index.html", "a.html", "b.html", "c.html", "d.html"]:
+            name = s.url_to_local_name(f"http://localhost:{PORT}/{page}")
+            assert os.path.exists(f"{dest_dir}/{name}")
+            f = g.get_file(name)
+            assert f.metadata["source_uri"].endswith(page)
+
+        depths = {f.metadata["source_uri"].rsplit("/", 1)[-1]: f.metadata["depth"] for f in g.files}
+        assert depths == {"index.html": 0, "a.html": 1, "b.html": 1, "c.html": 2, "d.html": 3}
+
+        ## The saved meta has the same layout
+        loaded = Meta.from_dir(temp_dir)
+        assert len(list(loaded.get_dir(group).get_files())) == 5
+
+
+def test_concurrent_scrape_max_depth(setup_server):
+    drivers = [UrllibDriver() for _ in range(2)]
+    s = ConcurrentScraper(workers=[Scraper(driver=d) for d in drivers])
+    url = f"http://localhost:{PORT}/index.html"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dest_dir = os.path.join(temp_dir, "raw")
+        meta = Meta.from_dir(temp_dir, create=True, set_save_location=True)
+        s.scrape(url, dest_dir=dest_dir, max_depth=2, meta=meta)
+        fetched = sorted(u.rsplit("/", 1)[-1] for d in drivers for u in d.urls)
+        assert fetched == ["a.html", "b.html", "index.html"]
+
+
+if __name__ == "__main__":
+    pytest.main([sys.argv[0]])
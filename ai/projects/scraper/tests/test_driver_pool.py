@@ -0,0 +1,163 @@
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+from qai.scraper.scrapers.driver_pool import DriverPool
+from qai.scraper.scrapers.stealthscraper import StealthScraper
+
+
+class FakeDriver:
+    count = 0
+
+    def __init__(self, page_source="<html><body><p>page</p></body></html>"):
+        FakeDriver.count += 1
+        self.id = FakeDriver.count
+        self.page_source = page_source
+        self.urls = []
+        self.cookies_cleared = 0
+        self.cdp_cmds = []
+        self.quit_called = False
+
+    def get(self, url):
+        self.urls.append(url)
+
+    def delete_all_cookies(self):
+        self.cookies_cleared += 1
+
+    def execute_script(self, script):
+        pass
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp_cmds.append(cmd)
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_pool_reuses_and_resets():
+    pool = DriverPool(FakeDriver, size=1, max_pages=None)
+    with pool.lease() as lease:
+        first = lease.driver
+    with pool.lease() as lease:
+        assert lease.driver is first
+    assert first.cookies_cleared == 2
+    assert pool.num_created == 1
+    pool.close()
+    assert first.quit_called
+
+
+def test_pool_recycles_on_page_count():
+    pool = DriverPool(FakeDriver, size=1, max_pages=2)
+    drivers = []
+    for _ in range(5):
+        with pool.lease() as lease:
+            lease.pages += 1
+            drivers.append(lease.driver)
+    assert drivers[0] is drivers[1]
+    assert drivers[1] is not drivers[2]
+    assert drivers[0].quit_called
+    assert pool.num_recycled == 2
+
+
+def test_pool_recycles_blocked_and_old():
+    pool = DriverPool(FakeDriver, size=1, max_pages=None, max_age=None)
+    with pool.lease() as lease:
+        lease.blocked = True
+        blocked = lease.driver
+    with pool.lease() as lease:
+        assert lease.driver is not blocked
+        lease.created_at -= 1000
+        old = lease.driver
+    pool.max_age = 10
+    with pool.lease() as lease:
+        assert lease.driver is not old
+    assert blocked.quit_called and old.quit_called
+
+
+def test_pool_recycles_on_memory():
+    pool = DriverPool(FakeDriver, size=1, max_memory_mb=100, memory_fn=lambda d: 500)
+    with pool.lease() as lease:
+        first = lease.driver
+    with pool.lease() as lease:
+        assert lease.driver is not first
+
+
+def test_pool_size_limits_concurrent_leases():
+    pool = DriverPool(FakeDriver, size=2)
+    a = pool.acquire()
+    b = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire(timeout=5)))
+    t.start()
+    pool.release(a)
+    t.join()
+    assert got[0].driver is a.driver
+    assert pool.num_created == 2
+    pool.release(b)
+    pool.release(got[0])
+
+
+def test_stealth_scraper_leases_drivers():
+    pool = DriverPool(FakeDriver, size=1, max_pages=2)
+    s = StealthScraper(driver_pool=pool)
+    s.time_between_requests = 0
+    s.time_jitter_between_requests = 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        used = []
+        for i in range(4):
+            dest = os.path.join(temp_dir, f"{i}.html")
+            assert s.get_and_save(f"http://example.com/{i}", dest) == dest
+            used.append(s.driver)
+    ## A new chrome process only every max_pages pages
+    assert used[0] is used[1]
+    assert used[2] is used[3]
+    assert used[1] is not used[2]
+    assert pool.num_created == 2
+    assert used[0].cookies_cleared >= 1
+    s.quit()
+    ## A pool passed in is not closed by the scraper
+    with pool.lease() as lease:
+        assert not lease.driver.quit_called
+
+
+def test_stealth_scraper_owned_pool():
+    driver = FakeDriver()
+    s = StealthScraper(driver=driver, max_pages_per_driver=10)
+    s.time_between_requests = 0
+    s.time_jitter_between_requests = 0
+    s.get("http://example.com/a")
+    s.get("http://example.com/b")
+    assert s.driver is driver
+    pages = [u for u in driver.urls if u != "about:blank"]
+    assert pages == ["http://example.com/a", "http://example.com/b"]
+    ## Leases are isolated with a reset that rotates the user agent
+    assert driver.cookies_cleared >= 1
+    assert "Network.setUserAgentOverride" in driver.cdp_cmds
+    s.quit()
+    assert driver.quit_called
+
+
+def test_stealth_scraper_recycles_block_pages():
+    pool = DriverPool(
+        lambda: FakeDriver("<html>Security check RayID</html>"), size=1, max_pages=None
+    )
+    s = StealthScraper(driver_pool=pool)
+    s.time_between_requests = 0
+    s.time_jitter_between_requests = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        first = s.driver
+        assert s.get_and_save("http://example.com/", os.path.join(temp_dir, "a.html")) is None
+        s.get("http://example.com/b")
+        assert s.driver is not first
+        assert first.quit_called
+
+
+if __name__ == "__main__":
+    pytest.main([sys.argv[0]])
@@ -0,0 +1,197 @@
+import http.server
+import os
+import sys
+import tempfile
+import threading
+from threading import Thread
+
+import pytest
+
+from qai.scraper.scrapers.fetcher import FallbackFetcher, FetchResult, Fetcher, HttpFetcher
+from qai.scraper.scrapers.scraper import Scraper
+from qai.scraper.scrapers.scraper_factory import get_scraper
+
+PORT = 8005
+
+STATIC_HTML = """
+<html><body>
+<h1>HTML Ipsum Presents</h1>
+<p>Pellentesque habitant morbi tristique senectus et netus et malesuada fames ac turpis egestas.
+Vestibulum tortor quam, feugiat vitae, ultricies eget, tempor sit amet, ante.
+Donec eu libero sit amet quam egestas semper. Aenean ultricies mi vitae est.</p>
+<script src="analytics.js"></script>
+</body></html>
+"""
+JS_SHELL_HTML = """
+<html><body><div id="root"></div><script src="bundle.js"></script></body></html>
+"""
+NOSCRIPT_HTML = """
+<html><body><noscript>You need to enable JavaScript to run this app.</noscript></body></html>
+"""
+UTF8_HTML = """
+<html><head><meta charset="utf-8"></head><body><p>Café déjà vu, naïve façade</p></body></html>
+"""
+SECURITY_HTML = """
+<html><body><h1>Security check</h1><p>RayID: 1234</p></body></html>
+"""
+
+
+class TempDirHandler(http.server.SimpleHTTPRequestHandler):
+    def __init__(self, temp_dir, *args, **kwargs):
+        self.temp_dir = temp_dir
+        super().__init__(*args, directory=self.temp_dir, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RecordingFetcher(Fetcher):
+    name = "recording"
+
+    def __init__(self, html="<html><body><p>rendered</p></body></html>"):
+        self.html = html
+        self.urls = []
+
+    def fetch(self, url: str) -> FetchResult:
+        self.urls.append(url)
+        return FetchResult(url=url, html=self.html, fetcher=self.name)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.page_source = "<html><body><p>from the browser</p></body></html>"
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    temp_dir = tempfile.TemporaryDirectory()
+    pages = {
+        "static.html": STATIC_HTML,
+        "shell.html": JS_SHELL_HTML,
+        "noscript.html": NOSCRIPT_HTML,
+        "security.html": SECURITY_HTML,
+        "empty.html": "",
+        "data.json": '{"a": 1}',
+        "utf8.html": UTF8_HTML,
+    }
+    for name, html in pages.items():
+        with open(f"{temp_dir.name}/{name}", "w", encoding="utf-8") as f:
+            f.write(html)
+
+    handler = lambda *args, **kwargs: TempDirHandler(temp_dir.name, *args, **kwargs)
+    server = http.server.ThreadingHTTPServer(("localhost", PORT), handler)
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+
+    yield f"http://localhost:{PORT}"
+
+    server.shutdown()
+    thread = Thread(target=server.server_close)
+    thread.start()
+    temp_dir.cleanup()
+
+
+def test_http_fetcher(server_url):
+    result = HttpFetcher().fetch(f"{server_url}/static.html")
+    assert result.status_code == 200
+    assert "HTML Ipsum Presents" in result.html
+    assert result.fetcher == "http"
+
+
+def test_http_fetcher_without_charset_header(server_url):
+    ## The test server sends text/html without a charset
+    result = HttpFetcher().fetch(f"{server_url}/utf8.html")
+    assert "charset" not in result.content_type
+    assert "Café déjà vu, naïve façade" in result.html
+
+
+def test_static_page_stays_on_http(server_url):
+    browser = RecordingFetcher()
+    fetcher = FallbackFetcher([HttpFetcher(), browser])
+    result = fetcher.fetch(f"{server_url}/static.html")
+    assert result.fetcher == "http"
+    assert not browser.urls
+
+
+@pytest.mark.parametrize(
+    "page", ["shell.html", "noscript.html", "security.html", "empty.html", "data.json", "missing.html"]
+)
+def test_escalates_to_browser(server_url, page):
+    browser = RecordingFetcher()
+    fetcher = FallbackFetcher([HttpFetcher(), browser])
+    result = fetcher.fetch(f"{server_url}/{page}")
+    assert result.fetcher == "recording"
+    assert browser.urls == [f"{server_url}/{page}"]
+
+
+def test_escalates_on_connection_error():
+    browser = RecordingFetcher()
+    fetcher = FallbackFetcher([HttpFetcher(timeout=1), browser])
+    result = fetcher.fetch("http://localhost:1/unreachable.html")
+    assert result.fetcher == "recording"
+
+
+def test_scraper_http_first(server_url):
+    driver = FakeDriver()
+    s = Scraper(driver=driver, http_first=True)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dest = os.path.join(temp_dir, "static.html")
+        assert s.get_and_save(f"{server_url}/static.html", dest) == dest
+        with open(dest) as fp:
+            assert "HTML Ipsum Presents" in fp.read()
+        assert not driver.urls
+
+        dest = os.path.join(temp_dir, "shell.html")
+        assert s.get_and_save(f"{server_url}/shell.html", dest) == dest
+        with open(dest) as fp:
+            assert "from the browser" in fp.read()
+        assert driver.urls == [f"{server_url}/shell.html"]
+
+
+def test_scraper_starts_browser_on_first_fallback(server_url, monkeypatch):
+    drivers = []
+
+    def new_driver(self, quit=True, options=None, driver=None, **kwargs):
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    monkeypatch.setattr(Scraper, "_new_driver", new_driver)
+    s = get_scraper(http_first=True)
+    assert isinstance(s.fetcher, FallbackFetcher)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        s.get_and_save(f"{server_url}/static.html", os.path.join(temp_dir, "static.html"))
+        assert not drivers
+        s.get_and_save(f"{server_url}/shell.html", os.path.join(temp_dir, "shell.html"))
+        s.get_and_save(f"{server_url}/noscript.html", os.path.join(temp_dir, "noscript.html"))
+    assert len(drivers) == 1
+    assert drivers[0].urls == [f"{server_url}/shell.html", f"{server_url}/noscript.html"]
+    s.quit()
+
+
+def test_scraper_default_uses_driver(server_url):
+    driver = FakeDriver()
+    s = Scraper(driver=driver)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dest = os.path.join(temp_dir, "static.html")
+        s.get_and_save(f"{server_url}/static.html", dest)
+        assert driver.urls == [f"{server_url}/static.html"]
+
+
+def test_scraper_skips_block_pages(server_url):
+    s = Scraper(driver=FakeDriver(), fetcher=RecordingFetcher(SECURITY_HTML))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dest = os.path.join(temp_dir, "security.html")
+        assert s.get_and_save(f"{server_url}/security.html", dest) is None
+        assert not os.path.exists(dest)
+
+
+if __name__ == "__main__":
+    pytest.main([sys.argv[0]])
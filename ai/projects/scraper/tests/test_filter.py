@@ -12,7 +12,8 @@ import pytest
 from bs4 import BeautifulSoup
 from qai.core import Meta
 
-from qai.scraper.filters.filter import Filter
+from qai.scraper.filters.filter import Filter, clear_pipeline_cache
+from qai.scraper.filters.meta import DirectoryInfo
 from qai.scraper.processors.tag_keeper import TagKeeper
 
 logging.basicConfig(level=logging.DEBUG)
@@ -81,7 +82,86 @@ def test_filter_by_file_regex(tmp_path):
     f = Filter(cfg)
 
     f.process_directory(in_folder=tmp_path)
-    ## TODO assert that only a.html was processed
+    info = DirectoryInfo(in_folder=str(tmp_path))
+    assert len(f.process_file(f"{tmp_path}/a.html", directory_info=info)) == 1
+    assert f.process_file(f"{tmp_path}/b.html", directory_info=info) == []
+
+
+def test_pipeline_compiled_once(tmp_path, monkeypatch):
+    cfg_str = """
+        [[pipeline]]
+        pipeline = ["Keep", "HtmlWriter"]
+        file_regex = "[ab]"
+
+        [[processors]]
+        name = "Keep"
+        h1 = true
+
+        [[processors]]
+        name = "HtmlWriter"
+        out_folder = "out"
+    """
+    import qai.scraper.filters.filter as filter_module
+
+    made = []
+    get_processor = filter_module.get_processor
+
+    def counting_get_processor(*args, **kwargs):
+        made.append(kwargs.get("name"))
+        return get_processor(*args, **kwargs)
+
+    monkeypatch.setattr(filter_module, "get_processor", counting_get_processor)
+    clear_pipeline_cache()
+    meta = Meta.from_dir(tmp_path, create=True)
+    for name in ["a", "b", "skip"]:
+        (tmp_path / f"{name}.html").write_text(f"<html><h1>{name}</h1></html>")
+    f = Filter(toml.loads(cfg_str), meta=meta)
+    for name in ["a", "b", "skip"]:
+        f.process_file(tmp_path / f"{name}.html", directory_info=DirectoryInfo())
+
+    assert made == ["Keep", "HtmlWriter"]
+    ## Writers are copied per file, so every file gets its own output
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["a.html", "b.html"]
+    assert "<h1>" in (tmp_path / "out" / "b.html").read_text()
+    assert f.pipelines[0].processors[1].file_name is None
+
+
+def test_filters_share_compiled_pipelines(tmp_path, monkeypatch):
+    cfg_str = """
+        [[pipeline]]
+        pipeline = ["Keep", "HtmlWriter"]
+
+        [[processors]]
+        name = "Keep"
+        h1 = true
+
+        [[processors]]
+        name = "HtmlWriter"
+        out_folder = "out"
+    """
+    import qai.scraper.filters.filter as filter_module
+
+    made = []
+    get_processor = filter_module.get_processor
+
+    def counting_get_processor(*args, **kwargs):
+        made.append(kwargs.get("name"))
+        return get_processor(*args, **kwargs)
+
+    monkeypatch.setattr(filter_module, "get_processor", counting_get_processor)
+    clear_pipeline_cache()
+    for company in ["acme", "beta"]:
+        company_dir = tmp_path / company
+        company_dir.mkdir()
+        (company_dir / "a.html").write_text(f"<html><h1>{company}</h1></html>")
+        meta = Meta.from_dir(company_dir, create=True)
+        ## A new filter per company, like scrape_filter
+        Filter(toml.loads(cfg_str), meta=meta).process_file(
+            company_dir / "a.html", directory_info=DirectoryInfo()
+        )
+        assert [f.path.name for f in meta.get_dir("out").files] == ["a.html"]
+        assert company in (company_dir / "out" / "a.html").read_text()
+    assert made == ["Keep", "HtmlWriter"]
 
 ## TODO Reenable tags, tags currently not used
 # def test_filter_tagging():
@@ -0,0 +1,82 @@
+import sys
+import tomllib as toml
+
+import pytest
+from qai.core import Meta, MetaFile
+
+from qai.scraper.filters.filter import Filter, MultiFilter
+
+cfg_str = """
+    [[pipeline]]
+    pipeline = ["Keep", "HtmlWriter", "MarkdownWriter"]
+
+    [[processors]]
+    name = "Keep"
+    h1 = true
+
+    [[processors]]
+    name = "HtmlWriter"
+    out_folder = "filtered_html"
+
+    [[processors]]
+    name = "MarkdownWriter"
+    out_folder = "filtered_md"
+"""
+
+
+def make_site(tmp_path, n: int = 12) -> Meta:
+    raw = tmp_path / "raw"
+    raw.mkdir(parents=True)
+    meta = Meta.from_dir(tmp_path, create=True)
+    group = meta.get_dir("raw", create=True)
+    for i in range(n):
+        path = raw / f"page{i}.html"
+        path.write_text(f"<html><h1>Title {i}</h1><p>dropped</p></html>")
+        group.add_file(MetaFile(path=path))
+    return meta
+
+
+def names(meta: Meta, group: str) -> list[str]:
+    return [f.path.name for f in meta.get_dir(group).files]
+
+
+def test_parallel_matches_serial(tmp_path):
+    serial = make_site(tmp_path / "serial")
+    Filter(toml.loads(cfg_str), meta=serial).process_directory(in_group="raw")
+
+    parallel = make_site(tmp_path / "parallel")
+    f = Filter(toml.loads(cfg_str), meta=parallel, num_workers=3, chunk_size=2)
+    f.process_directory(in_group="raw")
+
+    for group in ["filtered_html", "filtered_md"]:
+        assert names(parallel, group) == names(serial, group)
+        assert len(names(parallel, group)) == 12
+    ## One out folder, even though every worker created its own
+    assert len(parallel.directories) == 3
+    page = parallel.get_dir("filtered_html").get_file("page3.html")
+    assert "Title 3" in page.path.read_text()
+    assert "dropped" not in page.path.read_text()
+    assert parallel.get_by_id(page.id) is page
+
+
+def test_parallel_merge_is_saved(tmp_path):
+    meta = make_site(tmp_path)
+    meta.save(tmp_path / "metadata.json", overwrite=True)
+    mf = MultiFilter([cfg_str], meta=meta, num_workers=2)
+    mf.process_directory(in_group="raw")
+    meta.save(tmp_path / "metadata.json", overwrite=True)
+
+    loaded = Meta.from_dir(tmp_path)
+    assert len(names(loaded, "filtered_md")) == 12
+    assert loaded.get_file("page0.md").path == tmp_path / "filtered_md" / "page0.md"
+
+
+def test_parallel_in_folder(tmp_path):
+    for i in range(4):
+        (tmp_path / f"a{i}.html").write_text("<h1>a</h1>")
+    f = Filter(toml.loads('[[pipeline]]\npipeline = ["Keep"]'), num_workers=2)
+    f.process_directory(in_folder=tmp_path)
+
+
+if __name__ == "__main__":
+    pytest.main([sys.argv[0]])
@@ -115,5 +115,38 @@ def test_correct_times2():
     assert newsoup.find("p").text.strip() == h3_answer
 
 
+@pytest.mark.parametrize(
+    "html_str,tag,answer",
+    [
+        ("<h3> a <em><b>b</b></em> c <i>d</i> e\n f <b>g</b> h <i>i</i> j  .</h3>", "h3", "a b c d e f g h i j."),
+        ("<section>\n a\n b   c\n\n <a>j</a>\n .</section>", "section", "a b c j."),
+        ("<p> 50  %</p>", "p", "50%"),
+        ("<p> 50 x speed!</p>", "p", "50x speed!"),
+        ("<p> 8 x 8 </p>", "p", "8x8"),
+    ],
+)
+def test_in_place_matches(html_str, tag, answer):
+    for in_place in (False, True):
+        tk = HTMLSimplifier(in_place=in_place)
+        newsoup = tk.process(tk.make_soup(html_str))
+        assert newsoup.find(tag).text.strip() == answer
+
+
+def test_in_place_sanitize():
+    html_str = """
+        <html><head><title>t</title><script>var x;</script></head>
+        <body><!-- comment --><div onclick="go()" style="color: red">
+        <form><input/><span>kept</span></form><p class="c">\u00e2\u20ac\u0153quoted\u00e2\u20ac\u009d</p>
+        </div></body></html>
+    """
+    tk = HTMLSimplifier(in_place=True)
+    soup = tk.process(tk.make_soup(html_str))
+    assert soup.find_all(["script", "div", "span", "form", "input", "title"]) == []
+    assert "comment" not in str(soup)
+    assert soup.find("p").attrs == {"class": ["c"]}
+    ## Mojibake is fixed, and quotes uncurled, by ftfy
+    assert soup.find("p").text.strip() == '"quoted"'
+
+
 if __name__ == "__main__":
     pytest.main([sys.argv[0]])
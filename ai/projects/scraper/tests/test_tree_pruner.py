@@ -0,0 +1,68 @@
+import sys
+
+import pytest
+from bs4 import BeautifulSoup
+
+from qai.scraper.processors.tag_keeper import TagKeeper
+from qai.scraper.processors.tag_remover import TagRemover
+from qai.scraper.processors.tree_pruner import PruneRules, prune
+
+
+def test_empty_from_children():
+    html_str = """
+        <html><body>
+        <div><div><span> </span><img/></div><p>text</p></div>
+        <div><br/></div>
+        </body></html>
+    """
+    soup = TagRemover(empty=True).process(BeautifulSoup(html_str, "html.parser"))
+    assert [t.name for t in soup.find_all()] == ["html", "body", "div", "p"]
+
+
+def test_deeply_nested():
+    depth = 5000
+    html_str = "<div>" * depth + "x" + "</div>" * depth + "<div>" * depth + "</div>" * depth
+    soup = BeautifulSoup(html_str, "html.parser")
+    prune(soup, PruneRules(empty=True))
+    assert len(soup.find_all("div")) == depth
+
+
+def test_unwrap_inside_before_class_removal():
+    html_str = '<a href="#"><p class="x"><b>kept</b></p></a><p class="x">removed</p>'
+    tr = TagRemover(classes=["x"], p_in_a=True)
+    soup = tr.process(BeautifulSoup(html_str, "html.parser"))
+    assert str(soup) == '<a href="#"><b>kept</b></a>'
+
+
+def test_keep_identical_siblings():
+    ## Identical tags are separate elements, only the one below the kept tag stays
+    html_str = "<div><ol><li>a</li></ol></div><section><li>a</li></section>"
+    soup = TagKeeper(ol=True).process(BeautifulSoup(html_str, "html.parser"))
+    assert str(soup) == "<div><ol><li>a</li></ol></div>"
+
+
+def test_remove_and_keep_in_one_pass():
+    html_str = "<div><ul><li>a</li><li class='ad'>b</li></ul><p>c</p></div>"
+    rules = PruneRules(keep_tags={"ul"}, remove_classes={"ad"})
+    soup = prune(BeautifulSoup(html_str, "html.parser"), rules)
+    assert str(soup) == "<div><ul><li>a</li></ul></div>"
+
+
+def test_keeper_ignores_empty():
+    ## As before prune, TagKeeper keeps empty tags even with empty=True
+    html_str = "<ul><li>a</li><li> </li></ul><p>b</p>"
+    soup = TagKeeper(ul=True, empty=True).process(BeautifulSoup(html_str, "html.parser"))
+    assert str(soup) == "<ul><li>a</li><li> </li></ul>"
+
+
+def test_extract_without_index(monkeypatch):
+    from qai.scraper.processors import tree_pruner
+
+    monkeypatch.setattr(tree_pruner, "_EXTRACT_TAKES_INDEX", False)
+    html_str = "<div><p class='x'>a</p><p>b</p><p class='x'>c</p></div>"
+    soup = TagRemover(classes=["x"]).process(BeautifulSoup(html_str, "html.parser"))
+    assert str(soup) == "<div><p>b</p></div>"
+
+
+if __name__ == "__main__":
+    pytest.main([sys.argv[0]])
@@ -11,6 +11,7 @@ from pydantic import BaseModel, field_validator
 from pydantic_core import Url
 from qai import schema as q
 from qai.schema.models.data_source import SourceType
+from qai.schema.utils.lead_import import LeadImportProgress, import_leads
 
 
 # Utility function to strip trailing slashes
@@ -264,6 +265,14 @@ class CreateCampaignRequestModel(BaseModel):
 
         return company, campaign
 
+    async def import_uploaded_data(self, campaign: q.Campaign, **kwargs) -> LeadImportProgress:
+        """
+        Stream uploaded_data into People, Companies and Contacts of the saved campaign
+        in bulk chunks, see qai.schema.utils.lead_import.import_leads for kwargs.
+        Call it once the campaign of to_qmodel is inserted
+        """
+        return await import_leads(self.uploaded_data, campaign=campaign, **kwargs)
+
 
 class Person(BaseModel):
     name: str
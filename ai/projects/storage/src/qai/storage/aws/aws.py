@@ -1,35 +1,44 @@
-from pathlib import Path
 import os
-import glob
-import boto3
+from pathlib import Path
+
+from qai.storage.aws.transfer import DEFAULT_MAX_WORKERS, TransferManager
+
 
-def download_dir(bucket_name, s3_folder, local_dir=None):
+def download_dir(
+    bucket_name,
+    s3_folder,
+    local_dir=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    client=None,
+    raise_on_error=True,
+):
     """
-    From: https://stackoverflow.com/questions/49772151/download-a-folder-from-s3-using-boto3
-    Download the contents of a folder directory
+    Download the contents of a folder directory in parallel, skipping unchanged files
     Args:
         bucket_name: the name of the s3 bucket
         s3_folder: the folder path in the s3 bucket
         local_dir: a relative or absolute directory path in the local file system
+        max_workers: the number of concurrent downloads
+        client: the s3 client, defaults to boto3.client("s3")
+        raise_on_error: raise a TransferError once the other files are downloaded if any failed
     """
-    if not local_dir is None:
-        local_dir = os.path.expanduser(local_dir)
-    s3 = boto3.resource("s3")
-    bucket = s3.Bucket(bucket_name)
-    for obj in bucket.objects.filter(Prefix=s3_folder):
-        target = obj.key if local_dir is None \
-            else os.path.join(local_dir, os.path.relpath(obj.key, s3_folder))
-        if not os.path.exists(os.path.dirname(target)):
-            os.makedirs(os.path.dirname(target))
-        if obj.key[-1] == '/':
-            continue
-        bucket.download_file(obj.key, target)
+    manager = TransferManager(client=client, max_workers=max_workers)
+    return manager.download_dir(bucket_name, s3_folder, local_dir, raise_on_error=raise_on_error)
 
-def upload_dir(localDir, awsInitDir, bucketName, tag="*", prefix="/"):
+
+def upload_dir(
+    localDir,
+    awsInitDir,
+    bucketName,
+    tag="*",
+    prefix="/",
+    max_workers=DEFAULT_MAX_WORKERS,
+    client=None,
+    raise_on_error=True,
+):
     """
-    from https://stackoverflow.com/questions/56426471/upload-folder-with-sub-folders-and-files-on-s3-using-python
-    from current working directory, upload a 'localDir' with all its subcontents (files and subdirectories...)
-    to a aws bucket
+    Upload a 'localDir' with all its subcontents (files and subdirectories...) to
+    awsInitDir/<name of localDir>/ in a aws bucket, in parallel and skipping unchanged files
     Parameters
     ----------
     localDir :   localDirectory to be uploaded, with respect to current working directory
@@ -37,34 +46,21 @@ def upload_dir(localDir, awsInitDir, bucketName, tag="*", prefix="/"):
     bucketName : bucket in aws
     tag :        tag to select files, like *png
                 NOTE: if you use tag it must be given like --tag '*txt', in some quotation marks... for argparse
-    prefix :     to remove initial '/' from file names
+    prefix :     unused, kept for compatibility
+    max_workers : the number of concurrent uploads
+    client :     the s3 client, defaults to boto3.client("s3")
+    raise_on_error : raise a TransferError once the other files are uploaded if any failed
 
     Returns
     -------
-    None
+    TransferResult
     """
-    s3 = boto3.resource("s3")
-    cwd = str(Path.cwd())
-    p = Path(os.path.join(Path.cwd(), localDir))
-    remove_prefix = os.path.join(*p.parts[:-1])
-    print(f"cwd={cwd}  p={p}  remove_prefix={remove_prefix}")
-
-    mydirs = list(p.glob("**"))
-    for mydir in mydirs:
-        fileNames = glob.glob(os.path.join(mydir, tag))
-        fileNames = [f for f in fileNames if not Path(f).is_dir()]
-        rows = len(fileNames)
-        for i, fileName in enumerate(fileNames):
-            fileName = str(fileName).replace(cwd, "")
-            if fileName.startswith(prefix):  # only modify the text if it starts with the prefix
-                fileName = fileName.replace(prefix, "", 1)  # remove one instance of prefix
-            if not fileName.startswith("/"):
-                fileName = "/" + fileName
-
-            awsPath = os.path.join(awsInitDir, str(fileName))
-            awsPath = awsPath.replace(remove_prefix, "", 1)
-            print(f"{i:03d}/{rows}: fileName {fileName}  aws={awsPath}")
-            s3.meta.client.upload_file(fileName, bucketName, awsPath)
+    local_dir = Path(Path.cwd(), os.path.expanduser(localDir)).resolve()
+    s3_folder = os.path.join(awsInitDir, local_dir.name)
+    manager = TransferManager(client=client, max_workers=max_workers)
+    return manager.upload_dir(
+        str(local_dir), bucketName, s3_folder, pattern=tag, raise_on_error=raise_on_error
+    )
 
 ## list the contents of the bucket
 # s3 = boto3.client("s3")
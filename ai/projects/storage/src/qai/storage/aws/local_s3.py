@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+from urllib.parse import quote, unquote
+
+## Stands for an empty key segment, e.g. of a leading / or a folder marker, quote never makes it
+_EMPTY = "%"
+
+
+def _to_parts(key: str) -> list[str]:
+    return [quote(seg, safe="") if seg else _EMPTY for seg in key.split("/")]
+
+
+def _to_key(parts: tuple[str, ...]) -> str:
+    return "/".join("" if p == _EMPTY else unquote(p) for p in parts)
+
+
+class LocalS3Client:
+    """
+    File system backed stand-in for the parts of a boto3 s3 client used by TransferManager,
+    for tests and local runs. Buckets are directories below root, objects are files
+    """
+
+    def __init__(self, root: str | Path, page_size: int = 1000):
+        self.root = Path(root)
+        self.page_size = page_size
+        self.list_calls = 0
+
+    def _path(self, bucket: str, key: str) -> Path:
+        return self.root.joinpath(bucket, *_to_parts(key))
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes | str = b"") -> None:
+        path = self._path(Bucket, Key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(Body.encode("utf-8") if isinstance(Body, str) else Body)
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str) -> None:
+        path = self._path(Bucket, Key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(Filename, path)
+
+    def download_file(self, Bucket: str, Key: str, Filename: str) -> None:
+        shutil.copyfile(self._path(Bucket, Key), Filename)
+
+    def _objects(self, bucket: str) -> list[dict[str, Any]]:
+        bucket_dir = self.root / bucket
+        objects = []
+        for root, _, files in os.walk(bucket_dir):
+            for name in files:
+                path = Path(root) / name
+                stat = path.stat()
+                objects.append(
+                    {
+                        "Key": _to_key(path.relative_to(bucket_dir).parts),
+                        "Size": stat.st_size,
+                        "ETag": f'"{hashlib.md5(path.read_bytes()).hexdigest()}"',
+                        "LastModified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                    }
+                )
+        return sorted(objects, key=lambda o: o["Key"])
+
+    def get_paginator(self, name: str) -> "LocalS3Client":
+        if name != "list_objects_v2":
+            raise NotImplementedError(name)
+        return self
+
+    def paginate(self, Bucket: str, Prefix: str = "", Delimiter: str = None) -> Iterator[dict]:
+        """Pages of list_objects_v2, one list_calls per page like the real api"""
+        contents, prefixes = [], []
+        for o in self._objects(Bucket):
+            if not o["Key"].startswith(Prefix):
+                continue
+            if Delimiter:
+                i = o["Key"].find(Delimiter, len(Prefix))
+                if i >= 0:
+                    common = o["Key"][: i + len(Delimiter)]
+                    if not prefixes or prefixes[-1] != common:
+                        prefixes.append(common)
+                    continue
+            contents.append(o)
+        entries = [("Contents", o) for o in contents]
+        entries += [("CommonPrefixes", {"Prefix": p}) for p in prefixes]
+        for start in range(0, max(len(entries), 1), self.page_size):
+            self.list_calls += 1
+            page: dict[str, list] = {}
+            for field, value in entries[start : start + self.page_size]:
+                page.setdefault(field, []).append(value)
+            yield page
@@ -0,0 +1,231 @@
+import fnmatch
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from pi_log import logs
+
+log = logs.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 16
+
+
+@dataclass
+class RemoteObject:
+    key: str
+    size: int
+    etag: str = ""
+    mtime: Optional[float] = None
+
+    @classmethod
+    def from_listing(cls, o: dict[str, Any]) -> "RemoteObject":
+        last_modified = o.get("LastModified")
+        if isinstance(last_modified, datetime):
+            last_modified = last_modified.timestamp()
+        return cls(
+            key=o["Key"],
+            size=o.get("Size", 0),
+            etag=o.get("ETag", "").strip('"'),
+            mtime=last_modified,
+        )
+
+
+@dataclass
+class TransferResult:
+    transferred: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+class TransferError(Exception):
+    """Raised once all transfers ran when some failed, result has what was done"""
+
+    def __init__(self, result: TransferResult):
+        self.result = result
+        failed = ", ".join(f"{k}: {e}" for k, e in list(result.failed.items())[:5])
+        super().__init__(f"{len(result.failed)} transfers failed, e.g. {failed}")
+
+
+def file_md5(path: str | Path) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_unchanged(path: str | Path, obj: RemoteObject) -> bool:
+    """
+    Whether the local file has the content of obj. Files of a different size differ, files
+    with the mtime of obj (set by download) are the same, otherwise the md5 of the file is
+    compared with the ETag. Multipart ETags ("<hash>-<parts>") are not md5s and count as changed
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if stat.st_size != obj.size:
+        return False
+    if obj.mtime is not None and int(stat.st_mtime) == int(obj.mtime):
+        return True
+    if not obj.etag or "-" in obj.etag:
+        return False
+    return file_md5(path) == obj.etag
+
+
+class TransferManager:
+    """
+    Copies folders between S3 and the local file system with a bounded thread pool.
+    Listings are fully paginated, and files that did not change are not transferred.
+    Args:
+        client: A boto3 s3 client (clients are thread safe, resources are not),
+            or a stand-in such as LocalS3Client
+        max_workers (int): Transfers in flight at once
+    """
+
+    def __init__(self, client: Any = None, max_workers: int = DEFAULT_MAX_WORKERS):
+        if client is None:
+            import boto3
+
+            client = boto3.client("s3")
+        self.client = client
+        self.max_workers = max_workers
+
+    def list_objects(self, bucket_name: str, prefix: str) -> Iterator[RemoteObject]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for o in page.get("Contents", []):
+                yield RemoteObject.from_listing(o)
+
+    def list_prefixes(self, bucket_name: str, prefix: str) -> list[str]:
+        """The "folders" directly under prefix, without prefix or trailing /"""
+        paginator = self.client.get_paginator("list_objects_v2")
+        names = []
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, Delimiter="/"):
+            for p in page.get("CommonPrefixes", []):
+                names.append(p["Prefix"][len(prefix) :].strip("/"))
+        return names
+
+    def _run(
+        self,
+        jobs: list[tuple[str, Callable[[], None]]],
+        result: TransferResult,
+        raise_on_error: bool = True,
+    ) -> None:
+        def run(name: str, job: Callable[[], None]):
+            try:
+                job()
+                return name, None
+            except Exception as e:
+                return name, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for name, error in executor.map(lambda j: run(*j), jobs):
+                if error is None:
+                    result.transferred.append(name)
+                else:
+                    log.error(f"TransferManager: {name} failed: {error}")
+                    result.failed[name] = error
+        if raise_on_error and result.failed:
+            raise TransferError(result)
+
+    def download_dir(
+        self,
+        bucket_name: str,
+        s3_folder: str,
+        local_dir: str = None,
+        skip_unchanged: bool = True,
+        raise_on_error: bool = True,
+    ) -> TransferResult:
+        """
+        Download the contents of a folder.
+        Args:
+            bucket_name (str): The s3 bucket
+            s3_folder (str): The folder path in the bucket
+            local_dir (str): Local directory, defaults to the keys relative to the cwd
+            skip_unchanged (bool): Skip files that are the same locally
+            raise_on_error (bool): Raise a TransferError after the other files are
+                transferred when any failed, otherwise they are only in result.failed
+        """
+        if local_dir is not None:
+            local_dir = os.path.expanduser(local_dir)
+        result = TransferResult()
+        jobs = []
+        for obj in self.list_objects(bucket_name, s3_folder):
+            if obj.key.endswith("/"):
+                continue
+            target = (
+                obj.key
+                if local_dir is None
+                else os.path.join(local_dir, os.path.relpath(obj.key, s3_folder))
+            )
+            if skip_unchanged and is_unchanged(target, obj):
+                result.skipped.append(obj.key)
+                continue
+            jobs.append((obj.key, self._download_job(bucket_name, obj, target)))
+        self._run(jobs, result, raise_on_error=raise_on_error)
+        return result
+
+    def _download_job(self, bucket_name: str, obj: RemoteObject, target: str):
+        def job():
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            self.client.download_file(bucket_name, obj.key, target)
+            ## The mtime of the object lets the next sync skip the file without hashing it
+            if obj.mtime is not None:
+                os.utime(target, (obj.mtime, obj.mtime))
+
+        return job
+
+    def upload_dir(
+        self,
+        local_dir: str,
+        bucket_name: str,
+        s3_folder: str,
+        pattern: str = "*",
+        skip_unchanged: bool = True,
+        raise_on_error: bool = True,
+    ) -> TransferResult:
+        """
+        Upload the files below local_dir to s3_folder, keeping their relative paths.
+        Args:
+            pattern (str): Only upload file names matching this glob, e.g. "*.md"
+            skip_unchanged (bool): Skip files whose size and md5 match the object
+            raise_on_error (bool): See download_dir
+        """
+        local_dir = os.path.expanduser(local_dir)
+        s3_folder = s3_folder.rstrip("/") + "/" if s3_folder else ""
+        remote = {}
+        if skip_unchanged:
+            remote = {o.key: o for o in self.list_objects(bucket_name, s3_folder)}
+        result = TransferResult()
+        jobs = []
+        for root, _, files in os.walk(local_dir):
+            for name in files:
+                if not fnmatch.fnmatch(name, pattern):
+                    continue
+                path = os.path.join(root, name)
+                key = s3_folder + os.path.relpath(path, local_dir).replace(os.sep, "/")
+                obj = remote.get(key)
+                if obj is not None and _same_upload(path, obj):
+                    result.skipped.append(key)
+                    continue
+                jobs.append((key, self._upload_job(bucket_name, path, key)))
+        self._run(jobs, result, raise_on_error=raise_on_error)
+        return result
+
+    def _upload_job(self, bucket_name: str, path: str, key: str):
+        def job():
+            self.client.upload_file(path, bucket_name, key)
+
+        return job
+
+
+def _same_upload(path: str, obj: RemoteObject) -> bool:
+    ## The object mtime is the upload time, so only size and md5 can tell
+    if os.path.getsize(path) != obj.size or not obj.etag or "-" in obj.etag:
+        return False
+    return file_md5(path) == obj.etag
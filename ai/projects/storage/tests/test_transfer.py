@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from qai.storage.aws.aws import upload_dir
+from qai.storage.aws.local_s3 import LocalS3Client
+from qai.storage.aws.transfer import TransferError, TransferManager
+
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.client = LocalS3Client(self.root / "s3", page_size=3)
+        for i in range(10):
+            self.client.put_object(Bucket="b", Key=f"/websites/acme/t1/page{i}.md", Body=f"p{i}")
+        self.client.put_object(Bucket="b", Key="/websites/acme/t1/", Body="")
+        self.client.put_object(Bucket="b", Key="/websites/beta/t1/page.md", Body="b")
+        self.manager = TransferManager(self.client, max_workers=4)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_download_skips_unchanged(self):
+        local = self.root / "local"
+        result = self.manager.download_dir("b", "/websites/acme/t1", local)
+        self.assertEqual(len(result.transferred), 10)
+        self.assertEqual((local / "page3.md").read_text(), "p3")
+
+        result = self.manager.download_dir("b", "/websites/acme/t1", local)
+        self.assertEqual((len(result.transferred), len(result.skipped)), (0, 10))
+
+        ## Changed remotely, and a local edit of the same size
+        self.client.put_object(Bucket="b", Key="/websites/acme/t1/page1.md", Body="changed")
+        (local / "page2.md").write_text("xx")
+        os.utime(local / "page2.md", (0, 0))
+        result = self.manager.download_dir("b", "/websites/acme/t1", local)
+        self.assertEqual(
+            sorted(result.transferred), ["/websites/acme/t1/page1.md", "/websites/acme/t1/page2.md"]
+        )
+        self.assertEqual((local / "page2.md").read_text(), "p2")
+
+    def test_pagination(self):
+        keys = [o.key for o in self.manager.list_objects("b", "/websites/")]
+        self.assertEqual(len(keys), 12)
+        self.assertGreater(self.client.list_calls, 1)
+        self.assertEqual(self.manager.list_prefixes("b", "/websites/"), ["acme", "beta"])
+
+    def test_upload_skips_unchanged(self):
+        src = self.root / "site"
+        (src / "sub").mkdir(parents=True)
+        (src / "a.md").write_text("a")
+        (src / "sub" / "b.md").write_text("b")
+        (src / "c.txt").write_text("c")
+
+        result = upload_dir(str(src), "/uploads", "b", tag="*.md", client=self.client)
+        uploaded = sorted(result.transferred)
+        self.assertEqual(uploaded, ["/uploads/site/a.md", "/uploads/site/sub/b.md"])
+        result = upload_dir(str(src), "/uploads", "b", tag="*.md", client=self.client)
+        self.assertEqual(len(result.skipped), 2)
+
+        (src / "a.md").write_text("A")
+        result = upload_dir(str(src), "/uploads", "b", tag="*.md", client=self.client)
+        self.assertEqual(result.transferred, ["/uploads/site/a.md"])
+
+    def test_failures_raise_after_the_other_files(self):
+        download_file = self.client.download_file
+
+        def flaky(Bucket, Key, Filename):
+            if Key.endswith("page3.md"):
+                raise OSError("disk full")
+            download_file(Bucket, Key, Filename)
+
+        self.client.download_file = flaky
+        local = self.root / "local"
+        with self.assertRaises(TransferError) as ctx:
+            self.manager.download_dir("b", "/websites/acme/t1", local)
+        result = ctx.exception.result
+        self.assertEqual(list(result.failed), ["/websites/acme/t1/page3.md"])
+        self.assertEqual(len(result.transferred), 9)
+
+        result = self.manager.download_dir("b", "/websites/acme/t1", local, raise_on_error=False)
+        self.assertEqual(list(result.failed), ["/websites/acme/t1/page3.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()